@@ -1,26 +1,30 @@
+from django.utils.functional import SimpleLazyObject, new_method_proxy
+
 from .settings import AUTH_USER_MODEL
 
 
+class LazyAmount(SimpleLazyObject):
+    """SimpleLazyObject that can also be formatted (the template engine localizes numbers with format())."""
+    __format__ = new_method_proxy(format)
+
+
 def wallet_context(request):
-    """Expose wallet and vault totals to templates when user is authenticated."""
-    data = {}
-    try:
+    """
+    Expose wallet and vault totals to templates.
+
+    Values are lazy: nothing is queried unless a template renders them, and
+    then a single cached lookup serves both (see tontines.summaries.wallet_totals).
+    """
+    def totals():
+        # Import here to avoid import loops
+        from tontines.summaries import wallet_totals
         user = request.user
-        if user and user.is_authenticated:
-            # Import here to avoid import loops
-            from tontines.models import Wallet, Vault
-            try:
-                wallet = user.wallet
-                wallet_balance = wallet.balance
-            except Exception:
-                wallet_balance = 0
-            try:
-                vaults = Vault.objects.filter(owner=user)
-                vaults_total = sum([v.balance or 0 for v in vaults])
-            except Exception:
-                vaults_total = 0
-            data['wallet_balance'] = wallet_balance
-            data['vaults_total'] = vaults_total
-    except Exception:
-        pass
-    return data
+        if not user.is_authenticated:
+            return (0, 0)
+        return wallet_totals(user.pk)
+
+    totals = SimpleLazyObject(totals)
+    return {
+        'wallet_balance': LazyAmount(lambda: totals[0]),
+        'vaults_total': LazyAmount(lambda: totals[1]),
+    }
@@ -0,0 +1,90 @@
+"""
+Instrumentation des requêtes (opt-in, QUERY_INSTRUMENTATION=True).
+
+Pour chaque requête, compte les requêtes SQL et leur durée, mesure le temps
+de la vue (rendu du template compris, les vues rendent avec render()) et
+repère les requêtes répétées (même empreinte SQL, signe d'un N+1).
+Les mesures sont ajoutées aux en-têtes de la réponse et journalisées avec
+le nom d'URL (logger "config.instrumentation").
+Désactivé, le middleware se retire de la chaîne (MiddlewareNotUsed): aucun coût.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('config.instrumentation')
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Empreinte d'une requête: littéraux et listes IN remplacés, espaces normalisés."""
+    sql = _LITERALS.sub('?', sql)
+    sql = _IN_LISTS.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper qui compte les requêtes, leur durée et leurs empreintes."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+
+class QueryInstrumentationMiddleware:
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        duplicates = recorder.duplicates()
+        repeated = sum(count - 1 for count in duplicates.values())
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else '-'
+
+        response['X-Query-Count'] = str(recorder.count)
+        response['X-Query-Time-Ms'] = f'{recorder.duration * 1000:.1f}'
+        response['X-Response-Time-Ms'] = f'{elapsed * 1000:.1f}'
+        response['X-App-Time-Ms'] = f'{(elapsed - recorder.duration) * 1000:.1f}'
+        response['X-Duplicate-Queries'] = str(repeated)
+
+        logger.info(
+            '%s %s queries=%d db_ms=%.1f total_ms=%.1f duplicates=%d',
+            url_name, request.method, recorder.count, recorder.duration * 1000, elapsed * 1000, repeated,
+        )
+        for sql, count in sorted(duplicates.items(), key=lambda item: -item[1]):
+            logger.warning('%s requête répétée %d fois: %s', url_name, count, sql)
+        return response
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -100,6 +101,84 @@ else:
         }
     }
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# En production, le cache doit être partagé par tous les processus (workers
+# gunicorn, commandes planifiées): les fragments, les soldes en cache et leurs
+# invalidations n'ont de sens que si tous voient les mêmes entrées.
+#   CACHE_URL=redis://hôte:6379/0  -> Redis (paquet `redis` requis)
+#   CACHE_URL=db://tontine_cache   -> table en base (python manage.py createcachetable)
+# Sans CACHE_URL: mémoire locale au processus, pour le développement et les tests.
+CACHE_URL = config("CACHE_URL", default="")
+if CACHE_URL.startswith(("redis://", "rediss://")):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith("db://"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": CACHE_URL[len("db://"):] or "tontine_cache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "tontine-default",
+        }
+    }
+
+# Instrumentation des requêtes (nombre/durée SQL, N+1) dans les en-têtes et les logs
+QUERY_INSTRUMENTATION = config("QUERY_INSTRUMENTATION", default=False, cast=bool)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "config.instrumentation": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        "tontines.getmipay_service": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
+# Soldes affichés dans l'en-tête de chaque page (voir tontines/summaries.py)
+WALLET_TOTALS_CACHE_TIMEOUT = config("WALLET_TOTALS_CACHE_TIMEOUT", default=300, cast=int)
+
+# Flux iCalendar par utilisateur (voir tontines/ical.py)
+CALENDAR_FEED_HORIZON_DAYS = config("CALENDAR_FEED_HORIZON_DAYS", default=90, cast=int)
+CALENDAR_FEED_CACHE_TIMEOUT = config("CALENDAR_FEED_CACHE_TIMEOUT", default=86400, cast=int)
+
+# Fragments des tableaux de bord par utilisateur: frais puis servis périmés pendant le recalcul
+# (voir tontines/fragments.py)
+FRAGMENT_CACHE_TIMEOUT = config("FRAGMENT_CACHE_TIMEOUT", default=300, cast=int)
+FRAGMENT_CACHE_STALE = config("FRAGMENT_CACHE_STALE", default=600, cast=int)
+
+# Fil d'activité: au-delà de ce nombre de membres, un événement n'est plus copié
+# dans le fil de chaque membre mais lu à la demande (voir tontines/feed.py)
+ACTIVITY_FANOUT_LIMIT = config("ACTIVITY_FANOUT_LIMIT", default=500, cast=int)
+# Ancienneté au-delà de laquelle les éléments du fil sont supprimés (prune_activity_feed)
+ACTIVITY_RETENTION_DAYS = config("ACTIVITY_RETENTION_DAYS", default=90, cast=int)
+
+# GetMiPay (paiements mobiles): identifiants, puis session HTTP partagée (pool de
+# connexions keep-alive, délais de connexion et de lecture, nouvelles tentatives
+# avec attente exponentielle et aléa), voir tontines/getmipay_service.py
+GETMIPAY_API_KEY = config("GETMIPAY_API_KEY", default="")
+GETMIPAY_SECRET_KEY = config("GETMIPAY_SECRET_KEY", default="")
+GETMIPAY_API_URL = config("GETMIPAY_API_URL", default="https://api.sandbox.getmipay.com")
+# Obligatoire pour recevoir les webhooks: sans secret, ils sont refusés (503)
+GETMIPAY_WEBHOOK_SECRET = config("GETMIPAY_WEBHOOK_SECRET", default="")
+GETMIPAY_CONNECT_TIMEOUT = config("GETMIPAY_CONNECT_TIMEOUT", default=3.05, cast=float)
+GETMIPAY_READ_TIMEOUT = config("GETMIPAY_READ_TIMEOUT", default=10, cast=float)
+GETMIPAY_POOL_SIZE = config("GETMIPAY_POOL_SIZE", default=20, cast=int)
+GETMIPAY_MAX_RETRIES = config("GETMIPAY_MAX_RETRIES", default=3, cast=int)
+GETMIPAY_BACKOFF_FACTOR = config("GETMIPAY_BACKOFF_FACTOR", default=0.3, cast=float)
+
 
 
 # Password validation
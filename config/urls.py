@@ -19,7 +19,7 @@ from django.urls import path,include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
-from core.views import home, dashboard, calendar_view, accueil_view
+from core.views import home, dashboard, calendar_view, calendar_feed_view, accueil_view
 from accounts.views import register_view, profile_view,profile_edit_view
 from tontines.views import tontine_create_view, tontine_list_view, tontine_detail_view
 from accounts.views import CustomPasswordChangeView, CustomPasswordChangeDoneView
@@ -31,7 +31,10 @@ from tontines.views import (
 )
 from tontines.views import (
     tontine_join_view, tontine_contribute_view, wallet_deposit_view,
-    tontine_pay_from_wallet, vault_create_view, wallet_overview, vaults_overview
+    tontine_pay_from_wallet, vault_create_view, wallet_overview, vaults_overview,
+    tontine_collect_view, wallet_transactions_view, tontine_contributions_view,
+    wallet_export_view, tontine_export_view, tontine_contribution_stats_view,
+    tontine_projection_view, getmipay_webhook_view,
 )
 
 
@@ -41,6 +44,7 @@ urlpatterns = [
     path('accueil/', accueil_view, name='accueil'),
     path('dashboard/', dashboard, name='dashboard'),
     path('calendar/', calendar_view, name='calendar'),
+    path('calendar/feed/<str:token>.ics', calendar_feed_view, name='calendar_feed'),
     path('register/', register_view, name='register'),
     path('profile/', profile_view, name='profile'),
     path('profile/edit/', profile_edit_view, name='profile_edit'),
@@ -59,6 +63,7 @@ urlpatterns = [
     path('tontines/', tontine_list_view, name='tontine_list'),
     path('tontines/create/', tontine_create_view, name='tontine_create'),
     path('tontines/<int:tontine_id>/', tontine_detail_view, name='tontine_detail'),
+    path('tontines/projection/', tontine_projection_view, name='tontine_projection'),
     path('tontines/<int:tontine_id>/edit/', tontine_edit_view, name='tontine_edit'),
     path('tontines/<int:tontine_id>/activate/', tontine_activate_view, name='tontine_activate'),
     path('tontines/<int:tontine_id>/manage/', tontine_manage_view, name='tontine_manage'),
@@ -75,11 +80,19 @@ urlpatterns = [
          tontine_remove_member, name='tontine_remove_member'),
     path('tontines/<int:tontine_id>/contribute/', tontine_contribute_view, name='tontine_contribute'),
     path('tontines/<int:tontine_id>/pay-wallet/', tontine_pay_from_wallet, name='tontine_pay_wallet'),
+    path('tontines/<int:tontine_id>/collect/', tontine_collect_view, name='tontine_collect'),
+    path('tontines/<int:tontine_id>/contributions/', tontine_contributions_view, name='tontine_contributions'),
+    path('tontines/<int:tontine_id>/export/<str:kind>/', tontine_export_view, name='tontine_export'),
+    path('tontines/<int:tontine_id>/stats/contributions/', tontine_contribution_stats_view,
+         name='tontine_contribution_stats'),
     path('wallet/deposit/', wallet_deposit_view, name='wallet_deposit'),
     path('wallet/topup/', wallet_deposit_view, name='wallet_topup'),
     path('wallet/', wallet_overview, name='wallet_overview'),
+    path('wallet/transactions/', wallet_transactions_view, name='wallet_transactions'),
+    path('wallet/export/', wallet_export_view, name='wallet_export'),
     path('vaults/', vaults_overview, name='vaults_overview'),
     path('vault/create/', vault_create_view, name='vault_create'),
+    path('webhook/getmipay/', getmipay_webhook_view, name='getmipay_webhook'),
 ]
 
 if settings.DEBUG:
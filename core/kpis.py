@@ -0,0 +1,66 @@
+"""
+Indicateurs du tableau de bord d'accueil, en deux allers-retours SQL.
+
+1. Un agrégat sur les adhésions de l'utilisateur (une ligne par tontine, pas
+   de DISTINCT): comptes par statut en agrégation conditionnelle
+   (COUNT ... FILTER), pot total, total contribué, nombre de contributions
+   (sous-requête par tontine) et membres actifs distincts.
+2. La liste de ses tontines (affichage, graphique, prochaine échéance stockée), par
+   semi-jointure sur ses adhésions plutôt qu'une jointure + DISTINCT.
+
+Les soldes (porte-monnaie, coffres) viennent du context processor
+wallet_context, déjà en cache.
+"""
+
+from decimal import Decimal
+
+from django.db.models import Count, IntegerField, Max, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from tontines.models import Contribution, Tontine, TontineMember
+
+CHART_SIZE = 10
+
+
+def user_tontines(user):
+    """Tontines dont `user` est membre (semi-jointure: pas de doublons ni de DISTINCT)."""
+    return Tontine.objects.filter(pk__in=TontineMember.objects.filter(user=user).values('tontine_id'))
+
+
+def accueil_kpis(user):
+    """Tous les chiffres du tableau de bord d'accueil de `user`."""
+    memberships = TontineMember.objects.filter(user=user)
+    contributions_per_tontine = Contribution.objects.filter(
+        tontine=OuterRef('tontine_id')
+    ).order_by().values('tontine').annotate(count=Count('pk')).values('count')
+    active_members = TontineMember.objects.filter(
+        status='active', tontine__in=memberships.values('tontine_id')
+    ).order_by().values('status').annotate(count=Count('user', distinct=True)).values('count')
+
+    figures = memberships.aggregate(
+        tontine_count=Count('pk'),
+        active_count=Count('pk', filter=Q(tontine__status='active')),
+        draft_count=Count('pk', filter=Q(tontine__status='draft')),
+        completed_count=Count('pk', filter=Q(tontine__status='completed')),
+        total_pot=Sum('tontine__total_pot'),
+        total_contributed=Sum('total_contributed', filter=Q(status='active')),
+        contribution_count=Sum(Subquery(contributions_per_tontine, output_field=IntegerField())),
+        # Sous-requête non corrélée: Max() la fait entrer dans le même SELECT
+        active_members=Max(Subquery(active_members[:1], output_field=IntegerField())),
+    )
+    for key in ('total_pot', 'total_contributed'):
+        figures[key] = figures[key] or Decimal('0')
+    for key in ('contribution_count', 'active_members'):
+        figures[key] = figures[key] or 0
+
+    tontines = list(user_tontines(user).order_by('-created_at').only(
+        'id', 'name', 'status', 'total_pot', 'next_due_date'
+    ))
+
+    today = timezone.localdate()
+    # Échéances stockées et tenues à jour par tontines.schedule
+    due_dates = [t.next_due_date for t in tontines if t.status == 'active' and t.next_due_date]
+    figures['next_due_in_days'] = min((day - today).days for day in due_dates) if due_dates else None
+    figures['tontines'] = tontines
+    figures['chart'] = [(t.name, t.total_pot or Decimal('0')) for t in tontines[:CHART_SIZE]]
+    return figures
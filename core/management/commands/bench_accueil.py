@@ -0,0 +1,90 @@
+"""
+Benchmark des indicateurs de l'accueil: ancien calcul (une requête par
+chiffre, jointures + DISTINCT, boucles sur les tontines) contre le service
+core.kpis (deux requêtes). Les soldes, servis par le cache de
+wallet_context, ne sont pas mesurés.
+
+    python manage.py seed_tontines --users 20000 --tontines 2000
+    python manage.py bench_accueil --users 50 --repeat 5
+"""
+
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.kpis import accueil_kpis
+from tontines.models import Contribution, Tontine, TontineMember
+
+User = get_user_model()
+
+
+def legacy_kpis(user):
+    """Calcul de l'accueil avant core.kpis (référence du benchmark)."""
+    user_tontines = Tontine.objects.filter(members__user=user).distinct()
+    figures = {
+        'tontine_count': user_tontines.count(),
+        'active_count': user_tontines.filter(status='active').count(),
+        'draft_count': user_tontines.filter(status='draft').count(),
+        'completed_count': user_tontines.filter(status='completed').count(),
+        'total_contributed': TontineMember.objects.filter(user=user, status='active').aggregate(
+            total=Sum('total_contributed'))['total'] or 0,
+        'total_pot': Tontine.objects.filter(members__user=user).aggregate(total=Sum('total_pot'))['total'] or 0,
+        'active_members': TontineMember.objects.filter(
+            tontine__in=user_tontines, status='active').values('user').distinct().count(),
+        'contribution_count': Contribution.objects.filter(tontine__in=user_tontines).count(),
+    }
+    figures['chart'] = [(t.name, t.total_pot) for t in user_tontines[:10]]
+    today = timezone.localdate()
+    soon = None
+    for t in user_tontines.filter(status='active'):
+        days_since = (today - t.start_date).days
+        cycle_days = t.cycle_duration or 30
+        due = t.start_date if today < t.start_date else t.start_date + timedelta(
+            days=(days_since // cycle_days + 1) * cycle_days)
+        soon = (due - today).days if soon is None else min(soon, (due - today).days)
+    figures['next_due_in_days'] = soon
+    return figures
+
+
+class Command(BaseCommand):
+    help = "Compare requêtes et latence des indicateurs de l'accueil (ancien calcul / core.kpis)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Utilisateurs mesurés (les plus engagés)')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        users = list(
+            User.objects.annotate(n=Count('tontinemember')).filter(n__gt=0).order_by('-n')[:options['users']]
+        )
+        if not users:
+            raise CommandError('Aucun membre de tontine: lancez seed_tontines.')
+
+        for user in users:
+            legacy, current = legacy_kpis(user), accueil_kpis(user)
+            for key in ('tontine_count', 'active_count', 'total_pot', 'active_members', 'contribution_count'):
+                if legacy[key] != current[key]:
+                    raise CommandError(f'{user.username}: {key} diffère ({legacy[key]} / {current[key]}).')
+
+        for label, compute in (('avant (requêtes séparées)', legacy_kpis), ('après (core.kpis)', accueil_kpis)):
+            timings, queries = [], []
+            for _ in range(options['repeat']):
+                for user in users:
+                    with CaptureQueriesContext(connection) as captured:
+                        start = time.perf_counter()
+                        compute(user)
+                        timings.append(time.perf_counter() - start)
+                    queries.append(len(captured))
+            timings.sort()
+            self.stdout.write(
+                f'{label:<28} requêtes/page: {statistics.mean(queries):>5.1f}   '
+                f'p50: {timings[len(timings) // 2] * 1000:>7.2f} ms   '
+                f'p95: {timings[int(len(timings) * 0.95)] * 1000:>7.2f} ms'
+            )
@@ -0,0 +1,38 @@
+"""
+{% userfragment 'nom' %}...{% enduserfragment %}: fragment de page mis en cache
+par utilisateur (voir tontines/fragments.py). Le contenu n'est rendu, et ses
+requêtes exécutées, qu'en cas d'absence ou de péremption de l'entrée: les vues
+passent donc des valeurs paresseuses (SimpleLazyObject, QuerySet).
+"""
+
+from django import template
+
+from tontines import fragments
+
+register = template.Library()
+
+
+class UserFragmentNode(template.Node):
+
+    def __init__(self, name, nodelist):
+        self.name = name
+        self.nodelist = nodelist
+
+    def render(self, context):
+        user = context['request'].user
+        if not user.is_authenticated:
+            return self.nodelist.render(context)
+        return fragments.cached(user.pk, self.name, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def userfragment(parser, token):
+    bits = token.split_contents()
+    if len(bits) != 2 or bits[1][0] not in '\'"' or bits[1][-1] != bits[1][0]:
+        raise template.TemplateSyntaxError(f"{bits[0]} attend un nom de fragment entre guillemets.")
+    name = bits[1][1:-1]
+    if name not in fragments.FRAGMENTS:
+        raise template.TemplateSyntaxError(f"Fragment inconnu: {name} (voir tontines.fragments.FRAGMENTS).")
+    nodelist = parser.parse(('enduserfragment',))
+    parser.delete_first_token()
+    return UserFragmentNode(name, nodelist)
@@ -1,3 +1,316 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver, reverse
+from django.utils import timezone
+
+from core.kpis import accueil_kpis
+from tontines import fragments, ical, rotation, summaries
+from tontines.getmipay_service import getmipay_service
+from tontines.models import Tontine, TontineMember, Transaction, Vault, Wallet
+from tontines.payments import deposit_to_wallet, pay_contribution_from_wallet
+
+User = get_user_model()
+
+# Nombre maximal de requêtes SQL par vue (nom d'URL -> budget).
+# Toute vue ajoutée à config/urls.py doit avoir son budget ici.
+QUERY_BUDGETS = {
+    'home': 3,
+    'accueil': 5,
+    'dashboard': 7,
+    'calendar': 4,
+    'calendar_feed': 1,
+    'register': 0,
+    'profile': 4,
+    'profile_edit': 3,
+    'login': 0,
+    'logout': 4,
+    'change_password': 3,
+    'password_change_done': 3,
+    'tontine_list': 11,
+    'tontine_create': 3,
+    'tontine_projection': 3,
+    'tontine_detail': 8,
+    'tontine_edit': 4,
+    'tontine_activate': 10,
+    'tontine_manage': 5,
+    'allocate_beneficiary': 21,
+    'tontine_invite': 5,
+    'tontine_join': 3,
+    'tontine_change_member_role': 9,
+    'tontine_change_member_status': 10,
+    'tontine_remove_member': 18,
+    'tontine_contribute': 14,
+    'tontine_pay_wallet': 18,
+    'tontine_collect': 19,
+    'tontine_contributions': 5,
+    'tontine_export': 5,
+    'tontine_contribution_stats': 4,
+    'wallet_deposit': 3,
+    'wallet_topup': 9,
+    'wallet_overview': 6,
+    'wallet_transactions': 3,
+    'wallet_export': 3,
+    'vaults_overview': 4,
+    'vault_create': 11,
+    'getmipay_webhook': 1,
+}
+
+
+class AccueilKpisTestCase(TestCase):
+    """Tests du service d'indicateurs de l'accueil"""
+
+    def test_figures_match_source_tables(self):
+        user = User.objects.create_user(username='kpi', password='x', phone_number='0700000300')
+        other = User.objects.create_user(username='autre', password='x', phone_number='0700000301')
+        for code, status in (('K1', 'active'), ('K2', 'active'), ('K3', 'draft')):
+            tontine = Tontine.objects.create(
+                name=code, code=code, description='Test', manager=user, start_date=timezone.localdate(),
+                contribution_amount=Decimal('1000'), status=status,
+            )
+            for member_user in (user, other):
+                member = TontineMember.objects.create(tontine=tontine, user=member_user, status='active')
+                if status == 'active':
+                    deposit_to_wallet(Wallet.objects.get_or_create(user=member_user)[0], Decimal('1000'), note='Dépôt')
+                    pay_contribution_from_wallet(member_user, tontine, member)
+
+        with self.assertNumQueries(2):
+            kpis = accueil_kpis(user)
+        self.assertEqual((kpis['tontine_count'], kpis['active_count'], kpis['draft_count']), (3, 2, 1))
+        self.assertEqual(kpis['total_pot'], Decimal('4000'))
+        self.assertEqual(kpis['total_contributed'], Decimal('2000'))
+        self.assertEqual(kpis['contribution_count'], 4)
+        self.assertEqual(kpis['active_members'], 2)
+        self.assertEqual(kpis['next_due_in_days'], 30)
+        self.assertEqual(len(kpis['tontines']), 3)
+
+
+@override_settings(GETMIPAY_WEBHOOK_SECRET='secret-de-test')
+class QueryBudgetTestCase(TestCase):
+    """Budget de requêtes SQL de chaque vue (les régressions N+1 font échouer la suite)"""
+
+    MEMBERS = 5
+
+    def setUp(self):
+        self.manager = User.objects.create_user(
+            username='gestion', password='password123', phone_number='0700000100'
+        )
+        self.tontine = Tontine.objects.create(
+            name='Tontine Budget', code='BUDGET', description='Test', manager=self.manager,
+            start_date=timezone.localdate(), contribution_amount=Decimal('1000'), status='active',
+        )
+        self.draft = Tontine.objects.create(
+            name='Brouillon', code='DRAFT', description='Test', manager=self.manager,
+            start_date=timezone.localdate(), contribution_amount=Decimal('1000'),
+        )
+        self.members = []
+        for index in range(self.MEMBERS):
+            user = self.manager if index == 0 else User.objects.create_user(
+                username=f'membre{index}', password='x', phone_number=f'07000002{index:02d}'
+            )
+            member = TontineMember.objects.create(
+                tontine=self.tontine, user=user, status='active',
+                role='president' if index == 0 else 'member',
+            )
+            deposit_to_wallet(Wallet.objects.create(user=user), Decimal('5000'), note='Dépôt')
+            pay_contribution_from_wallet(user, self.tontine, member)
+            self.members.append(member)
+        # Ordre des bénéficiaires tiré comme à l'activation
+        rotation.start(self.tontine)
+        Vault.objects.create(owner=self.manager, name='Epargne')
+        self.client.login(username='gestion', password='password123')
+
+    def requests(self):
+        """(nom d'URL, args, méthode, données) pour chaque vue."""
+        tontine, member = self.tontine.id, self.members[1].id
+        return [
+            ('home', [], 'get', None),
+            ('accueil', [], 'get', None),
+            ('dashboard', [], 'get', None),
+            ('calendar', [], 'get', None),
+            ('calendar_feed', [ical.feed_token(self.manager.pk)], 'get', None),
+            ('profile', [], 'get', None),
+            ('profile_edit', [], 'get', None),
+            ('change_password', [], 'get', None),
+            ('password_change_done', [], 'get', None),
+            ('tontine_list', [], 'get', None),
+            ('tontine_create', [], 'get', None),
+            ('tontine_projection', [], 'get', {'members': '1000', 'contribution_amount': '5000', 'cycles': '100'}),
+            ('tontine_detail', [tontine], 'get', None),
+            ('tontine_edit', [tontine], 'get', None),
+            ('tontine_activate', [self.draft.id], 'post', {}),
+            ('tontine_manage', [tontine], 'get', None),
+            ('allocate_beneficiary', [tontine], 'post', {'member_id': member}),
+            ('tontine_invite', [tontine], 'post', {'username_or_email': 'inconnu'}),
+            ('tontine_join', [], 'post', {'code': 'DRAFT'}),
+            ('tontine_change_member_role', [tontine, member], 'json', {'role': 'treasurer'}),
+            ('tontine_change_member_status', [tontine, member], 'json', {'status': 'suspended'}),
+            ('tontine_remove_member', [tontine, member], 'post', {}),
+            ('tontine_contribute', [tontine], 'post', {}),
+            ('tontine_pay_wallet', [tontine], 'post', {}),
+            ('tontine_collect', [tontine], 'post', {}),
+            ('tontine_contributions', [tontine], 'get', None),
+            ('tontine_export', [tontine, 'contributions'], 'get', None),
+            ('tontine_contribution_stats', [tontine], 'get', {'bucket': 'week', 'days': '365'}),
+            ('wallet_deposit', [], 'get', None),
+            ('wallet_topup', [], 'post', {'amount': '1000'}),
+            ('wallet_overview', [], 'get', None),
+            ('wallet_transactions', [], 'get', None),
+            ('wallet_export', [], 'get', None),
+            ('vaults_overview', [], 'get', None),
+            ('vault_create', [], 'post', {'name': 'Coffre', 'amount': '500'}),
+            ('getmipay_webhook', [], 'webhook', {'event': 'payment.completed', 'transaction_id': 'TXN1'}),
+            ('logout', [], 'post', {}),
+            ('login', [], 'get', None),
+            ('register', [], 'get', None),
+        ]
+
+    def call(self, name, args, method, data):
+        url = reverse(name, args=args)
+        if method == 'json':
+            return self.client.post(url, json.dumps(data), content_type='application/json')
+        if method == 'webhook':
+            body = json.dumps(data).encode()
+            signature = hmac.new(settings.GETMIPAY_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+            return self.client.post(url, body, content_type='application/json', HTTP_X_SIGNATURE=signature)
+        response = getattr(self.client, method)(url, data)
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+        return response
+
+    def test_every_view_has_a_budget(self):
+        names = {p.name for p in get_resolver().url_patterns if isinstance(p, URLPattern) and p.name}
+        self.assertEqual(names - set(QUERY_BUDGETS), set())
+
+    def test_views_stay_within_query_budget(self):
+        for name, args, method, data in self.requests():
+            with self.subTest(view=name):
+                cache.clear()
+                # Chaque vue part du même état: ses écritures sont annulées ensuite
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as queries:
+                        response = self.call(name, args, method, data)
+                    transaction.set_rollback(True)
+                self.assertLess(response.status_code, 400)
+                self.assertLessEqual(
+                    len(queries), QUERY_BUDGETS[name],
+                    '\n'.join(query['sql'] for query in queries.captured_queries),
+                )
+
+    @override_settings(QUERY_INSTRUMENTATION=True)
+    def test_instrumentation_headers(self):
+        with self.assertLogs('config.instrumentation', level='INFO') as logs:
+            response = self.client.get(reverse('tontine_list'))
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        self.assertIn('X-Duplicate-Queries', response)
+        self.assertIn('tontine_list GET', logs.output[0])
+
+    def test_instrumentation_is_opt_in(self):
+        response = self.client.get(reverse('tontine_list'))
+        self.assertNotIn('X-Query-Count', response)
+
+
+class CalendarFeedTestCase(TestCase):
+    """Tests du flux iCalendar par utilisateur"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='agenda', password='x', phone_number='0700000400')
+        self.tontine = Tontine.objects.create(
+            name='Tontine Agenda', code='AGENDA', description='Test', manager=self.user,
+            start_date=timezone.localdate(), contribution_amount=Decimal('1000'), status='active',
+            meeting_schedule='Tous les samedis à 10h', meeting_location='Maison communautaire',
+        )
+        TontineMember.objects.create(tontine=self.tontine, user=self.user, status='active')
+        self.url = reverse('calendar_feed', args=[ical.feed_token(self.user.pk)])
+
+    def test_feed_lists_meetings_and_due_dates(self):
+        self.assertEqual(self.tontine.meeting_rule, 'FREQ=WEEKLY;BYDAY=SA;BYHOUR=10;BYMINUTE=0')
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertEqual(body.count('SUMMARY:Réunion Tontine Agenda'), len([
+            line for line in body.splitlines() if line.startswith('UID:reunion-')
+        ]))
+        self.assertGreaterEqual(body.count('SUMMARY:Réunion Tontine Agenda'), 12)
+        self.assertIn('SUMMARY:Cotisation Tontine Agenda', body)
+        self.assertIn('LOCATION:Maison communautaire', body)
+
+    def test_conditional_requests_are_served_from_cache(self):
+        response = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        cached = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+
+        self.tontine.meeting_schedule = 'Le premier dimanche du mois à 15h'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tontine.save()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+
+    def test_invalid_token_is_rejected(self):
+        self.assertEqual(self.client.get(reverse('calendar_feed', args=['1:forged'])).status_code, 404)
+
+
+class FragmentCacheTestCase(TestCase):
+    """Tests du cache des fragments des tableaux de bord"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='fragment', password='x', phone_number='0700000500')
+        self.tontine = Tontine.objects.create(
+            name='Tontine Fragment', code='FRAG', description='Test', manager=self.user,
+            start_date=timezone.localdate(), contribution_amount=Decimal('1000'), status='active',
+        )
+        self.member = TontineMember.objects.create(tontine=self.tontine, user=self.user, status='active')
+        deposit_to_wallet(Wallet.objects.create(user=self.user), Decimal('5000'), note='Dépôt')
+        self.client.login(username='fragment', password='x')
+
+    def test_cached_fragments_skip_queries_until_invalidated(self):
+        self.client.get(reverse('accueil'))
+        # Session et utilisateur seulement: les indicateurs viennent du cache
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('accueil'))
+        self.assertNotContains(response, '1000 FCFA')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        response = self.client.get(reverse('accueil'))
+        self.assertContains(response, '1000 FCFA')
+
+    def test_webhook_transition_invalidates_fragments(self):
+        # La transition est un UPDATE: aucun post_save ne supprime les fragments
+        wallet = Wallet.objects.get(user=self.user)
+        Transaction.objects.create(
+            user=self.user, wallet=wallet, amount=Decimal('2000'), type='deposit',
+            provider_reference='FRAG1', note='Dépôt en attente',
+        )
+        self.client.get(reverse('accueil'))
+        summaries.wallet_totals(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(getmipay_service.process_webhook('payment.completed', {'transaction_id': 'FRAG1'}))
+        self.assertIsNone(cache.get(fragments.FRAGMENT_KEY.format(self.user.pk, 'accueil-kpis')))
+        self.assertIsNone(cache.get(summaries.WALLET_TOTALS_KEY.format(self.user.pk)))
+
+    def test_stale_entry_is_served_while_one_request_refreshes(self):
+        calls = []
+        render = lambda: calls.append(1) or f'v{len(calls)}'
+        with self.settings(FRAGMENT_CACHE_TIMEOUT=-1):
+            self.assertEqual(fragments.cached(self.user.pk, 'dashboard-kpis', render), 'v1')
+        # Entrée périmée, verrou pris par une autre requête: l'ancienne version est servie
+        cache.add(fragments.LOCK_KEY.format(self.user.pk, 'dashboard-kpis'), 1)
+        self.assertEqual(fragments.cached(self.user.pk, 'dashboard-kpis', render), 'v1')
+        cache.delete(fragments.LOCK_KEY.format(self.user.pk, 'dashboard-kpis'))
+        self.assertEqual(fragments.cached(self.user.pk, 'dashboard-kpis', render), 'v2')
+        self.assertEqual(fragments.cached(self.user.pk, 'dashboard-kpis', render), 'v2')
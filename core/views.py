@@ -1,10 +1,19 @@
+import json
+
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, Q
-from tontines.models import Tontine, TontineMember
-from datetime import datetime, timedelta
-from tontines.models import Contribution
-from tontines.models import Tontine, Wallet, Vault
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from datetime import timedelta
+from tontines import feed, ical, recurrence, schedule
+from tontines.summaries import get_summary
+
+from .kpis import accueil_kpis, user_tontines
 
 # Create your views here.
 
@@ -12,47 +21,19 @@ def home(request):
     return render(request, 'home.html')
 
 
-@login_required
-def accueil_view(request):
-    """Vue d'accueil avec tableau de bord financier complet"""
-    user_tontines = Tontine.objects.filter(members__user=request.user).distinct()
-    
-    # KPIs et statistiques
-    total_tontines_count = user_tontines.count()
-    active_tontines_count = user_tontines.filter(status='active').count()
-    draft_count = user_tontines.filter(status='draft').count()
-    completed_count = user_tontines.filter(status='completed').count()
-    
-    # Total des contributions
-    total_contributed = TontineMember.objects.filter(
-        user=request.user, status='active'
-    ).aggregate(total=Sum('total_contributed'))['total'] or 0
-    
-    # Total du pot (somme des tontines)
-    total_pot = Tontine.objects.filter(members__user=request.user).aggregate(
-        total=Sum('total_pot')
-    )['total'] or 0
-    
-    # Nombre total de membres actifs dans les tontines de l'utilisateur
-    total_active_members = TontineMember.objects.filter(
-        tontine__in=user_tontines, status='active'
-    ).values('user').distinct().count()
-    
-    # Nombre total de contributions
-    total_contributions = Contribution.objects.filter(
-        tontine__in=user_tontines
-    ).count()
+def accueil_figures(user):
+    """Chiffres du tableau de bord d'accueil de `user`"""
+    # Tous les chiffres en deux requêtes (voir core/kpis.py)
+    kpis = accueil_kpis(user)
+    total_tontines_count = kpis['tontine_count']
+    active_tontines_count = kpis['active_count']
+    total_contributed = kpis['total_contributed']
+    total_pot = kpis['total_pot']
+    total_contributions = kpis['contribution_count']
     
     # Montant moyen par tontine
     average_pot = total_pot // max(total_tontines_count, 1)
     
-    # Données pour les graphiques
-    tontine_names = []
-    tontine_totals = []
-    for t in user_tontines[:10]:
-        tontine_names.append(f'"{t.name}"')
-        tontine_totals.append(t.total_pot or 0)
-    
     # Taux de participation (%)
     if total_tontines_count > 0:
         participation_rate = min(100, (active_tontines_count * 100) // total_tontines_count)
@@ -61,7 +42,7 @@ def accueil_view(request):
     
     # Taux de contribution (%)
     if total_pot > 0:
-        contribution_rate = min(100, (total_contributed * 100) // total_pot) if total_pot > 0 else 0
+        contribution_rate = min(100, (total_contributed * 100) // total_pot)
     else:
         contribution_rate = 0
     
@@ -74,142 +55,119 @@ def accueil_view(request):
     # Santé globale (moyenne des trois taux)
     health_rate = (participation_rate + contribution_rate + utilization_rate) // 3
     
-    # Portefeuille et coffres
-    try:
-        wallet = request.user.wallet
-        wallet_balance = wallet.balance or 0
-    except:
-        wallet_balance = 0
-    
-    vaults_total = Vault.objects.filter(owner=request.user).aggregate(
-        total=Sum('balance')
-    )['total'] or 0
-    
     # Prochaine échéance
-    next_due_label = 'Aucune'
-    try:
-        active_tontines = user_tontines.filter(status='active')
-        soon_days = None
-        for t in active_tontines:
-            start = t.start_date
-            if not start:
-                continue
-            today = datetime.utcnow().date()
-            if today < start:
-                diff = (start - today).days
-            else:
-                days_since = (today - start).days
-                cycle_days = t.cycle_duration or 30
-                cycles_passed = days_since // cycle_days
-                next_cycle = start + timedelta(days=(cycles_passed + 1) * cycle_days)
-                diff = (next_cycle - today).days
-            
-            if soon_days is None or diff < soon_days:
-                soon_days = diff
-        
-        if soon_days is not None:
-            if soon_days <= 1:
-                next_due_label = 'Bientôt'
-            else:
-                next_due_label = f'dans {soon_days}j'
-    except Exception:
-        next_due_label = 'N/A'
+    soon_days = kpis['next_due_in_days']
+    if soon_days is None:
+        next_due_label = 'Aucune'
+    elif soon_days <= 1:
+        next_due_label = 'Bientôt'
+    else:
+        next_due_label = f'dans {soon_days}j'
     
-    context = {
-        'user_tontines': user_tontines,
+    return {
+        'user_tontines': kpis['tontines'],
         'total_tontines_count': total_tontines_count,
         'active_tontines_count': active_tontines_count,
-        'draft_count': draft_count,
-        'completed_count': completed_count,
+        'draft_count': kpis['draft_count'],
+        'completed_count': kpis['completed_count'],
         'total_contributed': total_contributed,
         'total_pot': total_pot,
-        'total_active_members': total_active_members,
+        'total_active_members': kpis['active_members'],
         'total_contributions': total_contributions,
         'average_pot': average_pot,
         'participation_rate': participation_rate,
         'contribution_rate': contribution_rate,
         'utilization_rate': utilization_rate,
         'health_rate': health_rate,
-        'wallet_balance': wallet_balance,
-        'vaults_total': vaults_total,
         'next_due_label': next_due_label,
-        'tontine_names': '[' + ', '.join(tontine_names) + ']',
-        'tontine_totals': '[' + ', '.join(str(t) for t in tontine_totals) + ']',
+        'tontine_names': json.dumps([name for name, _ in kpis['chart']]),
+        'tontine_totals': '[' + ', '.join(str(total) for _, total in kpis['chart']) + ']',
         'active_count': active_tontines_count,
     }
-    return render(request, 'accueil.html', context)
 
 
 @login_required
-def dashboard(request):
+def accueil_view(request):
+    """Vue d'accueil avec tableau de bord financier complet"""
+    # Paresseux: calculé seulement si un fragment est absent du cache (voir tontines/fragments.py)
+    kpis = SimpleLazyObject(lambda: accueil_figures(request.user))
+    return render(request, 'accueil.html', {'kpis': kpis})
+
+
+def dashboard_figures(user):
+    """Indicateurs du tableau de bord de `user`"""
+    summary = get_summary(user)
+
     # Nombre de tontines dont l'utilisateur est membre
-    user_tontines_count = Tontine.objects.filter(members__user=request.user).distinct().count()
+    user_tontines_count = summary.tontine_count
 
     # Total contribué par l'utilisateur
-    total_contributed = TontineMember.objects.filter(user=request.user, status='active').aggregate(total=Sum('total_contributed'))['total'] or 0
+    total_contributed = summary.total_contributed
 
-    # Calculer prochaine échéance parmi les tontines actives de l'utilisateur
+    # Prochaine échéance parmi les tontines actives de l'utilisateur (colonne indexée, LIMIT 1)
     next_due_label = 'Aucune'
-    try:
-        active_tontines = Tontine.objects.filter(members__user=request.user, status='active').distinct()
-        soon_days = None
-        for t in active_tontines:
-            start = t.start_date
-            if not start:
-                continue
-            today = datetime.utcnow().date()
-            if today < start:
-                diff = (start - today).days
-            else:
-                days_since = (today - start).days
-                cycle_days = t.cycle_duration or 30
-                cycles_passed = days_since // cycle_days
-                next_cycle = start + timedelta(days=(cycles_passed + 1) * cycle_days)
-                diff = (next_cycle - today).days
-
-            if soon_days is None or diff < soon_days:
-                soon_days = diff
-
-        if soon_days is not None:
-            if soon_days <= 1:
-                next_due_label = 'bientôt'
-            else:
-                next_due_label = f'dans {soon_days} jours'
-    except Exception:
-        next_due_label = 'Aucune'
+    next_due = schedule.next_due_for(user)
+    if next_due:
+        soon_days = (next_due[1] - timezone.localdate()).days
+        if soon_days <= 1:
+            next_due_label = 'bientôt'
+        else:
+            next_due_label = f'dans {soon_days} jours'
 
-    context = {
-        'user': request.user,
+    return {
         'user_tontines_count': user_tontines_count,
         'total_contributed': total_contributed,
         'next_due_label': next_due_label,
-        'recent_contributions': Contribution.objects.filter(tontine__members__user=request.user).select_related('member__user','tontine').order_by('-created_at')[:6],
+    }
+
+
+@login_required
+def dashboard(request):
+    # Paresseux: évalués seulement si le fragment n'est pas en cache
+    context = {
+        'user': request.user,
+        'kpis': SimpleLazyObject(lambda: dashboard_figures(request.user)),
+        # Fil d'activité alimenté à l'écriture (voir tontines/feed.py)
+        'activities': SimpleLazyObject(lambda: feed.latest(request.user)),
     }
     return render(request, 'dashboard.html', context)
 
 
 @login_required
 def calendar_view(request):
-    from tontines.models import Tontine
-    upcoming = []
-    try:
-        active_tontines = Tontine.objects.filter(members__user=request.user, status='active').distinct()
-        today = datetime.utcnow().date()
-        for t in active_tontines:
-            if not t.start_date:
-                continue
-            days_since = (today - t.start_date).days if today >= t.start_date else (t.start_date - today).days
-            cycle_days = t.cycle_duration or 30
-            if today < t.start_date:
-                next_date = t.start_date
-            else:
-                cycles_passed = max(0, days_since // cycle_days)
-                next_date = t.start_date + timedelta(days=(cycles_passed + 1) * cycle_days)
-            days = (next_date - today).days
-            upcoming.append((t, next_date, days))
-        # sort by days
-        upcoming.sort(key=lambda x: x[2])
-    except Exception:
-        upcoming = []
-
-    return render(request, 'calendar.html', {'upcoming': upcoming})
\ No newline at end of file
+    # Échéances stockées (schedule.py): déjà triées par la base
+    today = timezone.localdate()
+    active_tontines = user_tontines(request.user).filter(
+        status='active', next_due_date__isnull=False
+    ).order_by('next_due_date')
+    upcoming = [(t, t.next_due_date, (t.next_due_date - today).days) for t in active_tontines]
+
+    # Prochaine réunion de chaque tontine dont le calendrier a été reconnu (voir recurrence.py)
+    meetings = []
+    for t, _, _ in upcoming:
+        if t.meeting_rule:
+            day = next(recurrence.occurrences(t.meeting_rule, t.start_date, today, today + timedelta(days=62)), None)
+            if day:
+                meetings.append((t, day, recurrence.meeting_time(t.meeting_rule)))
+    meetings.sort(key=lambda meeting: meeting[1])
+    feed_url = request.build_absolute_uri(reverse('calendar_feed', args=[ical.feed_token(request.user.pk)]))
+
+    return render(request, 'calendar.html', {'upcoming': upcoming, 'meetings': meetings, 'feed_url': feed_url})
+
+
+@require_safe
+def calendar_feed_view(request, token):
+    """Flux .ics de l'utilisateur du jeton: servi depuis le cache, 304 si le client est à jour."""
+    user_id = ical.user_for_token(token)
+    if user_id is None:
+        raise Http404
+    feed = ical.user_feed(user_id)
+    last_modified = int(feed['last_modified'].timestamp())
+    response = get_conditional_response(request, etag=feed['etag'], last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(feed['body'], content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="tontines.ics"'
+    response['ETag'] = feed['etag']
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, max-age=300'
+    return response
\ No newline at end of file
@@ -5,6 +5,9 @@
 echo "Running Django migrations..."
 python manage.py migrate
 
+echo "Creating cache table..."
+python manage.py createcachetable
+
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
@@ -5,7 +5,11 @@ from .models import Tontine, TontineMember
 
 @admin.register(Tontine)
 class TontineAdmin(admin.ModelAdmin):
-    list_display = ('name', 'code', 'manager', 'status', 'total_pot', 'created_at')
+    list_display = (
+        'name', 'code', 'manager', 'status', 'total_pot', 'active_member_count', 'pending_member_count',
+        'contribution_count', 'last_contribution_at', 'created_at',
+    )
+    list_select_related = ('manager',)
     list_filter = ('status',)
     search_fields = ('name', 'code', 'manager__username')
 
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TontinesConfig(AppConfig):
     name = 'tontines'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,30 @@
+"""
+Base jetable des commandes de benchmark (bench_wallet_payments,
+bench_pot_counters): elles écrivent en masse, depuis plusieurs threads, et ne
+doivent jamais toucher la base configurée. Réservées au développement.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection
+
+
+@contextmanager
+def scratch_database(name):
+    """Créer une base de test (comme manage.py test) le temps du bloc, puis la détruire."""
+    if not settings.DEBUG:
+        raise CommandError('Benchmark réservé au développement (DEBUG=True).')
+    if connection.vendor == 'sqlite' and not connection.settings_dict['TEST']['NAME']:
+        # Fichier plutôt que mémoire: verrouillage réel de la base entre les threads
+        connection.settings_dict['TEST']['NAME'] = os.path.join(
+            tempfile.gettempdir(), f'{name}_{os.getpid()}.sqlite3'
+        )
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,105 @@
+"""
+Collecte groupée d'un cycle: prélever la contribution de tous les membres
+actifs d'une tontine en une seule passe.
+
+Le nombre de requêtes ne dépend pas du nombre de membres mais du nombre de
+lots (batch_size): verrouillage des wallets, débits et totaux des membres en
+UPDATE groupés, Transaction / Contribution / écritures du grand livre en
+bulk_create, puis une seule mise à jour du pot de la tontine.
+Même ordre de verrouillage que payments.py: Wallet -> TontineMember -> Tontine.
+Les membres sont lus et verrouillés dans la transaction: un membre désactivé
+pendant la collecte n'est pas prélevé.
+"""
+
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+
+from . import counters, feed, fragments, ledger, rollups, summaries
+from .models import Contribution, LedgerEntry, TontineMember, Transaction, Wallet
+from .payments import PaymentError
+
+CollectionResult = namedtuple('CollectionResult', 'paid insufficient total')
+
+
+class CollectionConflict(PaymentError):
+    """Un solde a changé pendant la collecte: rien n'a été prélevé."""
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def collect_cycle(tontine, batch_size=1000, dry_run=False):
+    """
+    Prélever `contribution_amount` sur le porte-monnaie de chaque membre actif.
+
+    Les membres sans porte-monnaie ou au solde insuffisant ne sont pas débités
+    et sont retournés dans `insufficient` [(member, solde)].
+    Retourne CollectionResult(paid=[member], insufficient=[...], total=Decimal).
+    """
+    amount = Decimal(tontine.contribution_amount)
+    active = TontineMember.objects.filter(tontine=tontine, status='active')
+
+    with transaction.atomic():
+        # Verrouiller les wallets dans l'ordre des ids (ordre global constant), puis les adhésions
+        wallets = {
+            user_id: (wallet_id, balance)
+            for wallet_id, user_id, balance in (
+                Wallet.objects.select_for_update().filter(user_id__in=active.values('user_id'))
+                .order_by('id').values_list('id', 'user_id', 'balance')
+            )
+        }
+        members = list(active.select_for_update(of=('self',)).select_related('user').order_by('user_id'))
+
+        paid, insufficient = [], []
+        for member in members:
+            wallet_id, balance = wallets.get(member.user_id, (None, Decimal('0')))
+            if wallet_id is not None and balance >= amount:
+                paid.append((member, wallet_id))
+            else:
+                insufficient.append((member, balance))
+
+        total = amount * len(paid)
+        if dry_run or not paid:
+            return CollectionResult([m for m, _ in paid], insufficient, total)
+
+        for chunk in _chunks(paid, batch_size):
+            wallet_ids = [wallet_id for _, wallet_id in chunk]
+            debited = Wallet.objects.filter(id__in=wallet_ids, balance__gte=amount).update(
+                balance=F('balance') - amount
+            )
+            if debited != len(wallet_ids):
+                raise CollectionConflict('Un solde a changé pendant la collecte, veuillez réessayer.')
+            updated = TontineMember.objects.filter(id__in=[m.id for m, _ in chunk], status='active').update(
+                total_contributed=F('total_contributed') + amount
+            )
+            if updated != len(chunk):
+                raise CollectionConflict('Un membre a changé de statut pendant la collecte, veuillez réessayer.')
+
+        note = f'Paiement contribution tontine {tontine.id} (collecte du cycle)'
+        transactions = Transaction.objects.bulk_create(
+            [Transaction(user_id=m.user_id, wallet_id=wallet_id, amount=amount, type='payment', status='completed',
+                         note=note)
+             for m, wallet_id in paid],
+            batch_size=batch_size,
+        )
+        contributions = Contribution.objects.bulk_create(
+            [Contribution(tontine=tontine, member=m, amount=amount) for m, _ in paid],
+            batch_size=batch_size,
+        )
+        for chunk in _chunks(paid, batch_size):
+            summaries.adjust([m.user_id for m, _ in chunk], total_contributed=amount)
+        rollups.add(tontine.pk, len(paid), total)
+        pot = ledger.tontine_account(tontine)
+        ledger.post(
+            (ledger.Account(LedgerEntry.WALLET, wallet_id, m.user_id), pot, amount, txn)
+            for (m, wallet_id), txn in zip(paid, transactions)
+        )
+        counters.add_contributions(tontine, len(contributions), total, contributions[-1].created_at)
+        fragments.invalidate(feed.publish(tontine.pk, 'collection', amount=total))
+
+    return CollectionResult([m for m, _ in paid], insufficient, total)
@@ -0,0 +1,196 @@
+"""
+Compteurs dénormalisés de Tontine: membres actifs, membres en attente,
+nombre de contributions et date de la dernière contribution.
+
+Les listes et pages de tontines les lisent sur la ligne de la tontine au lieu
+de compter TontineMember et Contribution à chaque requête. Ils sont tenus à
+jour par des UPDATE atomiques (F()):
+  - membres: à chaque adhésion, changement de statut (approbation, suspension)
+    ou retrait (signaux, voir signals.py; le statut chargé est mémorisé par
+    TontineMember.from_db, sans requête supplémentaire). Un retrait supprime
+    aussi les contributions du membre: elles sont décomptées dans le même UPDATE,
+    après report des fractions de la tontine;
+  - contributions: avec le pot, dans record_contribution et la collecte de
+    cycle (add_contributions).
+rebuild() (commande rebuild_tontine_counters) les recalcule depuis les tables
+sources, par exemple après un import groupé ou une modification directe en base.
+
+Tontines fractionnées (Tontine.counter_shards > 0): chaque paiement met à jour
+la ligne de la tontine, que tous les payeurs simultanés se disputent. Pour une
+tontine très sollicitée, le pot, le nombre et la date des contributions sont
+écrits dans une de ses N fractions (TontineCounterShard) tirée au hasard: les
+écritures concurrentes se répartissent sur N lignes. Les fractions sont
+additionnées à la lecture (read) et reportées sur la ligne de la tontine par
+fold() avant une attribution du pot et par la commande fold_counter_shards;
+les totaux agrégés sur plusieurs tontines voient la valeur reportée.
+Les totaux par membre (TontineMember.total_contributed) restent sur la ligne
+de chaque membre: un payeur ne la dispute qu'à lui-même.
+"""
+
+import random
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Contribution, Tontine, TontineCounterShard, TontineMember
+
+STATUS_FIELDS = {
+    'active': 'active_member_count',
+    'pending': 'pending_member_count',
+}
+COUNTER_FIELDS = ('active_member_count', 'pending_member_count', 'contribution_count', 'last_contribution_at')
+
+
+def move_member(tontine_id, old_status=None, new_status=None):
+    """Déplacer un membre d'un compteur de statut à l'autre (None: adhésion ou retrait)."""
+    deltas = {}
+    if old_status in STATUS_FIELDS:
+        deltas[STATUS_FIELDS[old_status]] = F(STATUS_FIELDS[old_status]) - 1
+    if new_status in STATUS_FIELDS:
+        deltas[STATUS_FIELDS[new_status]] = F(STATUS_FIELDS[new_status]) + 1
+    if old_status != new_status and deltas:
+        Tontine.objects.filter(pk=tontine_id).update(**deltas)
+
+
+def remove_member(member):
+    """Retirer un membre (avant sa suppression): son compteur de statut et ses contributions."""
+    # Contributions encore dans les fractions: reportées d'abord, sinon le compteur passerait sous zéro
+    _fold(member.tontine_id)
+    status = getattr(member, '_loaded_status', member.status)
+    deltas = {'contribution_count': F('contribution_count') - Coalesce(
+        Subquery(Contribution.objects.filter(member_id=member.pk).order_by().values('member')
+                 .annotate(value=Count('pk')).values('value')),
+        Value(0),
+    )}
+    if status in STATUS_FIELDS:
+        deltas[STATUS_FIELDS[status]] = F(STATUS_FIELDS[status]) - 1
+    Tontine.objects.filter(pk=member.tontine_id).update(**deltas)
+
+
+def add_contributions(tontine, count, total, created_at):
+    """
+    Ajouter `count` contributions pour `total` au pot de la tontine: sur sa
+    ligne, ou sur une de ses fractions tirée au hasard.
+    """
+    deltas = {
+        'total_pot': F('total_pot') + total,
+        'contribution_count': F('contribution_count') + count,
+        'last_contribution_at': created_at,
+    }
+    if not tontine.counter_shards:
+        Tontine.objects.filter(pk=tontine.pk).update(**deltas)
+        return
+    shard = random.randrange(tontine.counter_shards)
+    rows = TontineCounterShard.objects.filter(tontine_id=tontine.pk, shard=shard)
+    if rows.update(**deltas):
+        return
+    try:
+        with transaction.atomic():
+            TontineCounterShard.objects.create(
+                tontine_id=tontine.pk, shard=shard, total_pot=total, contribution_count=count,
+                last_contribution_at=created_at,
+            )
+    except IntegrityError:
+        # Fraction créée entre-temps par une transaction concurrente
+        rows.update(**deltas)
+
+
+def _pending(shards):
+    return shards.aggregate(
+        total_pot=Sum('total_pot'), contribution_count=Sum('contribution_count'),
+        last_contribution_at=Max('last_contribution_at'),
+    )
+
+
+def read(tontine):
+    """
+    Ajouter au pot et aux compteurs de `tontine` (instance) ce que ses fractions
+    n'ont pas encore reporté. Sans requête pour une tontine non fractionnée.
+    """
+    if tontine.counter_shards:
+        pending = _pending(TontineCounterShard.objects.filter(tontine_id=tontine.pk))
+        tontine.total_pot += pending['total_pot'] or 0
+        tontine.contribution_count += pending['contribution_count'] or 0
+        if pending['last_contribution_at'] and (
+            tontine.last_contribution_at is None or pending['last_contribution_at'] > tontine.last_contribution_at
+        ):
+            tontine.last_contribution_at = pending['last_contribution_at']
+    return tontine
+
+
+def _fold(tontine_id):
+    """fold(), dans la transaction en cours (une seule requête quand il n'y a rien à reporter)."""
+    shards = TontineCounterShard.objects.select_for_update().filter(tontine_id=tontine_id, contribution_count__gt=0)
+    ids = list(shards.values_list('pk', flat=True))
+    if not ids:
+        return 0
+    pending = _pending(TontineCounterShard.objects.filter(pk__in=ids))
+    latest = Value(pending['last_contribution_at'])
+    Tontine.objects.filter(pk=tontine_id).update(
+        total_pot=F('total_pot') + pending['total_pot'],
+        contribution_count=F('contribution_count') + pending['contribution_count'],
+        last_contribution_at=Greatest(Coalesce('last_contribution_at', latest), latest),
+    )
+    TontineCounterShard.objects.filter(pk__in=ids).update(
+        total_pot=0, contribution_count=0, last_contribution_at=None,
+    )
+    return pending['total_pot']
+
+
+def fold(tontine_id):
+    """Reporter les fractions d'une tontine sur sa ligne et les remettre à zéro. Retourne le montant reporté."""
+    with transaction.atomic():
+        return _fold(tontine_id)
+
+
+def fold_all():
+    """Reporter les fractions de toutes les tontines. Retourne le nombre de tontines reportées."""
+    tontine_ids = TontineCounterShard.objects.filter(contribution_count__gt=0).values_list(
+        'tontine_id', flat=True,
+    ).distinct().order_by('tontine_id')
+    return sum(1 for tontine_id in list(tontine_ids) if fold(tontine_id))
+
+
+def pending_pots(locked_tontine_id=None):
+    """
+    {tontine_id: montant} des fractions non reportées (toutes les tontines), ou
+    le montant d'une seule tontine, fractions verrouillées, si `locked_tontine_id`.
+    """
+    shards = TontineCounterShard.objects.filter(contribution_count__gt=0)
+    if locked_tontine_id is not None:
+        return sum(shards.select_for_update().filter(tontine_id=locked_tontine_id).values_list('total_pot', flat=True))
+    return dict(shards.order_by().values('tontine_id').annotate(total=Sum('total_pot')).values_list('tontine_id', 'total'))
+
+
+def _per_tontine(queryset, aggregate):
+    return Subquery(
+        queryset.filter(tontine=OuterRef('pk')).order_by().values('tontine').annotate(value=aggregate).values('value')
+    )
+
+
+def rebuild(tontine_ids=None, batch_size=1000):
+    """Recalculer les compteurs (toutes les tontines, ou `tontine_ids`), par lots d'ids. Retourne le nombre de tontines."""
+    members = TontineMember.objects.all()
+    counters = {
+        field: Coalesce(_per_tontine(members.filter(status=status), Count('pk')), Value(0))
+        for status, field in STATUS_FIELDS.items()
+    }
+    # Les contributions encore dans les fractions y restent (reportées par fold)
+    counters['contribution_count'] = (
+        Coalesce(_per_tontine(Contribution.objects.all(), Count('pk')), Value(0))
+        - Coalesce(_per_tontine(TontineCounterShard.objects.all(), Sum('contribution_count')), Value(0))
+    )
+    counters['last_contribution_at'] = Subquery(
+        Contribution.objects.filter(tontine=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+    )
+    tontines = Tontine.objects.order_by('pk').values_list('pk', flat=True)
+    if tontine_ids is not None:
+        tontines = tontines.filter(pk__in=tontine_ids)
+    last_id, count = 0, 0
+    while True:
+        batch = list(tontines.filter(pk__gt=last_id)[:batch_size])
+        if not batch:
+            return count
+        count += Tontine.objects.filter(pk__in=batch).update(**counters)
+        last_id = batch[-1]
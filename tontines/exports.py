@@ -0,0 +1,102 @@
+"""
+Exports en flux (CSV / JSONL) des relevés de porte-monnaie et des tontines.
+
+Les lignes sont lues par paquets avec QuerySet.iterator() (curseur côté
+serveur sous PostgreSQL) et écrites directement dans la réponse: la mémoire
+reste constante quel que soit le nombre de lignes exportées.
+"""
+
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# (en-tête, champ values_list) par type d'export
+TRANSACTION_COLUMNS = (
+    ('id', 'id'),
+    ('date', 'created_at'),
+    ('type', 'type'),
+    ('statut', 'status'),
+    ('montant', 'amount'),
+    ('coffre', 'vault__name'),
+    ('note', 'note'),
+)
+CONTRIBUTION_COLUMNS = (
+    ('id', 'id'),
+    ('date', 'created_at'),
+    ('membre', 'member__user__username'),
+    ('nom', 'member__user__last_name'),
+    ('prenom', 'member__user__first_name'),
+    ('montant', 'amount'),
+)
+ALLOCATION_COLUMNS = (
+    ('id', 'id'),
+    ('date', 'allocated_date'),
+    ('cycle', 'cycle_number'),
+    ('membre', 'member__user__username'),
+    ('nom', 'member__user__last_name'),
+    ('prenom', 'member__user__first_name'),
+    ('montant', 'amount'),
+)
+
+
+class ExportError(ValueError):
+    pass
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer: renvoie la ligne au lieu de la stocker."""
+
+    def write(self, value):
+        return value
+
+
+def parse_filters(request, date_field='created_at'):
+    """Filtres de période (?start=AAAA-MM-JJ&end=AAAA-MM-JJ, bornes incluses)."""
+    filters = {}
+    for param, lookup, shift in (('start', 'gte', 0), ('end', 'lt', 1)):
+        value = request.GET.get(param)
+        if not value:
+            continue
+        try:
+            # parse_date: None si mal formée, ValueError si inexistante (2024-02-30)
+            day = parse_date(value)
+            if day is None:
+                raise ValueError
+            # Bornes en datetime pour rester sur l'index (pas de __date)
+            bound = timezone.make_aware(datetime.combine(day + timedelta(days=shift), time.min))
+        except (ValueError, OverflowError):
+            raise ExportError(f'Date invalide pour {param}: {value} (format AAAA-MM-JJ).')
+        filters[f'{date_field}__{lookup}'] = bound
+    return filters
+
+
+def _rows(queryset, columns, fmt):
+    headers = [header for header, _ in columns]
+    values = queryset.values_list(*[field for _, field in columns]).iterator(chunk_size=CHUNK_SIZE)
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(headers)
+        for row in values:
+            yield writer.writerow(row)
+    else:
+        for row in values:
+            yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def export_response(queryset, columns, fmt, filename):
+    if fmt not in FORMATS:
+        raise ExportError(f"Format inconnu: {fmt} (csv ou jsonl).")
+    response = StreamingHttpResponse(_rows(queryset, columns, fmt), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
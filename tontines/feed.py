@@ -0,0 +1,107 @@
+"""
+Fil d'activité des tableaux de bord, alimenté à l'écriture (fan-out on write).
+
+Chaque événement d'une tontine (contribution, collecte, attribution,
+adhésion, départ) est copié, en un bulk_create, dans le fil de chacun de ses
+membres: la lecture du tableau de bord devient un parcours d'index
+(user, created_at) limité aux N derniers éléments, au lieu d'une jointure
+contributions x adhésions.
+
+Au-delà de ACTIVITY_FANOUT_LIMIT membres, copier chaque événement coûterait
+trop cher: il est écrit une seule fois sans utilisateur et lu à la demande
+(fan-out on read) par les membres, via l'index partiel (tontine, created_at).
+
+Les événements sont publiés par les signaux (signals.py) et, pour les
+chemins groupés, explicitement (collect_cycle). backfill() reconstitue le
+fil depuis les dernières contributions (commande rebuild_activity_feed).
+
+Chaque contribution ajoute jusqu'à ACTIVITY_FANOUT_LIMIT lignes: prune()
+(commande prune_activity_feed, à lancer chaque jour) supprime celles de plus
+de ACTIVITY_RETENTION_DAYS jours, par lots, pour que la table et ses index
+restent bornés. Le tableau de bord n'en montre que les LATEST dernières.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ActivityFeedItem, Contribution, Tontine, TontineMember
+
+LATEST = 6
+
+
+def _audience(tontine_id):
+    return list(TontineMember.objects.filter(tontine_id=tontine_id).values_list('user_id', flat=True))
+
+
+def _fan_out(user_ids, events):
+    """Lignes ActivityFeedItem d'événements (dicts) pour une audience: une par membre, ou une partagée."""
+    if len(user_ids) > settings.ACTIVITY_FANOUT_LIMIT:
+        return [ActivityFeedItem(user_id=None, **event) for event in events]
+    return [ActivityFeedItem(user_id=user_id, **event) for event in events for user_id in user_ids]
+
+
+def publish(tontine_id, kind, actor_id=None, amount=None, created_at=None):
+    """
+    Publier un événement dans le fil des membres de la tontine.
+    Retourne les identifiants des membres (pour invalider leurs caches).
+    """
+    user_ids = _audience(tontine_id)
+    event = {
+        'tontine_id': tontine_id, 'kind': kind, 'actor_id': actor_id, 'amount': amount,
+        'created_at': created_at or timezone.now(),
+    }
+    ActivityFeedItem.objects.bulk_create(_fan_out(user_ids, [event]), batch_size=1000)
+    return user_ids
+
+
+def latest(user, limit=LATEST):
+    """Les `limit` derniers événements des tontines de `user` (son fil + fils partagés des grandes tontines)."""
+    own = ActivityFeedItem.objects.filter(user=user)
+    shared = ActivityFeedItem.objects.filter(
+        user__isnull=True, tontine_id__in=TontineMember.objects.filter(user=user).values('tontine_id'),
+    )
+    items = []
+    for queryset in (own, shared):
+        items.extend(queryset.select_related('actor', 'tontine').order_by('-created_at', '-id')[:limit])
+    items.sort(key=lambda item: (item.created_at, item.pk), reverse=True)
+    return items[:limit]
+
+
+def backfill(tontine_ids=None, per_tontine=20, batch_size=1000):
+    """Reconstituer le fil depuis les `per_tontine` dernières contributions de chaque tontine. Retourne le nombre de lignes."""
+    tontines = Tontine.objects.order_by('pk').values_list('pk', flat=True)
+    if tontine_ids is not None:
+        tontines = tontines.filter(pk__in=tontine_ids)
+    created = 0
+    for tontine_id in tontines.iterator():
+        contributions = Contribution.objects.filter(tontine_id=tontine_id).order_by('-created_at', '-id').values(
+            'member__user_id', 'amount', 'created_at',
+        )[:per_tontine]
+        events = [
+            {'tontine_id': tontine_id, 'kind': 'contribution', 'actor_id': row['member__user_id'],
+             'amount': row['amount'], 'created_at': row['created_at']}
+            for row in contributions
+        ]
+        if events:
+            created += len(ActivityFeedItem.objects.bulk_create(
+                _fan_out(_audience(tontine_id), events), batch_size=batch_size,
+            ))
+    return created
+
+
+def prune(older_than=None, batch_size=1000):
+    """
+    Supprimer les éléments créés avant `older_than` (par défaut: il y a
+    ACTIVITY_RETENTION_DAYS jours), par lots de `batch_size` dans l'ordre de
+    l'index (created_at, id). Retourne le nombre d'éléments supprimés.
+    """
+    older_than = older_than or timezone.now() - timedelta(days=settings.ACTIVITY_RETENTION_DAYS)
+    stale = ActivityFeedItem.objects.filter(created_at__lt=older_than).order_by('created_at', 'id')
+    deleted = 0
+    while True:
+        ids = list(stale.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += ActivityFeedItem.objects.filter(pk__in=ids).delete()[0]
@@ -1,5 +1,6 @@
 from django import forms
 from .models import Tontine
+from .projection import MAX_CYCLE_DURATION, MAX_CYCLES, MAX_MEMBERS
 from django.utils import timezone
 import re
 
@@ -7,7 +8,8 @@ class TontineCreationForm(forms.ModelForm):
     class Meta:
         model = Tontine
         fields = ('name', 'code', 'description', 'contribution_amount', 
-                  'start_date', 'end_date', 'meeting_schedule', 'meeting_location', 'cycle_duration')
+                  'start_date', 'end_date', 'meeting_schedule', 'meeting_location', 'cycle_duration',
+                  'rotation_method')
         widgets = {
             'name': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -50,11 +52,13 @@ class TontineCreationForm(forms.ModelForm):
                 'min': '1',
                 'value': '30'
             }),
+            'rotation_method': forms.Select(attrs={'class': 'form-select'}),
         }
         labels = {
             'cycle_duration': 'Durée du cycle (jours)',
             'meeting_schedule': 'Calendrier des réunions',
             'meeting_location': 'Lieu des réunions',
+            'rotation_method': 'Ordre des bénéficiaires',
         }
         help_texts = {
             'cycle_duration': 'Durée entre chaque contribution (ex: 30 jours pour mensuel)',
@@ -94,4 +98,40 @@ class TontineCreationForm(forms.ModelForm):
             if end_date <= start_date:
                 raise forms.ValidationError('La date de fin doit être après la date de début.')
         
-        return end_date
\ No newline at end of file
+        return end_date
+
+
+class ProjectionForm(forms.Form):
+    """Paramètres d'une projection des flux (voir projection.py)"""
+    members = forms.IntegerField(
+        label='Nombre de membres', min_value=2, max_value=MAX_MEMBERS, initial=10,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+    contribution_amount = forms.DecimalField(
+        label='Contribution (FCFA)', min_value=100, max_digits=10, decimal_places=2, initial=5000,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+    cycle_duration = forms.IntegerField(
+        label='Durée du cycle (jours)', min_value=1, max_value=MAX_CYCLE_DURATION, initial=30, required=False,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+    start_date = forms.DateField(
+        label='Date de début', required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+    )
+    cycles = forms.IntegerField(
+        label='Nombre de cycles', min_value=1, max_value=MAX_CYCLES, required=False,
+        help_text=f'Par défaut, un tour complet (un cycle par membre), au plus {MAX_CYCLES}',
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+    rotation_method = forms.ChoiceField(
+        label='Ordre des bénéficiaires', choices=Tontine.ROTATION_CHOICES, initial='fixed', required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        members = cleaned_data.get('members')
+        if members and not cleaned_data.get('cycles'):
+            cleaned_data['cycles'] = min(members, MAX_CYCLES)
+        return cleaned_data
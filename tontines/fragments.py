@@ -0,0 +1,59 @@
+"""
+Cache par utilisateur des fragments des tableaux de bord (cartes d'indicateurs,
+graphiques, dernières contributions), rendus par la balise {% userfragment %}
+(core/templatetags/fragments.py).
+
+Une entrée reste fraîche FRAGMENT_CACHE_TIMEOUT secondes, puis peut encore être
+servie périmée pendant FRAGMENT_CACHE_STALE secondes: la première requête qui
+la trouve périmée prend un verrou (cache.add) et la recalcule, les autres
+continuent de servir l'ancienne version. Une expiration ne déclenche donc
+jamais un recalcul simultané par tous les visiteurs.
+
+Les entrées sont supprimées, après commit, quand les données changent
+(signaux sur Contribution, Transaction, TontineMember et Vault, voir
+signals.py; les chemins groupés appellent invalidate_tontine() eux-mêmes).
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import TontineMember
+
+FRAGMENTS = ('accueil-kpis', 'accueil-charts', 'dashboard-kpis', 'dashboard-activity')
+FRAGMENT_KEY = 'fragment:{}:{}'
+LOCK_KEY = 'fragment-lock:{}:{}'
+LOCK_TIMEOUT = 30
+
+
+def cached(user_id, name, render):
+    """HTML du fragment `name` de l'utilisateur: depuis le cache, sinon `render()`."""
+    key = FRAGMENT_KEY.format(user_id, name)
+    entry = cache.get(key)
+    now = time.time()
+    if entry is not None:
+        html, fresh_until = entry
+        if now < fresh_until or not cache.add(LOCK_KEY.format(user_id, name), 1, LOCK_TIMEOUT):
+            return html
+    html = render()
+    cache.set(
+        key, (html, now + settings.FRAGMENT_CACHE_TIMEOUT),
+        settings.FRAGMENT_CACHE_TIMEOUT + settings.FRAGMENT_CACHE_STALE,
+    )
+    if entry is not None:
+        cache.delete(LOCK_KEY.format(user_id, name))
+    return html
+
+
+def invalidate(user_ids):
+    """Supprimer les fragments des utilisateurs une fois la transaction validée."""
+    keys = [FRAGMENT_KEY.format(user_id, name) for user_id in set(user_ids) for name in FRAGMENTS]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_tontine(tontine_id):
+    """Supprimer les fragments de tous les membres d'une tontine (pot, contributions récentes)."""
+    invalidate(TontineMember.objects.filter(tontine_id=tontine_id).values_list('user_id', flat=True))
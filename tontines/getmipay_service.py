@@ -1,28 +1,122 @@
 """
 Service d'intégration GetMiPay pour les paiements mobiles et les retraits.
 GetMiPay est un agrégateur de paiements qui supporte Wave, Orange Money, Moov, MTN, et Visa.
+
+Les appels passent par une session HTTP partagée entre les threads (get_session):
+les connexions au fournisseur restent ouvertes (keep-alive) dans un pool borné
+(GETMIPAY_POOL_SIZE, un thread attend une connexion libre plutôt que d'en ouvrir
+une de plus), au lieu d'une poignée de main TCP et TLS par appel. Les délais de
+connexion et de lecture sont distincts. Les nouvelles tentatives attendent de
+plus en plus longtemps, avec un aléa (GETMIPAY_MAX_RETRIES, GETMIPAY_BACKOFF_FACTOR):
+une erreur de connexion est toujours retentée (rien n'a été envoyé), une erreur
+de lecture ou une réponse 429/502/503/504 seulement pour les méthodes
+idempotentes, jamais pour un POST d'initiation qui pourrait être doublé.
+La durée de chaque appel est journalisée et agrégée par point d'accès (metrics).
 """
 
 import requests
 import json
 import hashlib
 import hmac
+import threading
+import time
+from decimal import Decimal
 from django.conf import settings
+from django.db import transaction as db_transaction
 from django.utils import timezone
+from . import fragments, ledger, summaries
 from .models import Transaction, Wallet
+from .payments import credit_wallet, debit_wallet, transition
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 
 logger = logging.getLogger(__name__)
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    retry = Retry(
+        total=settings.GETMIPAY_MAX_RETRIES,
+        backoff_factor=settings.GETMIPAY_BACKOFF_FACTOR,
+        backoff_jitter=settings.GETMIPAY_BACKOFF_FACTOR,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1, pool_maxsize=settings.GETMIPAY_POOL_SIZE, pool_block=True, max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """Session HTTP partagée (pool de connexions, nouvelles tentatives), créée au premier appel."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+class LatencyMetrics:
+    """Durée des appels à GetMiPay par point d'accès: nombre, erreurs, moyenne et maximum (ms)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, seconds, status):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['calls'] += 1
+            stats['errors'] += status is None or status >= 400
+            stats['total_ms'] += seconds * 1000
+            stats['max_ms'] = max(stats['max_ms'], seconds * 1000)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: {**stats, 'avg_ms': stats['total_ms'] / stats['calls']}
+                for endpoint, stats in self._endpoints.items()
+            }
+
+
+metrics = LatencyMetrics()
+
 
 class GetMiPayService:
     """Service pour gérer les transactions GetMiPay"""
     
+    # Événement -> (nouveau statut, créditer le porte-monnaie du montant)
+    WEBHOOK_TRANSITIONS = {
+        'payment.completed': ('completed', True),
+        'payment.failed': ('failed', False),
+        'payout.completed': ('completed', False),
+        'payout.failed': ('refunded', True),
+    }
+    # Famille d'événement -> type de la transaction qu'il peut modifier
+    EVENT_TRANSACTION_TYPES = {
+        'payment': 'deposit',
+        'payout': 'withdraw',
+    }
+    
     def __init__(self):
         self.api_key = settings.GETMIPAY_API_KEY
         self.secret_key = settings.GETMIPAY_SECRET_KEY
         self.api_url = settings.GETMIPAY_API_URL
-        self.webhook_secret = settings.GETMIPAY_WEBHOOK_SECRET
+        self.timeout = (settings.GETMIPAY_CONNECT_TIMEOUT, settings.GETMIPAY_READ_TIMEOUT)
+    
+    @property
+    def webhook_secret(self):
+        # Lu à chaque appel (settings), pas figé à la création du singleton
+        return settings.GETMIPAY_WEBHOOK_SECRET
     
     def _generate_signature(self, data):
         """Générer une signature HMAC pour sécuriser les requêtes"""
@@ -42,6 +136,21 @@ class GetMiPayService:
             'User-Agent': 'TontinePro/1.0'
         }
     
+    def _post(self, path, payload):
+        """POST vers l'API par la session partagée, durée journalisée et agrégée dans `metrics`."""
+        status = None
+        start = time.perf_counter()
+        try:
+            response = get_session().post(
+                f'{self.api_url}{path}', json=payload, headers=self._get_headers(), timeout=self.timeout,
+            )
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.record(path, elapsed, status)
+            logger.info('GetMiPay POST %s status=%s ms=%.1f', path, status, elapsed * 1000)
+    
     def initiate_deposit(self, user, amount, phone_number, method='wave'):
         """
         Initier un dépôt (recharge porte-monnaie).
@@ -71,12 +180,7 @@ class GetMiPayService:
             signature = self._generate_signature(payload)
             payload['signature'] = signature
             
-            response = requests.post(
-                f'{self.api_url}/v1/payments/initiate',
-                json=payload,
-                headers=self._get_headers(),
-                timeout=10
-            )
+            response = self._post('/v1/payments/initiate', payload)
             response.raise_for_status()
             
             data = response.json()
@@ -87,8 +191,10 @@ class GetMiPayService:
                 transaction = Transaction.objects.create(
                     user=user,
                     wallet=wallet,
-                    amount=float(amount),
+                    amount=Decimal(str(amount)),
                     type='deposit',
+                    status='pending',
+                    provider_reference=data.get('transaction_id'),
                     note=f'Dépôt initialisé via {method} - {data.get("transaction_id")}'
                 )
                 
@@ -155,28 +261,26 @@ class GetMiPayService:
             signature = self._generate_signature(payload)
             payload['signature'] = signature
             
-            response = requests.post(
-                f'{self.api_url}/v1/payouts/initiate',
-                json=payload,
-                headers=self._get_headers(),
-                timeout=10
-            )
+            response = self._post('/v1/payouts/initiate', payload)
             response.raise_for_status()
             
             data = response.json()
             
             if data.get('success'):
                 # Débiter immédiatement le wallet (sera crédité si le retrait échoue)
-                wallet.balance -= float(amount)
-                wallet.save()
-                
-                transaction = Transaction.objects.create(
-                    user=user,
-                    wallet=wallet,
-                    amount=float(amount),
-                    type='withdraw',
-                    note=f'Retrait initié via {method} - {data.get("transaction_id")}'
-                )
+                amt = Decimal(str(amount))
+                with db_transaction.atomic():
+                    account = debit_wallet(wallet.pk, user.id, amt)
+                    transaction = Transaction.objects.create(
+                        user=user,
+                        wallet=wallet,
+                        amount=amt,
+                        type='withdraw',
+                        status='pending',
+                        provider_reference=data.get('transaction_id'),
+                        note=f'Retrait initié via {method} - {data.get("transaction_id")}'
+                    )
+                    ledger.transfer(account, ledger.EXTERNAL_PROVIDER, amt, transaction)
                 
                 logger.info(f"Retrait initié pour {user.email}: {amount} FCFA")
                 return {
@@ -209,69 +313,79 @@ class GetMiPayService:
                 'error': f'Erreur serveur: {str(e)}'
             }
     
-    def verify_webhook(self, signature, data):
-        """Vérifier la signature du webhook GetMiPay"""
+    def verify_webhook(self, signature, body):
+        """
+        Vérifier la signature du webhook GetMiPay: HMAC-SHA256 du corps brut
+        de la requête (octets reçus, avant tout décodage JSON). Refusé sans
+        secret configuré: une signature calculée avec une clé vide est à la
+        portée de n'importe qui.
+        """
+        if not self.webhook_secret:
+            return False
+        if isinstance(body, str):
+            body = body.encode()
         expected_signature = hmac.new(
             self.webhook_secret.encode(),
-            json.dumps(data, sort_keys=True).encode(),
+            body,
             hashlib.sha256
         ).hexdigest()
-        return signature == expected_signature
+        return hmac.compare_digest(signature.encode(), expected_signature.encode())
+    
+    def _find_transaction(self, reference):
+        """
+        Transaction désignée par l'identifiant du fournisseur (index sur
+        provider_reference), jamais par notre identifiant: une notification
+        ne peut viser qu'une opération initiée chez le fournisseur (les
+        anciennes ont reçu leur référence à la migration 0019).
+        """
+        if not reference:
+            return None
+        return Transaction.objects.filter(provider_reference=str(reference)).first()
     
     def process_webhook(self, event_type, data):
         """
         Traiter un webhook GetMiPay.
         
         Types d'événements:
-        - payment.completed: Dépôt complété
+        - payment.completed: Dépôt complété (crédite le porte-monnaie)
         - payment.failed: Dépôt échoué
-        - payout.completed: Retrait complété
-        - payout.failed: Retrait échoué
+        - payout.completed: Retrait complété (porte-monnaie déjà débité)
+        - payout.failed: Retrait échoué (rembourse le porte-monnaie)
+        
+        Le statut ne change que depuis 'pending' (UPDATE conditionnel, voir
+        payments.transition), dans la même transaction que le mouvement
+        d'argent: un webhook rejoué est accepté sans rien refaire. Le montant
+        est celui de la transaction enregistrée, pas celui du webhook.
+        La transition étant un UPDATE (pas de post_save), les fragments du
+        tableau de bord et les soldes en cache de l'utilisateur sont supprimés
+        ici, après commit.
+        Retourne False si l'événement n'a pas pu être appliqué.
         """
         try:
-            transaction_id = data.get('transaction_id')
-            status = data.get('status')
-            amount = float(data.get('amount', 0))
+            if event_type not in self.WEBHOOK_TRANSITIONS:
+                return False
+            if event_type.endswith('.completed') and data.get('status', 'success') != 'success':
+                return False
+            transaction = self._find_transaction(data.get('transaction_id'))
+            if transaction is None:
+                logger.error(f"Webhook {event_type}: transaction inconnue {data.get('transaction_id')}")
+                return False
+            if transaction.type != self.EVENT_TRANSACTION_TYPES[event_type.split('.')[0]]:
+                logger.error(f"Webhook {event_type}: transaction {transaction.pk} de type {transaction.type}")
+                return False
             
-            if event_type == 'payment.completed' and status == 'success':
-                # Créditer le wallet
-                transaction = Transaction.objects.get(id=transaction_id)
-                wallet = transaction.wallet
-                wallet.balance += amount
-                wallet.save()
-                transaction.note = f'{transaction.note} - COMPLÉTÉ'
-                transaction.save()
-                logger.info(f"Dépôt complété: {transaction_id}")
-                return True
-            
-            elif event_type == 'payment.failed':
-                # Marquer comme échoué
-                transaction = Transaction.objects.get(id=transaction_id)
-                transaction.note = f'{transaction.note} - ÉCHOUÉ'
-                transaction.save()
-                logger.warning(f"Dépôt échoué: {transaction_id}")
-                return True
-            
-            elif event_type == 'payout.completed' and status == 'success':
-                # Retrait complété, wallet déjà débité
-                transaction = Transaction.objects.get(id=transaction_id)
-                transaction.note = f'{transaction.note} - COMPLÉTÉ'
-                transaction.save()
-                logger.info(f"Retrait complété: {transaction_id}")
-                return True
-            
-            elif event_type == 'payout.failed':
-                # Retrait échoué, créditer le wallet
-                transaction = Transaction.objects.get(id=transaction_id)
-                wallet = transaction.wallet
-                wallet.balance += amount
-                wallet.save()
-                transaction.note = f'{transaction.note} - ÉCHOUÉ, Remboursé'
-                transaction.save()
-                logger.warning(f"Retrait échoué: {transaction_id}, remboursé")
-                return True
-            
-            return False
+            new_status, refund = self.WEBHOOK_TRANSITIONS[event_type]
+            with db_transaction.atomic():
+                if not transition(transaction.pk, new_status):
+                    logger.info(f"Webhook {event_type} déjà appliqué: transaction {transaction.pk}")
+                    return True
+                if refund:
+                    account = credit_wallet(transaction.wallet_id, transaction.user_id, transaction.amount)
+                    ledger.transfer(ledger.EXTERNAL_PROVIDER, account, transaction.amount, transaction)
+                    summaries.invalidate_wallet_totals([transaction.user_id])
+                fragments.invalidate([transaction.user_id])
+            logger.info(f"Webhook {event_type}: transaction {transaction.pk} -> {new_status}")
+            return True
         
         except Exception as e:
             logger.error(f"Erreur process_webhook: {str(e)}")
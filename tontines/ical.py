@@ -0,0 +1,148 @@
+"""
+Flux iCalendar (.ics) par utilisateur: réunions et échéances de cotisation
+de toutes ses tontines actives, sur CALENDAR_FEED_HORIZON_DAYS jours.
+
+Les applications de calendrier interrogent le flux toutes les quelques
+minutes, sans session: l'URL porte un jeton signé (feed_token). Le flux est
+construit une fois (une requête SQL), mis en cache par utilisateur avec son
+ETag (empreinte du contenu) et sa date de modification; une requête
+conditionnelle (If-None-Match / If-Modified-Since) obtient alors un 304 sans
+toucher la base. L'entrée est supprimée, après commit, quand une tontine ou
+une adhésion de l'utilisateur change, et reconstruite chaque jour (l'horizon
+glisse).
+"""
+
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import recurrence
+from .models import Tontine, TontineMember
+
+FEED_KEY = 'calendar-feed:{}'
+TOKEN_SALT = 'tontines.calendar-feed'
+PRODID = '-//Tontine//Calendrier des tontines//FR'
+UID_DOMAIN = 'tontines'
+
+
+def feed_token(user_id):
+    """Jeton signé identifiant l'utilisateur dans l'URL du flux."""
+    return signing.Signer(salt=TOKEN_SALT).sign(str(user_id))
+
+
+def user_for_token(token):
+    """Identifiant de l'utilisateur du jeton, ou None si la signature est invalide."""
+    try:
+        return int(signing.Signer(salt=TOKEN_SALT).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def invalidate(user_ids):
+    """Supprimer les flux en cache une fois la transaction validée."""
+    keys = [FEED_KEY.format(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _escape(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """Plier une ligne à 75 octets (RFC 5545, 3.1)."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+    chunks, current = [], ''
+    for char in line:
+        if len((current + char).encode()) > (75 if not chunks else 74):
+            chunks.append(current)
+            current = ''
+        current += char
+    chunks.append(current)
+    return '\r\n '.join(chunks)
+
+
+def _utc(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event(uid, stamp, summary, start, end, location='', description=''):
+    lines = ['BEGIN:VEVENT', f'UID:{uid}', f'DTSTAMP:{stamp}', f'SUMMARY:{_escape(summary)}']
+    if isinstance(start, datetime):
+        lines += [f'DTSTART:{_utc(start)}', f'DTEND:{_utc(end)}']
+    else:
+        lines += [f'DTSTART;VALUE=DATE:{start:%Y%m%d}', f'DTEND;VALUE=DATE:{end:%Y%m%d}']
+    if location:
+        lines.append(f'LOCATION:{_escape(location)}')
+    if description:
+        lines.append(f'DESCRIPTION:{_escape(description)}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def _tontine_events(tontine, today, horizon):
+    """Événements d'une tontine: réunions puis échéances, déroulés jusqu'à l'horizon."""
+    stamp = _utc(tontine.created_at)
+    if tontine.meeting_rule:
+        at = recurrence.meeting_time(tontine.meeting_rule)
+        for day in recurrence.occurrences(tontine.meeting_rule, tontine.start_date, today, horizon):
+            if at is None:
+                start, end = day, day + timedelta(days=1)
+            else:
+                start = timezone.make_aware(datetime.combine(day, at))
+                end = start + timedelta(hours=1)
+            yield from _event(
+                f'reunion-{tontine.pk}-{day:%Y%m%d}@{UID_DOMAIN}', stamp, f'Réunion {tontine.name}',
+                start, end, tontine.meeting_location, tontine.meeting_schedule,
+            )
+    due, step = tontine.next_due_date, timedelta(days=tontine.cycle_duration or 30)
+    while due and due <= horizon:
+        if due >= today:
+            yield from _event(
+                f'echeance-{tontine.pk}-{due:%Y%m%d}@{UID_DOMAIN}', stamp, f'Cotisation {tontine.name}',
+                due, due + timedelta(days=1),
+                description=f'Cotisation de {tontine.contribution_amount} FCFA (code {tontine.code})',
+            )
+        due += step
+
+
+def build(user_id, today=None):
+    """Contenu du flux .ics de l'utilisateur (une requête SQL)."""
+    today = today or timezone.localdate()
+    horizon = today + timedelta(days=settings.CALENDAR_FEED_HORIZON_DAYS)
+    tontines = Tontine.objects.filter(
+        status='active', pk__in=TontineMember.objects.filter(user_id=user_id).values('tontine_id'),
+    ).order_by('pk').only(
+        'id', 'name', 'code', 'start_date', 'cycle_duration', 'next_due_date', 'contribution_amount',
+        'meeting_rule', 'meeting_schedule', 'meeting_location', 'created_at',
+    )
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN',
+             'X-WR-CALNAME:Mes tontines']
+    for tontine in tontines:
+        lines.extend(_tontine_events(tontine, today, horizon))
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+
+
+def user_feed(user_id):
+    """{'body', 'etag', 'last_modified'} du flux de l'utilisateur, depuis le cache."""
+    key = FEED_KEY.format(user_id)
+    today = timezone.localdate()
+    feed = cache.get(key)
+    if feed is None or feed['day'] != today:
+        body = build(user_id, today)
+        etag = '"{}"'.format(hashlib.md5(body.encode()).hexdigest())
+        if feed is None or feed['etag'] != etag:
+            last_modified = timezone.now().replace(microsecond=0)
+        else:
+            last_modified = feed['last_modified']
+        feed = {'body': body, 'etag': etag, 'last_modified': last_modified, 'day': today}
+        cache.set(key, feed, settings.CALENDAR_FEED_CACHE_TIMEOUT)
+    return feed
@@ -0,0 +1,112 @@
+"""
+Boîte de réception des notifications (webhooks) des fournisseurs de paiement.
+
+La vue du webhook vérifie la signature puis enregistre l'événement brut
+(receive: un seul INSERT ... ON CONFLICT DO NOTHING). Elle répond en quelques
+millisecondes: une rafale de notifications n'occupe pas les workers avec des
+recherches et des mises à jour de porte-monnaie. Un événement renvoyé par le
+fournisseur garde son identifiant et est ignoré par la contrainte unique
+(provider, event_id).
+
+drain() (commande drain_webhooks) applique ensuite les événements en attente,
+par lots, dans l'ordre d'arrivée:
+  - chaque événement est réservé par UPDATE conditionnel (status='pending') et
+    appliqué dans la même transaction: deux workers ne l'appliquent pas deux fois;
+  - un événement du même type déjà appliqué à la même transaction (renvoi sous
+    un autre identifiant) est marqué doublon sans être rejoué;
+  - quand un événement d'une transaction échoue, les suivants de cette
+    transaction attendent le prochain passage (l'ordre par transaction est
+    conservé); après MAX_ATTEMPTS échecs, il est abandonné (status 'failed').
+"""
+
+import hashlib
+import json
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from .getmipay_service import getmipay_service
+from .models import WebhookEvent
+
+MAX_ATTEMPTS = 5
+
+
+class NotApplied(Exception):
+    pass
+
+
+def event_id(payload):
+    """Identifiant de l'événement chez le fournisseur, sinon empreinte du contenu (un renvoi identique a la même)."""
+    value = payload.get('event_id') or payload.get('id')
+    if not value:
+        value = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return str(value)[:100]
+
+
+def receive(payload, provider='getmipay'):
+    """Enregistrer un événement, sans effet s'il a déjà été reçu. Une seule requête."""
+    WebhookEvent.objects.bulk_create([
+        WebhookEvent(
+            provider=provider, event_id=event_id(payload), event_type=str(payload.get('event', ''))[:50],
+            transaction_ref=str(payload.get('transaction_id') or '')[:100], payload=payload,
+        )
+    ], ignore_conflicts=True)
+
+
+def _apply(event):
+    """Réserver et appliquer un événement dans une transaction (lève NotApplied, tout est annulé)."""
+    with transaction.atomic():
+        claimed = WebhookEvent.objects.filter(pk=event.pk, status='pending').update(
+            status='processed', processed_at=timezone.now(),
+        )
+        if claimed and not getmipay_service.process_webhook(event.event_type, event.payload):
+            raise NotApplied
+
+
+def _mark(event, **fields):
+    WebhookEvent.objects.filter(pk=event.pk, status='pending').update(**fields)
+
+
+def drain(batch_size=100):
+    """
+    Appliquer les événements en attente. Retourne le nombre d'événements
+    {'processed', 'duplicate', 'retry', 'failed', 'deferred'}.
+    """
+    counts = Counter()
+    pending = WebhookEvent.objects.filter(status='pending').order_by('pk')
+    blocked = set()
+    last_pk = 0
+    while True:
+        batch = list(pending.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return counts
+        last_pk = batch[-1].pk
+        refs = {event.transaction_ref for event in batch if event.transaction_ref}
+        done = set(WebhookEvent.objects.filter(status='processed', transaction_ref__in=refs).values_list(
+            'transaction_ref', 'event_type',
+        ))
+        for event in batch:
+            ref, key = event.transaction_ref, (event.transaction_ref, event.event_type)
+            if ref and ref in blocked:
+                counts['deferred'] += 1
+            elif ref and key in done:
+                _mark(event, status='duplicate', processed_at=timezone.now())
+                counts['duplicate'] += 1
+            else:
+                try:
+                    _apply(event)
+                except NotApplied:
+                    attempts = event.attempts + 1
+                    if attempts >= MAX_ATTEMPTS:
+                        _mark(event, attempts=attempts, status='failed', processed_at=timezone.now(),
+                              last_error="Événement non appliqué")
+                        counts['failed'] += 1
+                    else:
+                        _mark(event, attempts=attempts, last_error="Événement non appliqué")
+                        counts['retry'] += 1
+                        if ref:
+                            blocked.add(ref)
+                else:
+                    done.add(key)
+                    counts['processed'] += 1
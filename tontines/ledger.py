@@ -0,0 +1,232 @@
+"""
+Grand livre en partie double (append-only).
+
+Chaque mouvement d'argent est écrit comme une opération équilibrée: un débit
+sur le compte source et un crédit du même montant sur le compte destination.
+Le solde d'un compte = somme des crédits - somme des débits.
+
+Les soldes stockés (Wallet.balance, Vault.balance, Tontine.total_pot) sont des
+projections mises à jour par les services dans la même transaction que les
+écritures (le pot d'une tontine fractionnée: sa ligne plus ses fractions non
+reportées, voir counters.py). Ils peuvent être vérifiés et reconstruits depuis le grand livre:
+dernier checkpoint du compte + écritures postérieures (rebuild_projections).
+"""
+
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import DecimalField, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import counters, summaries
+from .models import BalanceCheckpoint, LedgerEntry, Tontine, Vault, Wallet
+
+Account = namedtuple('Account', 'type id user_id')
+
+# Comptes externes: l'argent qui entre ou sort du système
+EXTERNAL_OPENING = Account(LedgerEntry.EXTERNAL, 0, None)  # soldes d'ouverture
+EXTERNAL_CASH = Account(LedgerEntry.EXTERNAL, 1, None)  # contributions en espèces
+EXTERNAL_PROVIDER = Account(LedgerEntry.EXTERNAL, 2, None)  # mobile money / GetMiPay
+
+# Projection stockée de chaque type de compte: (modèle, champ)
+PROJECTIONS = {
+    LedgerEntry.WALLET: (Wallet, 'balance'),
+    LedgerEntry.VAULT: (Vault, 'balance'),
+    LedgerEntry.TONTINE: (Tontine, 'total_pot'),
+}
+
+# Les écritures plus récentes que ce délai ne sont pas figées dans un checkpoint:
+# une transaction encore ouverte peut insérer un id inférieur au dernier id visible.
+CHECKPOINT_LAG = timedelta(minutes=5)
+
+_ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=15, decimal_places=2))
+
+
+def wallet_account(wallet):
+    return Account(LedgerEntry.WALLET, wallet.pk, wallet.user_id)
+
+
+def vault_account(vault):
+    return Account(LedgerEntry.VAULT, vault.pk, vault.owner_id)
+
+
+def tontine_account(tontine):
+    return Account(LedgerEntry.TONTINE, tontine.pk, None)
+
+
+def _entry(posting, account, direction, amount, transaction):
+    return LedgerEntry(
+        posting=posting,
+        account_type=account.type,
+        account_id=account.id,
+        user_id=account.user_id,
+        direction=direction,
+        amount=amount,
+        transaction=transaction,
+    )
+
+
+def post(transfers):
+    """
+    Écrire plusieurs opérations en un seul INSERT.
+    `transfers`: itérable de (source, destination, montant, transaction ou None).
+    À appeler dans la transaction qui met à jour les projections.
+    Répercute aussi les mouvements sur les résumés financiers des titulaires.
+    """
+    entries = []
+    for source, destination, amount, transaction in transfers:
+        amount = Decimal(amount)
+        if amount <= 0:
+            raise ValueError("Le montant d'une opération doit être positif.")
+        posting = uuid.uuid4()
+        entries.append(_entry(posting, source, LedgerEntry.DEBIT, amount, transaction))
+        entries.append(_entry(posting, destination, LedgerEntry.CREDIT, amount, transaction))
+    entries = LedgerEntry.objects.bulk_create(entries)
+    summaries.apply_ledger_entries(entries)
+    return entries
+
+
+def open_balances(balances, batch_size=1000):
+    """
+    Écrire des soldes d'ouverture (données importées ou générées en masse).
+    `balances`: itérable de (compte, montant). Contrepartie: EXTERNAL_OPENING.
+    Les résumés financiers ne sont pas touchés: les reconstruire ensuite.
+    """
+    entries = []
+    for account, amount in balances:
+        if not amount:
+            continue
+        source, destination = EXTERNAL_OPENING, account
+        if amount < 0:
+            source, destination, amount = account, EXTERNAL_OPENING, -amount
+        posting = uuid.uuid4()
+        entries.append(_entry(posting, source, LedgerEntry.DEBIT, amount, None))
+        entries.append(_entry(posting, destination, LedgerEntry.CREDIT, amount, None))
+    LedgerEntry.objects.bulk_create(entries, batch_size=batch_size)
+    return len(entries) // 2
+
+
+def transfer(source, destination, amount, transaction=None):
+    """Débiter `source` et créditer `destination` du même montant."""
+    return post([(source, destination, amount, transaction)])
+
+
+def _signed_sum():
+    return Coalesce(Sum('amount', filter=Q(direction=LedgerEntry.CREDIT)), _ZERO) - \
+        Coalesce(Sum('amount', filter=Q(direction=LedgerEntry.DEBIT)), _ZERO)
+
+
+def balance(account_type, account_id):
+    """Solde d'un compte: dernier checkpoint + écritures postérieures (deux requêtes indexées)."""
+    checkpoint = BalanceCheckpoint.objects.filter(
+        account_type=account_type, account_id=account_id
+    ).order_by('-last_entry_id').first()
+    base, after = (checkpoint.balance, checkpoint.last_entry_id) if checkpoint else (Decimal('0'), 0)
+    tail = LedgerEntry.objects.filter(
+        account_type=account_type, account_id=account_id, id__gt=after
+    ).aggregate(delta=_signed_sum())['delta']
+    return base + tail
+
+
+def _latest_checkpoints(accounts=None):
+    """{(type, id): (balance, last_entry_id)} des derniers checkpoints."""
+    latest = BalanceCheckpoint.objects.filter(
+        account_type=OuterRef('account_type'), account_id=OuterRef('account_id')
+    ).order_by('-last_entry_id').values('id')[:1]
+    qs = BalanceCheckpoint.objects.filter(id=Subquery(latest))
+    if accounts is not None:
+        qs = qs.filter(account_type__in={t for t, _ in accounts}, account_id__in={i for _, i in accounts})
+    return {
+        (c['account_type'], c['account_id']): (c['balance'], c['last_entry_id'])
+        for c in qs.values('account_type', 'account_id', 'balance', 'last_entry_id')
+    }
+
+
+def _watermark():
+    """Plus grand id d'écriture couvert par les checkpoints."""
+    return BalanceCheckpoint.objects.aggregate(w=Max('last_entry_id'))['w'] or 0
+
+
+def _deltas(after, upto=None):
+    """Variation de solde par compte pour les écritures d'id dans ]after, upto]."""
+    qs = LedgerEntry.objects.filter(id__gt=after)
+    if upto is not None:
+        qs = qs.filter(id__lte=upto)
+    rows = qs.values('account_type', 'account_id').annotate(delta=_signed_sum())
+    return {(r['account_type'], r['account_id']): r['delta'] for r in rows}
+
+
+def checkpoint(lag=CHECKPOINT_LAG, batch_size=1000):
+    """
+    Écrire un checkpoint pour chaque compte mouvementé depuis le dernier passage.
+
+    Invariant: pour tout compte, son dernier checkpoint couvre toutes ses
+    écritures jusqu'au watermark. Un passage ne lit donc que le delta
+    ]watermark, nouveau watermark] et jamais tout l'historique.
+    Retourne le nombre de checkpoints créés.
+    """
+    previous = _watermark()
+    upto = LedgerEntry.objects.filter(
+        id__gt=previous, created_at__lte=timezone.now() - lag
+    ).aggregate(m=Max('id'))['m']
+    if not upto:
+        return 0
+
+    deltas = _deltas(previous, upto)
+    keys = list(deltas)
+    created = 0
+    for start in range(0, len(keys), batch_size):
+        chunk = keys[start:start + batch_size]
+        bases = _latest_checkpoints(chunk)
+        BalanceCheckpoint.objects.bulk_create([
+            BalanceCheckpoint(
+                account_type=account_type,
+                account_id=account_id,
+                balance=bases.get((account_type, account_id), (Decimal('0'), 0))[0] + deltas[(account_type, account_id)],
+                last_entry_id=upto,
+            )
+            for account_type, account_id in chunk
+        ])
+        created += len(chunk)
+    return created
+
+
+def ledger_balances():
+    """Solde de tous les comptes: derniers checkpoints + delta depuis le watermark."""
+    balances = {key: value[0] for key, value in _latest_checkpoints().items()}
+    for key, delta in _deltas(_watermark()).items():
+        balances[key] = balances.get(key, Decimal('0')) + delta
+    return balances
+
+
+def rebuild_projections(dry_run=False, batch_size=1000):
+    """
+    Comparer les soldes stockés au grand livre et corriger les écarts.
+    Ne rejoue que le delta depuis les derniers checkpoints. Chaque écart est
+    revérifié sous verrou de ligne avant correction, pour ne pas écraser un
+    paiement concurrent.
+    Retourne la liste des écarts [(type, id, stocké, grand livre)].
+    """
+    balances = ledger_balances()
+    pending_pots = counters.pending_pots()
+    drifts = []
+    for account_type, (model, field) in PROJECTIONS.items():
+        sharded = account_type == LedgerEntry.TONTINE
+        for pk, stored in model.objects.values_list('id', field).iterator(chunk_size=batch_size):
+            pending = pending_pots.get(pk, 0) if sharded else 0
+            if stored + pending == balances.get((account_type, pk), Decimal('0')):
+                continue
+            with db_transaction.atomic():
+                stored = model.objects.select_for_update().filter(pk=pk).values_list(field, flat=True).first()
+                pending = counters.pending_pots(locked_tontine_id=pk) if sharded else 0
+                expected = balance(account_type, pk)
+                if stored is None or stored + pending == expected:
+                    continue
+                drifts.append((account_type, pk, stored + pending, expected))
+                if not dry_run:
+                    model.objects.filter(pk=pk).update(**{field: expected - pending})
+    return drifts
@@ -0,0 +1,112 @@
+"""
+Benchmark du pot d'une tontine sous contention: ligne unique contre fractions.
+
+Plusieurs threads ajoutent des contributions au pot de la même tontine, d'abord
+sur la ligne de la tontine (counter_shards=0), puis réparties sur N fractions
+(voir counters.py). On compare les débits et on vérifie, après report des
+fractions, qu'aucune mise à jour n'a été perdue.
+
+    python manage.py bench_pot_counters --threads 16 --writes 200 --shards 16
+
+Sous SQLite, toute écriture verrouille la base entière: les fractions n'y
+apportent rien. Le gain se mesure sur PostgreSQL (verrous de ligne).
+
+Comme bench_wallet_payments, tourne sur une base de test jetable (voir
+tontines/benchmarks.py), en développement seulement (DEBUG=True).
+"""
+
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from tontines import counters
+from tontines.benchmarks import scratch_database
+from tontines.models import Tontine
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Compare le débit des écritures du pot d'une tontine: ligne unique contre fractions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=100, help='Écritures par thread')
+        parser.add_argument('--shards', type=int, default=16)
+        parser.add_argument('--amount', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['shards'] < 1:
+            raise CommandError('--shards doit être au moins 1.')
+        tag = uuid.uuid4().hex[:6].upper()
+        with scratch_database('bench_pot_counters'):
+            manager = User.objects.create_user(username=f'bench_pot_{tag}', password=None, phone_number=f'pot-{tag}')
+            results = [
+                self._run(manager, f'{tag}{shards}', shards, options)
+                for shards in (0, options['shards'])
+            ]
+
+        for shards, writes, elapsed, retries in results:
+            label = 'ligne unique' if not shards else f'{shards} fractions'
+            self.stdout.write(
+                f'{label:>14}: {writes} écritures en {elapsed:.2f}s -> {writes / elapsed:.1f} écritures/s '
+                f'({retries} reprises)'
+            )
+        single, sharded = results[0], results[1]
+        self.stdout.write(
+            f'Rapport: x{(sharded[1] / sharded[2]) / (single[1] / single[2]):.2f} '
+            f'({options["threads"]} threads, base: {connection.vendor})'
+        )
+        self.stdout.write(self.style.SUCCESS('Aucune mise à jour perdue.'))
+
+    def _run(self, manager, code, shards, options):
+        amount = Decimal(options['amount'])
+        tontine = Tontine.objects.create(
+            name=f'Benchmark pot {code}', code=f'P{code}'[:10], description='Benchmark du pot',
+            manager=manager, start_date=timezone.localdate(), status='active',
+            contribution_amount=amount, counter_shards=shards,
+        )
+        stats = {'ok': 0, 'retries': 0}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(options['writes']):
+                    for attempt in range(20):
+                        try:
+                            with transaction.atomic():
+                                counters.add_contributions(tontine, 1, amount, timezone.now())
+                        except OperationalError:
+                            # SQLite: "database is locked" sous forte contention
+                            with lock:
+                                stats['retries'] += 1
+                            time.sleep(0.005 * (attempt + 1))
+                            continue
+                        with lock:
+                            stats['ok'] += 1
+                        break
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        counters.fold(tontine.pk)
+        tontine.refresh_from_db()
+        if (tontine.total_pot, tontine.contribution_count) != (amount * stats['ok'], stats['ok']):
+            raise CommandError(
+                f'Mises à jour perdues ({shards} fraction(s)): pot {tontine.total_pot}, '
+                f'{tontine.contribution_count} contribution(s) pour {stats["ok"]} écriture(s).'
+            )
+        return shards, stats['ok'], elapsed, stats['retries']
@@ -0,0 +1,143 @@
+"""
+Benchmark de contention du paiement depuis le porte-monnaie.
+
+Plusieurs threads paient en même temps dans la même tontine, puis on vérifie
+qu'aucune mise à jour n'a été perdue (pot, totaux des membres, soldes).
+
+Le benchmark tourne sur une base de test créée pour l'occasion puis détruite
+(voir tontines/benchmarks.py): la base configurée n'est jamais modifiée.
+Réservé au développement (DEBUG=True).
+
+    python manage.py bench_wallet_payments --threads 8 --payments 50
+"""
+
+import random
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from tontines import ledger
+from tontines.benchmarks import scratch_database
+from tontines.models import Contribution, LedgerEntry, Tontine, TontineMember, Wallet
+from tontines.payments import PaymentError, deposit_to_wallet, pay_contribution_from_wallet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Mesure le débit (paiements/s) de pay_contribution_from_wallet sous contention."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--payments', type=int, default=50, help='Paiements par thread')
+        parser.add_argument('--members', type=int, default=4,
+                            help='Membres partagés entre les threads (contention sur les wallets)')
+        parser.add_argument('--amount', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with scratch_database('bench_wallet_payments'):
+            self._run(options)
+
+    def _run(self, options):
+        n_threads = options['threads']
+        per_thread = options['payments']
+        amount = Decimal(options['amount'])
+        tag = uuid.uuid4().hex[:6].upper()
+
+        tontine, members = self._setup(tag, options['members'], amount, n_threads * per_thread)
+        initial_wallets = self._wallet_total(members)
+
+        stats = {'ok': 0, 'rejected': 0, 'retries': 0}
+        lock = threading.Lock()
+
+        def worker():
+            rng = random.Random()
+            try:
+                for _ in range(per_thread):
+                    member = rng.choice(members)
+                    for attempt in range(20):
+                        try:
+                            pay_contribution_from_wallet(member.user, tontine, member)
+                            outcome = 'ok'
+                        except PaymentError:
+                            outcome = 'rejected'
+                        except OperationalError:
+                            # SQLite: "database is locked" sous forte contention
+                            with lock:
+                                stats['retries'] += 1
+                            time.sleep(0.005 * (attempt + 1))
+                            continue
+                        with lock:
+                            stats[outcome] += 1
+                        break
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        self._verify(tontine, members, initial_wallets, amount, stats['ok'])
+
+        self.stdout.write(
+            f"{stats['ok']} paiements en {elapsed:.2f}s -> {stats['ok'] / elapsed:.1f} paiements/s "
+            f"({n_threads} threads, {stats['rejected']} refusés, {stats['retries']} reprises, "
+            f"base: {connection.vendor})"
+        )
+        self.stdout.write(self.style.SUCCESS('Aucune mise à jour perdue.'))
+
+    def _setup(self, tag, n_members, amount, n_payments):
+        manager = User.objects.create_user(
+            username=f'bench_mgr_{tag}', password=None, phone_number=f'bench-{tag}-0'
+        )
+        tontine = Tontine.objects.create(
+            name=f'Benchmark {tag}', code=f'B{tag}', description='Benchmark de contention',
+            manager=manager, start_date=timezone.localdate(), status='active',
+            contribution_amount=amount,
+        )
+        members = []
+        for i in range(1, n_members + 1):
+            user = User.objects.create_user(
+                username=f'bench_{tag}_{i}', password=None, phone_number=f'bench-{tag}-{i}'
+            )
+            # Assez pour la plupart des paiements, pas tous: on exerce aussi le refus
+            wallet = Wallet.objects.create(user=user)
+            deposit_to_wallet(wallet, amount * (n_payments // n_members), note='Benchmark')
+            members.append(TontineMember.objects.create(
+                tontine=tontine, user=user, status='active'
+            ))
+        return tontine, members
+
+    def _wallet_total(self, members):
+        return Wallet.objects.filter(
+            user__in=[m.user_id for m in members]
+        ).aggregate(total=Sum('balance'))['total'] or 0
+
+    def _verify(self, tontine, members, initial_wallets, amount, n_ok):
+        expected = amount * n_ok
+        tontine.refresh_from_db()
+        checks = {
+            'total_pot': tontine.total_pot,
+            'contributions': Contribution.objects.filter(tontine=tontine).aggregate(
+                total=Sum('amount'))['total'] or 0,
+            'total_contributed': TontineMember.objects.filter(tontine=tontine).aggregate(
+                total=Sum('total_contributed'))['total'] or 0,
+            'débit wallets': initial_wallets - self._wallet_total(members),
+            'grand livre': ledger.balance(LedgerEntry.TONTINE, tontine.pk),
+        }
+        lost = {name: value for name, value in checks.items() if value != expected}
+        if lost:
+            raise CommandError(f'Mises à jour perdues (attendu {expected}): {lost}')
+        if Wallet.objects.filter(user__in=[m.user_id for m in members], balance__lt=0).exists():
+            raise CommandError('Solde négatif détecté.')
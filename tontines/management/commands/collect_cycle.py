@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tontines.collection import collect_cycle
+from tontines.models import Tontine
+from tontines.payments import PaymentError
+
+
+class Command(BaseCommand):
+    help = "Prélève la contribution du cycle sur le porte-monnaie de tous les membres actifs d'une tontine."
+
+    def add_arguments(self, parser):
+        parser.add_argument('tontine', help='Id ou code de la tontine')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Afficher le résultat sans prélever')
+
+    def handle(self, *args, **options):
+        ref = options['tontine']
+        lookup = {'pk': int(ref)} if ref.isdigit() else {'code': ref.upper()}
+        try:
+            tontine = Tontine.objects.get(**lookup)
+        except Tontine.DoesNotExist:
+            raise CommandError(f'Tontine introuvable: {ref}')
+        if tontine.status != 'active':
+            raise CommandError("La tontine n'est pas active.")
+
+        try:
+            result = collect_cycle(tontine, batch_size=options['batch_size'], dry_run=options['dry_run'])
+        except PaymentError as e:
+            raise CommandError(str(e))
+
+        for member, balance in result.insufficient:
+            self.stdout.write(self.style.WARNING(
+                f'Solde insuffisant: {member.user.username} ({balance} FCFA)'
+            ))
+        verb = 'à prélever' if options['dry_run'] else 'prélevés'
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(result.paid)} membre(s), {result.total} FCFA {verb}; '
+            f'{len(result.insufficient)} solde(s) insuffisant(s).'
+        ))
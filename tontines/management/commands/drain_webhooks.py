@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tontines import inbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Applique les notifications de paiement en attente dans la boîte de réception, par lots. "
+        "Avec --interval, tourne en continu (worker)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Secondes entre deux passages (0: un seul passage)")
+
+    def handle(self, *args, **options):
+        while True:
+            counts = inbox.drain(batch_size=options['batch_size'])
+            if counts or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{counts['processed']} appliqué(s), {counts['duplicate']} doublon(s), "
+                    f"{counts['retry']} à retenter, {counts['deferred']} différé(s), {counts['failed']} abandonné(s)."
+                ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
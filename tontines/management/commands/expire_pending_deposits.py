@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tontines.models import Transaction
+from tontines.payments import expire_pending_deposits
+
+
+class Command(BaseCommand):
+    help = (
+        "Marque échoués les dépôts GetMiPay restés en attente (aucun argent n'a bougé) et signale "
+        "les retraits en attente, à vérifier auprès du fournisseur."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=48, help="Ancienneté minimale (heures)")
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - timedelta(hours=options['hours'])
+        count = expire_pending_deposits(older_than)
+        withdrawals = Transaction.objects.filter(status='pending', type='withdraw', created_at__lt=older_than).count()
+        self.stdout.write(self.style.SUCCESS(f'{count} dépôt(s) expiré(s).'))
+        if withdrawals:
+            self.stdout.write(self.style.WARNING(f'{withdrawals} retrait(s) en attente à vérifier.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tontines import counters
+
+
+class Command(BaseCommand):
+    help = "Reporte les fractions du pot et des compteurs des tontines fractionnées sur la ligne de chaque tontine."
+
+    def handle(self, *args, **options):
+        count = counters.fold_all()
+        self.stdout.write(self.style.SUCCESS(f'{count} tontine(s) reportée(s).'))
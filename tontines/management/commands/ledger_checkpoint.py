@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from tontines import ledger
+
+
+class Command(BaseCommand):
+    help = "Écrit les checkpoints de solde des comptes mouvementés depuis le dernier passage."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=int, default=int(ledger.CHECKPOINT_LAG.total_seconds()),
+                            help='Ignorer les écritures plus récentes que N secondes')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = ledger.checkpoint(lag=timedelta(seconds=options['lag']), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{created} checkpoint(s) créé(s).'))
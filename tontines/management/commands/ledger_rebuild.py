@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from tontines import ledger
+
+
+class Command(BaseCommand):
+    help = "Vérifie les soldes stockés (wallets, coffres, pots) contre le grand livre et corrige les écarts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Afficher les écarts sans corriger')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        drifts = ledger.rebuild_projections(dry_run=options['dry_run'], batch_size=options['batch_size'])
+        for account_type, account_id, stored, expected in drifts:
+            self.stdout.write(f'{account_type}:{account_id} stocké={stored} grand livre={expected}')
+        action = 'détecté(s)' if options['dry_run'] else 'corrigé(s)'
+        self.stdout.write(self.style.SUCCESS(f'{len(drifts)} écart(s) {action}.'))
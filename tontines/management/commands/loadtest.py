@@ -0,0 +1,262 @@
+"""
+Test de charge HTTP des parcours principaux, contre un gunicorn local.
+
+Chaque utilisateur virtuel (un thread, une session HTTP) se connecte puis
+enchaîne des pages tirées au hasard selon un mélange pondéré: tableau de
+bord, accueil, détail de tontine, contribution, paiement depuis le
+porte-monnaie, porte-monnaie, adhésion par code. Les latences sont groupées
+par nom d'URL: p50 / p95 / p99 et débit (requêtes/s).
+
+À lancer sur une base jetable remplie par seed_tontines (les contributions
+et paiements sont réellement enregistrés):
+
+    python manage.py seed_tontines --users 5000 --tontines 500
+    python manage.py loadtest --start-server --workers 3 --users 1,5,10,20 --duration 30
+    python manage.py loadtest --base-url http://127.0.0.1:8000 --save-baseline loadtest-baseline.json
+    python manage.py loadtest --start-server --baseline loadtest-baseline.json --max-regression 20
+
+Avec plusieurs niveaux de concurrence (--users 1,5,10,20), le rapport montre
+à partir de quand la latence décroche: la capacité d'une instance.
+"""
+
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from tontines.models import Tontine, TontineMember
+
+# (nom d'URL, poids dans le mélange)
+MIX = (
+    ('dashboard', 3),
+    ('accueil', 3),
+    ('tontine_detail', 3),
+    ('wallet_overview', 2),
+    ('tontine_contribute', 1),
+    ('tontine_pay_wallet', 1),
+    ('tontine_join', 1),
+)
+
+
+def percentile(values, rank):
+    """Percentile au rang le plus proche (values triées)."""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(rank / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+class VirtualUser(threading.Thread):
+
+    def __init__(self, base_url, username, password, tontine_id, join_codes, deadline, record):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.tontine_id = tontine_id
+        self.join_codes = join_codes
+        self.deadline = deadline
+        self.record = record
+        self.session = requests.Session()
+        self.rng = random.Random()
+
+    def request(self, name, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.base_url + path, allow_redirects=False, timeout=30, **kwargs
+            )
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.record(name, time.perf_counter() - start, ok)
+        return response
+
+    def csrf_headers(self):
+        return {'X-CSRFToken': self.session.cookies.get('csrftoken', ''), 'Referer': self.base_url + '/'}
+
+    def login(self):
+        self.session.get(self.base_url + reverse('login'), timeout=30)
+        response = self.request('login', 'post', reverse('login'), headers=self.csrf_headers(), data={
+            'username': self.username, 'password': self.password,
+        })
+        return response is not None and response.status_code == 302
+
+    def step(self, name):
+        if name == 'tontine_detail':
+            return self.request(name, 'get', reverse(name, args=[self.tontine_id]))
+        if name in ('tontine_contribute', 'tontine_pay_wallet'):
+            return self.request(name, 'post', reverse(name, args=[self.tontine_id]))
+        if name == 'tontine_join':
+            return self.request(name, 'post', reverse(name), headers=self.csrf_headers(), data={
+                'code': self.rng.choice(self.join_codes),
+            })
+        return self.request(name, 'get', reverse(name))
+
+    def run(self):
+        if not self.login():
+            return
+        names, weights = zip(*MIX)
+        while time.perf_counter() < self.deadline:
+            self.step(self.rng.choices(names, weights)[0])
+
+
+class Command(BaseCommand):
+    help = "Mesure p50/p95/p99 et le débit par nom d'URL des parcours principaux, sous charge."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--start-server', action='store_true', help='Démarrer gunicorn pour la durée du test')
+        parser.add_argument('--workers', type=int, default=2, help='Workers gunicorn (avec --start-server)')
+        parser.add_argument('--users', default='10', help='Utilisateurs simultanés, ou paliers: 1,5,10,20')
+        parser.add_argument('--duration', type=float, default=30, help='Durée de chaque palier (secondes)')
+        parser.add_argument('--prefix', default='seed', help='Préfixe des utilisateurs de seed_tontines')
+        parser.add_argument('--password', default='password123')
+        parser.add_argument('--output', help='Écrire les résultats (JSON)')
+        parser.add_argument('--save-baseline', help='Enregistrer les résultats comme référence (JSON)')
+        parser.add_argument('--baseline', help='Comparer à une référence enregistrée')
+        parser.add_argument('--max-regression', type=float, default=None,
+                            help='Échouer si un p95 se dégrade de plus de ce pourcentage')
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['users'].split(',')]
+        except ValueError:
+            raise CommandError('--users: entiers séparés par des virgules.')
+        base_url = options['base_url'].rstrip('/')
+        accounts = self._accounts(options['prefix'], max(levels))
+
+        server = self._start_server(base_url, options['workers']) if options['start_server'] else None
+        try:
+            results = {}
+            for level in levels:
+                results[str(level)] = self._run_level(base_url, accounts[:level], options)
+                self._report(level, results[str(level)])
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=10)
+
+        for path in filter(None, (options['output'], options['save_baseline'])):
+            with open(path, 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f'Résultats écrits dans {path}')
+        if options['baseline']:
+            self._compare(results, options['baseline'], options['max_regression'])
+
+    def _accounts(self, prefix, count):
+        rows = list(
+            TontineMember.objects.filter(
+                status='active', tontine__status='active', user__username__startswith=f'{prefix}-',
+            ).order_by('user_id').values_list('user__username', 'tontine_id')[:count * 20]
+        )
+        accounts, seen = [], set()
+        for username, tontine_id in rows:
+            if username not in seen:
+                seen.add(username)
+                accounts.append((username, tontine_id))
+        if len(accounts) < count:
+            raise CommandError(
+                f'{len(accounts)} membre(s) actif(s) "{prefix}" disponibles pour {count} utilisateurs: '
+                'lancez seed_tontines.'
+            )
+        return accounts[:count]
+
+    def _start_server(self, base_url, workers):
+        bind = base_url.split('://', 1)[-1]
+        server = subprocess.Popen([
+            sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+            '--bind', bind, '--workers', str(workers), '--log-level', 'warning',
+        ], cwd=settings.BASE_DIR)
+        for _ in range(100):
+            try:
+                requests.get(base_url + reverse('home'), timeout=1)
+                return server
+            except requests.RequestException:
+                if server.poll() is not None:
+                    raise CommandError('gunicorn ne démarre pas (est-il installé ?).')
+                time.sleep(0.1)
+        server.terminate()
+        raise CommandError(f'gunicorn ne répond pas sur {base_url}.')
+
+    def _run_level(self, base_url, accounts, options):
+        samples = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+
+        def record(name, elapsed, ok):
+            with lock:
+                samples[name].append(elapsed)
+                if not ok:
+                    errors[name] += 1
+
+        join_codes = list(Tontine.objects.filter(status='active').values_list('code', flat=True)[:500])
+        started = time.perf_counter()
+        users = [
+            VirtualUser(base_url, username, options['password'], tontine_id, join_codes,
+                        started + options['duration'], record)
+            for username, tontine_id in accounts
+        ]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        wall = time.perf_counter() - started
+
+        stats = {}
+        for name, values in sorted(samples.items()):
+            values.sort()
+            stats[name] = {
+                'requests': len(values),
+                'errors': errors[name],
+                'rps': round(len(values) / wall, 2),
+                'p50_ms': round(percentile(values, 50) * 1000, 1),
+                'p95_ms': round(percentile(values, 95) * 1000, 1),
+                'p99_ms': round(percentile(values, 99) * 1000, 1),
+            }
+        return stats
+
+    def _report(self, level, stats):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{level} utilisateur(s) simultané(s)'))
+        self.stdout.write(f'{"URL":<22}{"req":>8}{"err":>6}{"req/s":>9}{"p50":>9}{"p95":>9}{"p99":>9}')
+        for name, row in stats.items():
+            self.stdout.write(
+                f'{name:<22}{row["requests"]:>8}{row["errors"]:>6}{row["rps"]:>9}'
+                f'{row["p50_ms"]:>9}{row["p95_ms"]:>9}{row["p99_ms"]:>9}'
+            )
+        total = sum(row['rps'] for row in stats.values())
+        self.stdout.write(f'Débit total: {total:.1f} req/s')
+
+    def _compare(self, results, path, max_regression):
+        try:
+            with open(path) as handle:
+                baseline = json.load(handle)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Référence illisible: {e}')
+
+        regressions = []
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nComparaison avec {path} (p95, débit)'))
+        for level, stats in results.items():
+            for name, row in stats.items():
+                before = baseline.get(level, {}).get(name)
+                if not before or not before['p95_ms']:
+                    continue
+                p95_delta = (row['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+                rps_delta = (row['rps'] - before['rps']) / before['rps'] * 100 if before['rps'] else 0
+                line = (f'{level:>4} {name:<22} p95 {before["p95_ms"]:>8} -> {row["p95_ms"]:>8} ms '
+                        f'({p95_delta:+.0f}%)  débit {rps_delta:+.0f}%')
+                if max_regression is not None and p95_delta > max_regression:
+                    regressions.append(line)
+                    self.stdout.write(self.style.ERROR(line))
+                else:
+                    self.stdout.write(line)
+        if regressions:
+            raise CommandError(f'{len(regressions)} régression(s) au-delà de {max_regression}%.')
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tontines import feed
+
+
+class Command(BaseCommand):
+    help = "Supprime les éléments du fil d'activité plus anciens que la durée de rétention."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ACTIVITY_RETENTION_DAYS,
+                            help="Ancienneté maximale (jours)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - timedelta(days=options['days'])
+        count = feed.prune(older_than, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{count} élément(s) de fil supprimé(s)."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tontines import feed
+from tontines.models import ActivityFeedItem
+
+
+class Command(BaseCommand):
+    help = "Reconstruit le fil d'activité des tableaux de bord depuis les dernières contributions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--per-tontine', type=int, default=20, help='Contributions reprises par tontine')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            ActivityFeedItem.objects.all().delete()
+            count = feed.backfill(per_tontine=options['per_tontine'], batch_size=options['batch_size'])
+            # Les contributions reprises ne sont pas forcément récentes
+            count -= feed.prune(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{count} élément(s) de fil créé(s)."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tontines import summaries
+
+
+class Command(BaseCommand):
+    help = "Recalcule les résumés financiers (UserFinancialSummary) depuis les tables sources."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = summaries.rebuild_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{count} résumé(s) recalculé(s).'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from tontines import rollups
+
+
+class Command(BaseCommand):
+    help = "Recalcule l'agrégat quotidien des contributions (ContributionDailyRollup) depuis l'historique."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tontine', type=int, action='append', dest='tontines',
+                            help='Limiter à une tontine (option répétable)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rollups.rebuild(options['tontines'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{count} jour(s) agrégé(s).'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from tontines import payouts
+
+
+class Command(BaseCommand):
+    help = (
+        "Verse le pot des tontines dont la date de versement est atteinte (à lancer chaque jour). "
+        "Une exécution interrompue reprend au dernier lot validé."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        run = payouts.run(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{run.payouts} versement(s) pour {run.total} FCFA ({run.day}).'))
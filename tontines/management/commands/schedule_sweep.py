@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tontines import schedule
+
+
+class Command(BaseCommand):
+    help = "Avance la prochaine échéance des tontines dont la date est atteinte (à lancer chaque jour)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = schedule.sweep(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{count} échéance(s) avancée(s).'))
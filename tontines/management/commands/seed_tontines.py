@@ -0,0 +1,361 @@
+"""
+Générateur de données synthétiques pour les tests de charge et de volume.
+
+Distribution réaliste: quelques très grosses tontines et beaucoup de petites
+(taille en loi de Pareto), des membres surtout actifs, des contributions
+manquées, des coffres pour une partie des utilisateurs. Tout est écrit avec
+bulk_create par lots; les totaux (pots, totaux des membres, soldes) sont
+calculés à l'avance pour rester cohérents, puis les soldes sont ouverts au
+grand livre et les résumés financiers reconstruits.
+
+    python manage.py seed_tontines --users 100000 --tontines 10000 --huge 5
+    python manage.py seed_tontines --users 1000000 --tontines 50000 --batch-size 10000
+
+Les utilisateurs générés se connectent avec --password (password123 par défaut).
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from tontines import counters, feed, ledger, recurrence, rollups, schedule, summaries
+from tontines.models import (
+    BeneficiaryAllocation, Contribution, LedgerEntry, Tontine, TontineMember, Transaction, Vault, Wallet,
+)
+
+User = get_user_model()
+
+FIRST_NAMES = ('Aya', 'Awa', 'Fatou', 'Mariam', 'Adjoua', 'Aminata', 'Koffi', 'Yao', 'Kouassi', 'Moussa',
+               'Ibrahim', 'Seydou', 'Akissi', 'Affoué', 'Salimata', 'Drissa', 'Nadia', 'Grâce')
+LAST_NAMES = ('Koné', 'Traoré', 'Ouattara', 'Coulibaly', 'Kouamé', "N'Guessan", 'Yao', 'Diabaté',
+              'Bamba', 'Touré', 'Konan', 'Diallo', 'Kouadio', 'Soro', 'Cissé', 'Fofana')
+USER_TYPES = (('woman', 50), ('man', 25), ('rural_woman', 10), ('student', 8), ('community', 4), ('manager', 3))
+AMOUNTS = ((Decimal('500'), 10), (Decimal('1000'), 30), (Decimal('2000'), 25), (Decimal('5000'), 20),
+           (Decimal('10000'), 10), (Decimal('25000'), 5))
+CYCLE_DURATIONS = ((7, 20), (15, 20), (30, 60))
+MEETING_SCHEDULES = ('Tous les samedis à 10h', 'Un dimanche sur deux à 16h', 'Le premier samedi du mois à 15h',
+                     'Le 5 de chaque mois à 18h', 'Chaque mercredi 18h30', '')
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+@contextmanager
+def _historical_dates():
+    """Laisser bulk_create écrire les dates générées (auto_now_add les remplacerait par maintenant)."""
+    fields = [
+        model._meta.get_field(name) for model, name in (
+            (Tontine, 'created_at'), (TontineMember, 'joined_date'), (Contribution, 'created_at'),
+            (Transaction, 'created_at'), (BeneficiaryAllocation, 'allocated_date'),
+        )
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "Génère en masse utilisateurs, tontines, membres, contributions, transactions, coffres et allocations."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--tontines', type=int, default=100)
+        parser.add_argument('--huge', type=int, default=2, help='Nombre de très grosses tontines')
+        parser.add_argument('--huge-members', type=int, default=None,
+                            help='Membres par grosse tontine (défaut: 20%% des utilisateurs)')
+        parser.add_argument('--max-cycles', type=int, default=12, help='Cycles écoulés au plus par tontine')
+        parser.add_argument('--pay-rate', type=float, default=0.85, help='Probabilité de payer un cycle')
+        parser.add_argument('--vault-ratio', type=float, default=0.3, help="Part des utilisateurs avec un coffre")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed', help='Préfixe des identifiants générés')
+        parser.add_argument('--password', default='password123')
+        parser.add_argument('--seed', type=int, default=None, help='Graine aléatoire (données reproductibles)')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        self.today = timezone.localdate()
+        if options['users'] < 3:
+            raise CommandError('Il faut au moins 3 utilisateurs.')
+        if User.objects.filter(username__startswith=f'{self.prefix}-').exists():
+            raise CommandError(f'Des données "{self.prefix}" existent déjà: choisissez un autre --prefix.')
+        if Tontine.objects.filter(code__startswith=self.prefix[:3].upper()).exists():
+            raise CommandError(f'Des codes de tontine {self.prefix[:3].upper()}… existent déjà: choisissez un autre --prefix.')
+
+        started = time.perf_counter()
+        with _historical_dates():
+            user_ids = self._create_users(options['users'], options['password'])
+            plans = self._plan_tontines(user_ids, options)
+            spent = self._spent_per_user(plans)
+            wallets, vaults = self._create_wallets_and_vaults(user_ids, spent, options['vault_ratio'])
+            counts = self._create_tontines(plans, wallets)
+            self._create_deposits(user_ids, wallets, spent, vaults)
+
+        self._open_ledger(wallets, vaults, plans)
+        for start in range(0, len(user_ids), self.batch_size):
+            summaries.rebuild(user_ids[start:start + self.batch_size])
+        tontine_ids = [plan['tontine_id'] for plan in plans]
+        for start in range(0, len(tontine_ids), self.batch_size):
+            rollups.rebuild(tontine_ids[start:start + self.batch_size], batch_size=self.batch_size)
+        counters.rebuild(tontine_ids, batch_size=self.batch_size)
+        feed.backfill(tontine_ids, batch_size=self.batch_size)
+
+        counts['utilisateurs'] = len(user_ids)
+        counts['coffres'] = len(vaults)
+        summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'{summary} en {time.perf_counter() - started:.1f}s.'))
+
+    # --- Utilisateurs -----------------------------------------------------
+
+    def _create_users(self, count, password):
+        password = make_password(password)
+        rng = self.rng
+        ids = []
+        for start in range(0, count, self.batch_size):
+            users = User.objects.bulk_create([
+                User(
+                    username=f'{self.prefix}-{i}',
+                    phone_number=f'{self.prefix[:8]}{i:010d}',
+                    password=password,
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    user_type=_weighted(rng, USER_TYPES),
+                    gender=rng.choice('FFM'),
+                )
+                for i in range(start, min(start + self.batch_size, count))
+            ])
+            ids.extend(user.pk for user in users)
+        if not ids or ids[0] is None:
+            ids = list(
+                User.objects.filter(username__startswith=f'{self.prefix}-').order_by('id').values_list('id', flat=True)
+            )
+        self.stdout.write(f'{len(ids)} utilisateurs créés.')
+        return ids
+
+    # --- Plan des tontines (tailles, cycles, paiements) -------------------
+
+    def _plan_tontines(self, user_ids, options):
+        rng = self.rng
+        huge_members = min(len(user_ids), options['huge_members'] or max(3, len(user_ids) // 5))
+        plans = []
+        for index in range(options['tontines']):
+            huge = index < options['huge']
+            if huge:
+                size, status = huge_members, 'active'
+            else:
+                # Pareto: beaucoup de tontines de 5 à 20 membres, quelques centaines au plus
+                size = min(len(user_ids), max(3, int(rng.paretovariate(1.6) * 5)))
+                status = _weighted(rng, (('active', 70), ('draft', 15), ('completed', 10), ('paused', 5)))
+            cycle_duration = _weighted(rng, CYCLE_DURATIONS)
+            cycles = 0 if status == 'draft' else rng.randint(1, options['max_cycles'])
+            members = []
+            for position, user_id in enumerate(rng.sample(user_ids, size)):
+                member_status = 'active' if position == 0 else _weighted(
+                    rng, (('active', 93), ('pending', 5), ('suspended', 2))
+                )
+                paid = 0
+                if member_status != 'pending' and cycles:
+                    paid = sum(rng.random() < options['pay_rate'] for _ in range(cycles))
+                members.append((user_id, member_status, paid))
+            plans.append({
+                'index': index,
+                'status': status,
+                'amount': _weighted(rng, AMOUNTS),
+                'cycle_duration': cycle_duration,
+                'cycles': cycles,
+                'start_date': self.today - timedelta(days=cycle_duration * cycles + rng.randint(0, 5)),
+                'members': members,
+                'meeting_schedule': rng.choice(MEETING_SCHEDULES),
+            })
+        return plans
+
+    def _spent_per_user(self, plans):
+        spent = {}
+        for plan in plans:
+            for user_id, _, paid in plan['members']:
+                if paid:
+                    spent[user_id] = spent.get(user_id, Decimal('0')) + plan['amount'] * paid
+        return spent
+
+    # --- Porte-monnaie et coffres ------------------------------------------
+
+    def _create_wallets_and_vaults(self, user_ids, spent, vault_ratio):
+        rng = self.rng
+        wallets, vaults = {}, {}
+        for start in range(0, len(user_ids), self.batch_size):
+            chunk = user_ids[start:start + self.batch_size]
+            created = Wallet.objects.bulk_create([
+                Wallet(user_id=user_id, balance=Decimal(rng.randrange(0, 50000, 500)))
+                for user_id in chunk
+            ])
+            for wallet in created:
+                wallets[wallet.user_id] = (wallet.pk, wallet.balance)
+            created = Vault.objects.bulk_create([
+                Vault(
+                    owner_id=user_id,
+                    name=rng.choice(('Epargne', 'Scolarité', 'Projet', 'Urgences')),
+                    balance=Decimal(rng.randrange(5000, 200000, 5000)),
+                    locked_until=self.today + timedelta(days=rng.randint(-30, 365)) if rng.random() < 0.5 else None,
+                )
+                for user_id in chunk if rng.random() < vault_ratio
+            ])
+            for vault in created:
+                vaults[vault.owner_id] = (vault.pk, vault.balance)
+        return wallets, vaults
+
+    # --- Tontines, membres, contributions, paiements, allocations -----------
+
+    def _when(self, plan, cycle):
+        """Date (aware) d'un paiement du cycle donné."""
+        day = plan['start_date'] + timedelta(days=plan['cycle_duration'] * cycle + self.rng.randint(0, 3))
+        moment = datetime.combine(min(day, self.today), datetime.min.time()) + timedelta(
+            seconds=self.rng.randint(7 * 3600, 21 * 3600)
+        )
+        return timezone.make_aware(moment)
+
+    def _create_tontines(self, plans, wallets):
+        counts = {'tontines': 0, 'membres': 0, 'contributions': 0, 'allocations': 0}
+        code_prefix = self.prefix[:3].upper()
+        for start in range(0, len(plans), self.batch_size):
+            chunk = plans[start:start + self.batch_size]
+            tontines = Tontine.objects.bulk_create([
+                Tontine(
+                    name=f'Tontine {plan["index"] + 1}',
+                    code=f'{code_prefix}{plan["index"]:07d}',
+                    description='Tontine générée pour les tests de charge',
+                    manager_id=plan['members'][0][0],
+                    start_date=plan['start_date'],
+                    status=plan['status'],
+                    contribution_amount=plan['amount'],
+                    total_pot=sum((plan['amount'] * paid for _, _, paid in plan['members']), Decimal('0')),
+                    cycle_duration=plan['cycle_duration'],
+                    meeting_schedule=plan['meeting_schedule'],
+                    meeting_rule=recurrence.parse(plan['meeting_schedule']),
+                    next_due_date=None if plan['status'] == 'completed' else schedule.compute_next_due_date(
+                        plan['start_date'], plan['cycle_duration'], self.today),
+                    next_payout_date=schedule.compute_next_payout_date(
+                        plan['start_date'], plan['cycle_duration'], self.today,
+                    ) if plan['status'] in ('active', 'paused') else None,
+                    created_at=timezone.make_aware(datetime.combine(plan['start_date'], datetime.min.time())),
+                )
+                for plan in chunk
+            ])
+            for plan, tontine in zip(chunk, tontines):
+                plan['tontine_id'] = tontine.pk
+                plan['pot'] = tontine.total_pot
+            counts['tontines'] += len(tontines)
+
+        for plan in plans:
+            with transaction.atomic():
+                self._create_members(plan, wallets, counts)
+        return counts
+
+    def _create_members(self, plan, wallets, counts):
+        rng = self.rng
+        tontine_id, amount = plan['tontine_id'], plan['amount']
+        members = []
+        for start in range(0, len(plan['members']), self.batch_size):
+            chunk = plan['members'][start:start + self.batch_size]
+            members.extend(TontineMember.objects.bulk_create([
+                TontineMember(
+                    tontine_id=tontine_id,
+                    user_id=user_id,
+                    role='president' if start + position == 0 else (
+                        'treasurer' if start + position == 1 else 'member'
+                    ),
+                    status=status,
+                    total_contributed=amount * paid,
+                    joined_date=plan['start_date'],
+                )
+                for position, (user_id, status, paid) in enumerate(chunk)
+            ]))
+        counts['membres'] += len(members)
+
+        note = f'Paiement contribution tontine {tontine_id}'
+        contributions, payments = [], []
+        for member, (user_id, _, paid) in zip(members, plan['members']):
+            for cycle in sorted(rng.sample(range(plan['cycles']), paid)):
+                when = self._when(plan, cycle)
+                contributions.append(Contribution(tontine_id=tontine_id, member=member, amount=amount, created_at=when))
+                payments.append(Transaction(
+                    user_id=user_id, wallet_id=wallets[user_id][0], amount=amount,
+                    type='payment', status='completed', note=note, created_at=when,
+                ))
+            if len(contributions) >= self.batch_size:
+                counts['contributions'] += self._flush(contributions, payments)
+        counts['contributions'] += self._flush(contributions, payments)
+
+        # Un bénéficiaire par cycle écoulé, à tour de rôle parmi les membres actifs
+        active = [member for member in members if member.status == 'active']
+        if active and plan['cycles']:
+            BeneficiaryAllocation.objects.bulk_create([
+                BeneficiaryAllocation(
+                    tontine_id=tontine_id,
+                    member=active[cycle % len(active)],
+                    cycle_number=cycle // len(active) + 1,
+                    amount=amount * len(active),
+                    allocated_date=self._when(plan, cycle + 1),
+                )
+                for cycle in range(plan['cycles'])
+            ], batch_size=self.batch_size)
+            counts['allocations'] += plan['cycles']
+
+    def _flush(self, contributions, payments):
+        Contribution.objects.bulk_create(contributions, batch_size=self.batch_size)
+        Transaction.objects.bulk_create(payments, batch_size=self.batch_size)
+        count = len(contributions)
+        contributions.clear()
+        payments.clear()
+        return count
+
+    # --- Dépôts: de quoi couvrir paiements, coffres et solde restant --------
+
+    def _create_deposits(self, user_ids, wallets, spent, vaults):
+        rng = self.rng
+        transactions = []
+        for user_id in user_ids:
+            wallet_id, balance = wallets[user_id]
+            vault = vaults.get(user_id)
+            needed = balance + spent.get(user_id, Decimal('0')) + (vault[1] if vault else Decimal('0'))
+            opened = timezone.now() - timedelta(days=rng.randint(400, 800))
+            if needed:
+                transactions.append(Transaction(
+                    user_id=user_id, wallet_id=wallet_id, amount=needed, type='deposit', status='completed',
+                    note=f'Dépôt via {rng.choice(("orange_money", "mtn_money", "wave", "moov_money"))}',
+                    created_at=opened,
+                ))
+            if vault:
+                transactions.append(Transaction(
+                    user_id=user_id, wallet_id=wallet_id, vault_id=vault[0], amount=vault[1],
+                    type='transfer', status='completed', note='Dépot vers coffre',
+                    created_at=opened + timedelta(hours=1),
+                ))
+            if len(transactions) >= self.batch_size:
+                Transaction.objects.bulk_create(transactions)
+                transactions.clear()
+        Transaction.objects.bulk_create(transactions)
+
+    def _open_ledger(self, wallets, vaults, plans):
+        """Soldes d'ouverture au grand livre, pour que ledger_rebuild ne signale aucun écart."""
+        balances = [
+            *((ledger.Account(LedgerEntry.WALLET, pk, user_id), balance) for user_id, (pk, balance) in wallets.items()),
+            *((ledger.Account(LedgerEntry.VAULT, pk, user_id), balance) for user_id, (pk, balance) in vaults.items()),
+            *((ledger.Account(LedgerEntry.TONTINE, plan['tontine_id'], None), plan['pot']) for plan in plans),
+        ]
+        for start in range(0, len(balances), self.batch_size):
+            ledger.open_balances(balances[start:start + self.batch_size], batch_size=self.batch_size)
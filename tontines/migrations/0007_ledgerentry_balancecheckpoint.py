@@ -0,0 +1,74 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:41
+
+import uuid
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def open_balances(apps, schema_editor):
+    """Écrire les soldes existants au grand livre (contrepartie: compte externe d'ouverture)."""
+    LedgerEntry = apps.get_model('tontines', 'LedgerEntry')
+    sources = [
+        ('wallet', apps.get_model('tontines', 'Wallet'), 'balance', 'user_id'),
+        ('vault', apps.get_model('tontines', 'Vault'), 'balance', 'owner_id'),
+        ('tontine', apps.get_model('tontines', 'Tontine'), 'total_pot', None),
+    ]
+    for account_type, model, field, owner in sources:
+        entries = []
+        for obj in model.objects.exclude(**{field: 0}).iterator():
+            amount = getattr(obj, field)
+            source, destination = ('external', 0, None), (account_type, obj.pk, getattr(obj, owner) if owner else None)
+            if amount < 0:
+                source, destination, amount = destination, source, -amount
+            posting = uuid.uuid4()
+            for (acc_type, acc_id, user_id), direction in ((source, 'debit'), (destination, 'credit')):
+                entries.append(LedgerEntry(
+                    posting=posting, account_type=acc_type, account_id=acc_id, user_id=user_id,
+                    direction=direction, amount=amount,
+                ))
+        LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tontines', '0006_add_beneficiary_allocation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account_type', models.CharField(choices=[('wallet', 'Porte-monnaie'), ('vault', 'Coffre'), ('tontine', 'Pot de tontine'), ('external', 'Externe')], max_length=10)),
+                ('account_id', models.BigIntegerField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('last_entry_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account_type', 'account_id', '-last_entry_id'], name='checkpoint_account_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posting', models.UUIDField(db_index=True)),
+                ('account_type', models.CharField(choices=[('wallet', 'Porte-monnaie'), ('vault', 'Coffre'), ('tontine', 'Pot de tontine'), ('external', 'Externe')], max_length=10)),
+                ('account_id', models.BigIntegerField()),
+                ('direction', models.CharField(choices=[('debit', 'Débit'), ('credit', 'Crédit')], max_length=6)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='tontines.transaction')),
+                ('user', models.ForeignKey(blank=True, help_text='Titulaire du compte', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account_type', 'account_id', 'id'], name='ledger_account_idx')],
+            },
+        ),
+        migrations.RunPython(open_balances, migrations.RunPython.noop),
+    ]
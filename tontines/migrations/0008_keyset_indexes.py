@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tontines', '0007_ledgerentry_balancecheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['tontine', 'created_at', 'id'], name='contribution_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='transaction_user_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tontines', '0008_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserFinancialSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wallet_balance', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('vaults_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_contributed', models.DecimalField(decimal_places=2, default=0, help_text='Total contribué dans les adhésions actives', max_digits=15)),
+                ('tontine_count', models.IntegerField(default=0)),
+                ('active_tontine_count', models.IntegerField(default=0)),
+                ('draft_tontine_count', models.IntegerField(default=0)),
+                ('completed_tontine_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='financial_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
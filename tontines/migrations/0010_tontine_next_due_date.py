@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:00
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_next_due_date(apps, schema_editor):
+    """Calculer l'échéance des tontines existantes (même règle que schedule.compute_next_due_date)."""
+    Tontine = apps.get_model('tontines', 'Tontine')
+    today = timezone.localdate()
+    batch = []
+    for tontine in Tontine.objects.exclude(status='completed').only('id', 'start_date', 'cycle_duration').iterator():
+        start, cycle_days = tontine.start_date, tontine.cycle_duration or 30
+        if today < start:
+            tontine.next_due_date = start
+        else:
+            tontine.next_due_date = start + timedelta(days=((today - start).days // cycle_days + 1) * cycle_days)
+        batch.append(tontine)
+    Tontine.objects.bulk_update(batch, ['next_due_date'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tontines', '0009_userfinancialsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tontine',
+            name='next_due_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='tontine',
+            index=models.Index(fields=['status', 'next_due_date'], name='tontine_next_due_idx'),
+        ),
+        migrations.RunPython(fill_next_due_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:04
+
+from django.db import migrations, models
+
+from tontines import recurrence
+
+
+def parse_meeting_schedules(apps, schema_editor):
+    """Tirer la règle de récurrence des calendriers de réunion déjà saisis."""
+    Tontine = apps.get_model('tontines', 'Tontine')
+    batch = []
+    for tontine in Tontine.objects.exclude(meeting_schedule='').only('id', 'meeting_schedule').iterator():
+        tontine.meeting_rule = recurrence.parse(tontine.meeting_schedule)
+        batch.append(tontine)
+    Tontine.objects.bulk_update(batch, ['meeting_rule'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tontines', '0010_tontine_next_due_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tontine',
+            name='meeting_rule',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(parse_meeting_schedules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tontines', '0011_tontine_meeting_rule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContributionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('tontine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='tontines.tontine')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='contributiondailyrollup',
+            constraint=models.UniqueConstraint(fields=('tontine', 'day'), name='contribution_rollup_unique_day'),
+        ),
+    ]
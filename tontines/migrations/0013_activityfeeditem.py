@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tontines', '0012_contributiondailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityFeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('contribution', 'Contribution'), ('collection', 'Collecte'), ('allocation', 'Attribution'), ('member_joined', 'Adhésion'), ('member_left', 'Départ')], max_length=20)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('tontine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='tontines.tontine')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='activity_feed', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at', 'id'], name='activity_user_recent_idx'), models.Index(condition=models.Q(('user__isnull', True)), fields=['tontine', 'created_at', 'id'], name='activity_shared_recent_idx')],
+            },
+        ),
+    ]
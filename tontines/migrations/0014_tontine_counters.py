@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """Calculer les compteurs des tontines existantes (même calcul que counters.rebuild)."""
+    Tontine = apps.get_model('tontines', 'Tontine')
+    TontineMember = apps.get_model('tontines', 'TontineMember')
+    Contribution = apps.get_model('tontines', 'Contribution')
+
+    def count(queryset):
+        return Coalesce(Subquery(
+            queryset.filter(tontine=OuterRef('pk')).order_by().values('tontine')
+            .annotate(value=Count('pk')).values('value')
+        ), Value(0))
+
+    Tontine.objects.update(
+        active_member_count=count(TontineMember.objects.filter(status='active')),
+        pending_member_count=count(TontineMember.objects.filter(status='pending')),
+        contribution_count=count(Contribution.objects.all()),
+        last_contribution_at=Subquery(
+            Contribution.objects.filter(tontine=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tontines', '0013_activityfeeditem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tontine',
+            name='active_member_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tontine',
+            name='contribution_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tontine',
+            name='last_contribution_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tontine',
+            name='pending_member_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tontines', '0014_tontine_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tontine',
+            name='counter_shards',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Fractions du pot et des compteurs pour les tontines très sollicitées (0: aucune)'),
+        ),
+        migrations.CreateModel(
+            name='TontineCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('total_pot', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('contribution_count', models.PositiveIntegerField(default=0)),
+                ('last_contribution_at', models.DateTimeField(blank=True, null=True)),
+                ('tontine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='tontines.tontine')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='tontinecountershard',
+            constraint=models.UniqueConstraint(fields=('tontine', 'shard'), name='tontine_counter_shard_unique'),
+        ),
+    ]
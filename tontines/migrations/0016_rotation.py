@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tontines', '0015_tontine_counter_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tontine',
+            name='rotation_method',
+            field=models.CharField(choices=[('fixed', "Ordre d'adhésion"), ('seniority', 'Ancienneté des membres'), ('random', 'Tirage au sort')], default='fixed', max_length=20, verbose_name='Ordre des bénéficiaires'),
+        ),
+        migrations.CreateModel(
+            name='RotationSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cycle', models.PositiveIntegerField()),
+                ('position', models.PositiveIntegerField()),
+                ('allocation', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rotation_slot', to='tontines.beneficiaryallocation')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rotation_slots', to='tontines.tontinemember')),
+                ('tontine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rotation', to='tontines.tontine')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('allocation__isnull', True)), fields=['tontine', 'cycle', 'position'], name='rotation_open_slot_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rotationslot',
+            constraint=models.UniqueConstraint(fields=('tontine', 'cycle', 'position'), name='rotation_unique_position'),
+        ),
+        migrations.AddConstraint(
+            model_name='rotationslot',
+            constraint=models.UniqueConstraint(fields=('tontine', 'cycle', 'member'), name='rotation_unique_member'),
+        ),
+    ]
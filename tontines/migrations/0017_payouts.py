@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+from tontines.schedule import compute_next_payout_date
+
+
+def fill_next_payout_dates(apps, schema_editor):
+    """Première date de versement des tontines en cours (même calcul que schedule.refresh)."""
+    Tontine = apps.get_model('tontines', 'Tontine')
+    tontines = list(Tontine.objects.filter(status__in=('active', 'paused')).only('id', 'start_date', 'cycle_duration'))
+    for tontine in tontines:
+        tontine.next_payout_date = compute_next_payout_date(tontine.start_date, tontine.cycle_duration)
+    Tontine.objects.bulk_update(tontines, ['next_payout_date'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tontines', '0016_rotation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text="Versements dus jusqu'à cette date")),
+                ('last_tontine_id', models.PositiveBigIntegerField(default=0, help_text='Dernière tontine du dernier lot validé')),
+                ('payouts', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='tontine',
+            name='next_payout_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='type',
+            field=models.CharField(choices=[('deposit', 'Dépôt'), ('withdraw', 'Retrait'), ('payment', 'Paiement'), ('transfer', 'Transfert'), ('payout', 'Versement tontine')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='tontine',
+            index=models.Index(fields=['status', 'next_payout_date'], name='tontine_next_payout_idx'),
+        ),
+        migrations.RunPython(fill_next_payout_dates, migrations.RunPython.noop),
+    ]
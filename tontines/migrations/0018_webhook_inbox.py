@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tontines', '0017_payouts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(default='getmipay', max_length=20)),
+                ('event_id', models.CharField(help_text="Identifiant de l'événement chez le fournisseur", max_length=100)),
+                ('event_type', models.CharField(max_length=50)),
+                ('transaction_ref', models.CharField(blank=True, help_text='Transaction concernée (identifiant du fournisseur)', max_length=100)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('processed', 'Appliqué'), ('duplicate', 'Doublon'), ('failed', 'Échec')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.CharField(blank=True, max_length=255)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='webhook_pending_idx'), models.Index(fields=['transaction_ref', 'event_type'], name='webhook_transaction_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='webhookevent',
+            constraint=models.UniqueConstraint(fields=('provider', 'event_id'), name='webhook_unique_event'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:41
+
+import re
+
+from django.db import migrations, models
+from django.db.models import Q
+
+# Note des opérations GetMiPay: "Dépôt initialisé via wave - TXN123 - COMPLÉTÉ"
+PROVIDER_NOTE = re.compile(r'(?:initialisé|initié) via \S+ - (?P<reference>.+?)(?P<outcome> - (?:COMPLÉTÉ|ÉCHOUÉ.*))?$')
+OUTCOMES = {None: 'pending', ' - COMPLÉTÉ': 'completed', ' - ÉCHOUÉ': 'failed', ' - ÉCHOUÉ, Remboursé': 'refunded'}
+
+
+def fill_statuses(apps, schema_editor):
+    """Transactions existantes: complétées, sauf les opérations GetMiPay (statut et référence lus dans la note)."""
+    Transaction = apps.get_model('tontines', 'Transaction')
+    Transaction.objects.update(status='completed')
+    provider = Transaction.objects.filter(type__in=('deposit', 'withdraw')).filter(
+        Q(note__contains='initialisé via') | Q(note__contains='initié via')
+    )
+    seen = set()
+    for transaction in provider.only('id', 'note').order_by('id').iterator():
+        match = PROVIDER_NOTE.search(transaction.note)
+        if not match:
+            continue
+        transaction.status = OUTCOMES.get(match['outcome'], 'completed')
+        reference = match['reference']
+        if reference != 'None' and reference not in seen:
+            seen.add(reference)
+            transaction.provider_reference = reference
+        transaction.save(update_fields=['status', 'provider_reference'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tontines', '0018_webhook_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='provider_reference',
+            field=models.CharField(blank=True, editable=False, help_text='Identifiant de la transaction chez le fournisseur de paiement', max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='status',
+            field=models.CharField(choices=[('pending', 'En attente'), ('completed', 'Complétée'), ('failed', 'Échouée'), ('refunded', 'Remboursée')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='transaction_pending_idx'),
+        ),
+        migrations.RunPython(fill_statuses, migrations.RunPython.noop),
+    ]
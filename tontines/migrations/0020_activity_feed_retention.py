@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tontines', '0019_transaction_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activityfeeditem',
+            index=models.Index(fields=['created_at', 'id'], name='activity_created_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 # Create your models here.
 
@@ -10,6 +11,11 @@ class Tontine(models.Model):
         ('paused', 'En pause'),
         ('completed', 'Terminée'),
     )
+    ROTATION_CHOICES = (
+        ('fixed', "Ordre d'adhésion"),
+        ('seniority', 'Ancienneté des membres'),
+        ('random', 'Tirage au sort'),
+    )
     
     name = models.CharField(max_length=200)
     code = models.CharField(max_length=10, unique=True)
@@ -22,8 +28,31 @@ class Tontine(models.Model):
     total_pot = models.DecimalField(max_digits=15, decimal_places=2, default=0)
     meeting_schedule = models.CharField(max_length=100, blank=True, verbose_name="Calendrier des réunions")
     meeting_location = models.CharField(max_length=200, blank=True, verbose_name="Lieu des réunions")
+    # Règle de récurrence (RRULE) tirée de meeting_schedule, voir recurrence.py
+    meeting_rule = models.CharField(max_length=100, blank=True, editable=False)
     cycle_duration = models.IntegerField(default=30, help_text="Durée du cycle en jours")
+    rotation_method = models.CharField(
+        max_length=20, choices=ROTATION_CHOICES, default='fixed', verbose_name="Ordre des bénéficiaires"
+    )
+    # Prochaine échéance, tenue à jour par schedule.py
+    next_due_date = models.DateField(null=True, blank=True, editable=False)
+    # Prochain versement du pot (fin de cycle), tenu à jour par schedule.py et payouts.py
+    next_payout_date = models.DateField(null=True, blank=True, editable=False)
+    # Compteurs dénormalisés, tenus à jour par counters.py
+    active_member_count = models.PositiveIntegerField(default=0, editable=False)
+    pending_member_count = models.PositiveIntegerField(default=0, editable=False)
+    contribution_count = models.PositiveIntegerField(default=0, editable=False)
+    last_contribution_at = models.DateTimeField(null=True, blank=True, editable=False)
+    counter_shards = models.PositiveSmallIntegerField(
+        default=0, help_text="Fractions du pot et des compteurs pour les tontines très sollicitées (0: aucune)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_due_date'], name='tontine_next_due_idx'),
+            models.Index(fields=['status', 'next_payout_date'], name='tontine_next_payout_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.code})"
@@ -49,6 +78,14 @@ class TontineMember(models.Model):
     
     class Meta:
         unique_together = ['tontine', 'user']
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Statut tel que chargé: les signaux en déduisent les compteurs à déplacer
+        if 'status' in field_names:
+            instance._loaded_status = values[field_names.index('status')]
+        return instance
     
     def __str__(self):
         return f"{self.user} dans {self.tontine}"
@@ -60,10 +97,48 @@ class Contribution(models.Model):
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['tontine', 'created_at', 'id'], name='contribution_keyset_idx'),
+        ]
+
     def __str__(self):
         return f"{self.amount} par {self.member.user} pour {self.tontine} le {self.created_at}"
 
 
+class ContributionDailyRollup(models.Model):
+    """Nombre et somme des contributions d'une tontine par jour (tenu à jour par rollups.py)"""
+    tontine = models.ForeignKey(Tontine, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tontine', 'day'], name='contribution_rollup_unique_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.tontine} {self.day}: {self.count} contribution(s), {self.total}"
+
+
+class TontineCounterShard(models.Model):
+    """Fraction du pot et des compteurs de contributions d'une tontine fractionnée (voir counters.py)"""
+    tontine = models.ForeignKey(Tontine, on_delete=models.CASCADE, related_name='shards')
+    shard = models.PositiveSmallIntegerField()
+    total_pot = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    contribution_count = models.PositiveIntegerField(default=0)
+    last_contribution_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tontine', 'shard'], name='tontine_counter_shard_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.tontine} #{self.shard}: {self.total_pot}"
+
+
 class Wallet(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='wallet')
     balance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
@@ -94,19 +169,116 @@ class Transaction(models.Model):
         ('withdraw', 'Retrait'),
         ('payment', 'Paiement'),
         ('transfer', 'Transfert'),
+        ('payout', 'Versement tontine'),
     )
+    STATUS_CHOICES = (
+        ('pending', 'En attente'),
+        ('completed', 'Complétée'),
+        ('failed', 'Échouée'),
+        ('refunded', 'Remboursée'),
+    )
+    # Transitions permises, appliquées par UPDATE conditionnel (payments.transition)
+    TRANSITIONS = {
+        'pending': ('completed', 'failed', 'refunded'),
+    }
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='transactions')
     wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='transactions', null=True, blank=True)
     vault = models.ForeignKey(Vault, on_delete=models.CASCADE, related_name='transactions', null=True, blank=True)
     amount = models.DecimalField(max_digits=15, decimal_places=2)
     type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
+    # Les mouvements internes sont créés 'completed'; ceux d'un fournisseur restent
+    # 'pending' jusqu'à sa notification (voir getmipay_service.py)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    provider_reference = models.CharField(
+        max_length=100, unique=True, null=True, blank=True, editable=False,
+        help_text="Identifiant de la transaction chez le fournisseur de paiement",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     note = models.CharField(max_length=255, blank=True)
 
+    class Meta:
+        indexes = [
+            # Pagination par curseur de l'historique (voir pagination.py)
+            models.Index(fields=['user', 'created_at', 'id'], name='transaction_user_keyset_idx'),
+            # Transactions en attente d'un fournisseur (payments.expire_pending_deposits)
+            models.Index(fields=['created_at'], name='transaction_pending_idx', condition=models.Q(status='pending')),
+        ]
+
     def __str__(self):
         return f"{self.get_type_display()} {self.amount} - {self.user} on {self.created_at}"
 
 
+class LedgerEntry(models.Model):
+    """
+    Écriture du grand livre (append-only), source de vérité des soldes.
+    Chaque opération (posting) débite un compte et en crédite un autre du même montant.
+    Les colonnes Wallet.balance, Vault.balance et Tontine.total_pot en sont des projections.
+    """
+    WALLET = 'wallet'
+    VAULT = 'vault'
+    TONTINE = 'tontine'
+    EXTERNAL = 'external'
+    ACCOUNT_TYPES = (
+        (WALLET, 'Porte-monnaie'),
+        (VAULT, 'Coffre'),
+        (TONTINE, 'Pot de tontine'),
+        (EXTERNAL, 'Externe'),
+    )
+    DEBIT = 'debit'
+    CREDIT = 'credit'
+    DIRECTIONS = (
+        (DEBIT, 'Débit'),
+        (CREDIT, 'Crédit'),
+    )
+
+    posting = models.UUIDField(db_index=True)
+    account_type = models.CharField(max_length=10, choices=ACCOUNT_TYPES)
+    account_id = models.BigIntegerField()
+    direction = models.CharField(max_length=6, choices=DIRECTIONS)
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='ledger_entries', help_text="Titulaire du compte")
+    transaction = models.ForeignKey(Transaction, on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='ledger_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['account_type', 'account_id', 'id'], name='ledger_account_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Les écritures du grand livre ne peuvent pas être modifiées.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Les écritures du grand livre ne peuvent pas être supprimées.")
+
+    def __str__(self):
+        return f"{self.get_direction_display()} {self.amount} {self.account_type}:{self.account_id}"
+
+
+class BalanceCheckpoint(models.Model):
+    """
+    Solde d'un compte couvrant toutes ses écritures jusqu'à last_entry_id inclus.
+    Solde courant = dernier checkpoint + écritures postérieures.
+    """
+    account_type = models.CharField(max_length=10, choices=LedgerEntry.ACCOUNT_TYPES)
+    account_id = models.BigIntegerField()
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+    last_entry_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['account_type', 'account_id', '-last_entry_id'], name='checkpoint_account_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_type}:{self.account_id} = {self.balance} (<= {self.last_entry_id})"
+
+
 class BeneficiaryAllocation(models.Model):
     """
     Modèle pour tracker qui reçoit la tontine et gérer les cycles de distribution.
@@ -123,3 +295,132 @@ class BeneficiaryAllocation(models.Model):
     
     def __str__(self):
         return f"{self.member.user} - Cycle {self.cycle_number} - {self.tontine}"
+
+
+class RotationSlot(models.Model):
+    """Place d'un membre dans l'ordre des bénéficiaires d'un cycle (voir rotation.py)"""
+    tontine = models.ForeignKey(Tontine, on_delete=models.CASCADE, related_name='rotation')
+    cycle = models.PositiveIntegerField()
+    position = models.PositiveIntegerField()
+    member = models.ForeignKey(TontineMember, on_delete=models.CASCADE, related_name='rotation_slots')
+    allocation = models.OneToOneField(
+        BeneficiaryAllocation, on_delete=models.SET_NULL, null=True, blank=True, related_name='rotation_slot'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tontine', 'cycle', 'position'], name='rotation_unique_position'),
+            models.UniqueConstraint(fields=['tontine', 'cycle', 'member'], name='rotation_unique_member'),
+        ]
+        indexes = [
+            # Places restant à servir: prochain bénéficiaire, membres pouvant encore recevoir
+            models.Index(
+                fields=['tontine', 'cycle', 'position'], name='rotation_open_slot_idx',
+                condition=models.Q(allocation__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tontine} - Cycle {self.cycle} - #{self.position} {self.member}"
+
+
+class PayoutRun(models.Model):
+    """Exécution des versements automatiques, reprise après interruption (voir payouts.py)"""
+    day = models.DateField(help_text="Versements dus jusqu'à cette date")
+    last_tontine_id = models.PositiveBigIntegerField(default=0, help_text="Dernière tontine du dernier lot validé")
+    payouts = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Versements du {self.day}: {self.payouts} ({self.total} FCFA)"
+
+
+class WebhookEvent(models.Model):
+    """Notification brute d'un fournisseur de paiement, appliquée plus tard par drain_webhooks (voir inbox.py)"""
+    STATUS_CHOICES = (
+        ('pending', 'En attente'),
+        ('processed', 'Appliqué'),
+        ('duplicate', 'Doublon'),
+        ('failed', 'Échec'),
+    )
+    provider = models.CharField(max_length=20, default='getmipay')
+    event_id = models.CharField(max_length=100, help_text="Identifiant de l'événement chez le fournisseur")
+    event_type = models.CharField(max_length=50)
+    transaction_ref = models.CharField(max_length=100, blank=True, help_text="Transaction concernée (identifiant du fournisseur)")
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.CharField(max_length=255, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'event_id'], name='webhook_unique_event'),
+        ]
+        indexes = [
+            # Événements à appliquer, dans l'ordre d'arrivée (parcours de drain_webhooks)
+            models.Index(fields=['id'], name='webhook_pending_idx', condition=models.Q(status='pending')),
+            models.Index(fields=['transaction_ref', 'event_type'], name='webhook_transaction_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event_type} {self.event_id} ({self.get_status_display()})"
+
+
+class UserFinancialSummary(models.Model):
+    """
+    Projection des chiffres financiers d'un utilisateur, lue par les tableaux de bord.
+    Mise à jour de façon incrémentale (voir summaries.py), reconstruite par
+    la commande rebuild_financial_summaries.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='financial_summary')
+    wallet_balance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    vaults_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    total_contributed = models.DecimalField(max_digits=15, decimal_places=2, default=0,
+                                            help_text="Total contribué dans les adhésions actives")
+    tontine_count = models.IntegerField(default=0)
+    active_tontine_count = models.IntegerField(default=0)
+    draft_tontine_count = models.IntegerField(default=0)
+    completed_tontine_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Résumé financier de {self.user}"
+
+
+class ActivityFeedItem(models.Model):
+    """
+    Événement d'une tontine (contribution, collecte, attribution, adhésion, départ)
+    copié dans le fil de chacun de ses membres à l'écriture (voir feed.py).
+    Sans utilisateur: événement d'une grande tontine, partagé et lu à la demande.
+    """
+    KIND_CHOICES = (
+        ('contribution', 'Contribution'),
+        ('collection', 'Collecte'),
+        ('allocation', 'Attribution'),
+        ('member_joined', 'Adhésion'),
+        ('member_left', 'Départ'),
+    )
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True,
+                             related_name='activity_feed')
+    tontine = models.ForeignKey(Tontine, on_delete=models.CASCADE, related_name='activity')
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='+')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='activity_user_recent_idx'),
+            models.Index(fields=['tontine', 'created_at', 'id'], name='activity_shared_recent_idx',
+                         condition=models.Q(user__isnull=True)),
+            # Purge des éléments anciens (feed.prune)
+            models.Index(fields=['created_at', 'id'], name='activity_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.tontine} ({self.created_at})"
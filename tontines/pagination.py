@@ -0,0 +1,70 @@
+"""
+Pagination par curseur (keyset) sur (created_at, id), du plus récent au plus ancien.
+
+Contrairement à OFFSET, une page profonde coûte autant que la première: la
+requête reprend juste après la dernière ligne vue, en s'appuyant sur les index
+composites (user, created_at, id) et (tontine, created_at, id).
+"""
+
+import base64
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(obj):
+    raw = f'{obj.created_at.isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor('Curseur de pagination invalide.')
+
+
+def page_size_from(request, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(request.GET.get('size', default))
+    except ValueError:
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_page(queryset, cursor=None, size=DEFAULT_PAGE_SIZE):
+    """
+    Retourne (éléments, curseur suivant ou None).
+    `queryset` doit porter un champ created_at; il est trié par -created_at, -id.
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+    items = list(queryset[:size + 1])
+    if len(items) > size:
+        items = items[:size]
+        return items, encode_cursor(items[-1])
+    return items, None
+
+
+def numbered_page(queryset, number, total, size=DEFAULT_PAGE_SIZE):
+    """
+    Page `number` (pagination numérotée) d'un queryset dont le total est déjà
+    connu (annotation): pas de COUNT(*) supplémentaire.
+    """
+    paginator = Paginator(queryset, size)
+    paginator.count = total  # cached_property: le total fourni remplace le COUNT(*)
+    return paginator.get_page(number)
@@ -0,0 +1,153 @@
+"""
+Service de paiement des contributions et des mouvements de porte-monnaie.
+
+Toutes les écritures d'un paiement (débit du porte-monnaie, contribution,
+totaux du membre et de la tontine) sont faites dans une seule transaction
+avec des expressions F(), pour qu'aucun paiement concurrent ne perde de mise à jour.
+Chaque mouvement est aussi écrit dans le grand livre (voir ledger.py).
+
+Ordre de verrouillage (toujours le même pour éviter les interblocages):
+    Wallet -> Vault -> TontineMember -> Tontine
+La ligne Tontine, la plus disputée, est verrouillée en dernier pour être
+retenue le moins longtemps possible; une tontine fractionnée répartit ces
+écritures sur plusieurs lignes (voir counters.py).
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+
+from . import counters, ledger, rollups, summaries
+from .models import Contribution, LedgerEntry, TontineMember, Transaction, Vault, Wallet
+
+
+class PaymentError(Exception):
+    """Erreur métier lors d'un paiement (le message est affichable à l'utilisateur)."""
+
+
+class WalletNotFound(PaymentError):
+    pass
+
+
+class InsufficientFunds(PaymentError):
+    pass
+
+
+class MembershipInactive(PaymentError):
+    pass
+
+
+def transition(transaction_id, new_status, from_status='pending'):
+    """
+    Passer une transaction de `from_status` à `new_status` par UPDATE
+    conditionnel: une notification rejouée ne l'applique pas deux fois.
+    Retourne False si la transaction n'était plus dans `from_status`.
+    """
+    if new_status not in Transaction.TRANSITIONS.get(from_status, ()):
+        raise ValueError(f'Transition interdite: {from_status} -> {new_status}')
+    return bool(Transaction.objects.filter(pk=transaction_id, status=from_status).update(status=new_status))
+
+
+def expire_pending_deposits(older_than):
+    """
+    Marquer échoués les dépôts restés en attente avant `older_than` (aucun
+    argent n'a bougé). Parcours de l'index partiel des transactions en attente.
+    Retourne le nombre de dépôts.
+    """
+    return Transaction.objects.filter(status='pending', type='deposit', created_at__lt=older_than).update(
+        status='failed',
+    )
+
+
+def _wallet_account(wallet_id, user_id):
+    return ledger.Account(LedgerEntry.WALLET, wallet_id, user_id)
+
+
+def debit_wallet(wallet_id, user_id, amount):
+    """
+    Débiter un porte-monnaie par UPDATE conditionnel (balance >= montant):
+    deux débits simultanés ne peuvent pas dépenser le même solde.
+    Doit être appelée dans une transaction.
+    """
+    debited = Wallet.objects.filter(pk=wallet_id, balance__gte=amount).update(
+        balance=F('balance') - amount
+    )
+    if not debited:
+        raise InsufficientFunds('Solde insuffisant sur le porte-monnaie.')
+    return _wallet_account(wallet_id, user_id)
+
+
+def credit_wallet(wallet_id, user_id, amount):
+    """Créditer un porte-monnaie (F()). Doit être appelée dans une transaction."""
+    Wallet.objects.filter(pk=wallet_id).update(balance=F('balance') + amount)
+    return _wallet_account(wallet_id, user_id)
+
+
+def deposit_to_wallet(wallet, amount, note, source=ledger.EXTERNAL_PROVIDER):
+    """Créditer le porte-monnaie d'un dépôt externe et l'écrire au grand livre."""
+    amount = Decimal(amount)
+    with transaction.atomic():
+        account = credit_wallet(wallet.pk, wallet.user_id, amount)
+        txn = Transaction.objects.create(
+            user_id=wallet.user_id, wallet=wallet, amount=amount, type='deposit', status='completed', note=note
+        )
+        ledger.transfer(source, account, amount, txn)
+    return txn
+
+
+def transfer_to_vault(wallet, vault, amount):
+    """Transférer du porte-monnaie vers un coffre (lève InsufficientFunds)."""
+    amount = Decimal(amount)
+    with transaction.atomic():
+        source = debit_wallet(wallet.pk, wallet.user_id, amount)
+        Vault.objects.filter(pk=vault.pk).update(balance=F('balance') + amount)
+        txn = Transaction.objects.create(
+            user_id=wallet.user_id, wallet=wallet, vault=vault, amount=amount,
+            type='transfer', status='completed', note='Dépot vers coffre'
+        )
+        ledger.transfer(source, ledger.vault_account(vault), amount, txn)
+    return txn
+
+
+def record_contribution(tontine, member, amount, source=ledger.EXTERNAL_CASH, txn=None):
+    """
+    Enregistrer une contribution et mettre à jour les totaux avec F().
+    `source` est le compte débité au grand livre (espèces par défaut).
+    Doit être appelée dans une transaction (transaction.atomic).
+    """
+    updated = TontineMember.objects.filter(pk=member.pk, status='active').update(
+        total_contributed=F('total_contributed') + amount
+    )
+    if not updated:
+        raise MembershipInactive(
+            "Votre adhésion n'est pas active. Le gestionnaire doit d'abord vous accepter."
+        )
+    contribution = Contribution.objects.create(tontine=tontine, member=member, amount=amount)
+    summaries.adjust([member.user_id], total_contributed=amount)
+    rollups.add(tontine.pk, 1, amount)
+    ledger.transfer(source, ledger.tontine_account(tontine), amount, txn)
+    counters.add_contributions(tontine, 1, amount, contribution.created_at)
+    return contribution
+
+
+def pay_contribution_from_wallet(user, tontine, member):
+    """
+    Payer la contribution de `member` à `tontine` depuis le porte-monnaie de `user`.
+    Retourne la Contribution créée, lève PaymentError sinon.
+    """
+    amount = Decimal(tontine.contribution_amount)
+
+    wallet_id = Wallet.objects.filter(user=user).values_list('id', flat=True).first()
+    if wallet_id is None:
+        raise WalletNotFound('Porte-monnaie introuvable. Faites un dépôt.')
+
+    with transaction.atomic():
+        source = debit_wallet(wallet_id, user.id, amount)
+        txn = Transaction.objects.create(
+            user=user, wallet_id=wallet_id, amount=amount, type='payment', status='completed',
+            note=f'Paiement contribution tontine {tontine.id}'
+        )
+        contribution = record_contribution(tontine, member, amount, source=source, txn=txn)
+
+    return contribution
@@ -0,0 +1,125 @@
+"""
+Versement du pot d'une tontine à son bénéficiaire.
+
+Un versement sert la prochaine place de la rotation (rotation.py): il crée
+l'allocation, crédite le porte-monnaie du bénéficiaire du pot complet, écrit
+l'opération au grand livre, remet le pot à zéro et avance
+Tontine.next_payout_date d'un cycle, dans une seule transaction. Le pot est
+débité par UPDATE conditionnel (pot et date de versement inchangés), comme un
+porte-monnaie (payments.debit_wallet): deux versements simultanés ne peuvent
+pas verser le même pot, et une contribution arrivée entre-temps reste dans le
+pot du cycle suivant.
+
+run() (commande run_payouts, à lancer chaque jour) verse le pot des tontines
+actives dont la date de versement est atteinte, par lots de `batch_size`
+tontines parcourues dans l'ordre des ids. Chaque lot est validé avec son point
+de reprise (PayoutRun.last_tontine_id): une exécution interrompue reprend au
+lot suivant, et une tontine déjà versée ne l'est pas deux fois (sa date a
+avancé dans la même transaction). Une tontine due sans pot ni membre actif
+voit seulement sa date avancée.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import counters, ledger, rotation
+from .models import PayoutRun, Tontine, Transaction, Wallet
+from .payments import PaymentError, credit_wallet
+
+
+class NothingToPay(PaymentError):
+    pass
+
+
+class AlreadyServed(PaymentError):
+    pass
+
+
+def _next_payout_date(tontine):
+    return (tontine.next_payout_date or timezone.localdate()) + timedelta(days=tontine.cycle_duration or 30)
+
+
+def _pay(tontine, member=None):
+    """Verser le pot à `member` (par défaut le prochain de la rotation). Doit être appelée dans une transaction."""
+    slot = rotation.next_slot(tontine)
+    if slot is None:
+        raise NothingToPay("Aucun membre actif ne peut recevoir la tontine.")
+    member = member or slot.member
+    amount = tontine.total_pot
+    if tontine.counter_shards:
+        counters.fold(tontine.pk)
+        amount = Tontine.objects.filter(pk=tontine.pk).values_list('total_pot', flat=True).get()
+    if amount <= 0:
+        raise NothingToPay("Le pot de la tontine est vide.")
+
+    allocation = rotation.allocate(tontine, member, slot.cycle, amount)
+    if allocation is None:
+        raise AlreadyServed(f"{member.user.get_full_name()} a déjà reçu la tontine ce cycle.")
+    wallet, _ = Wallet.objects.get_or_create(user_id=member.user_id)
+    account = credit_wallet(wallet.pk, member.user_id, amount)
+    txn = Transaction.objects.create(
+        user_id=member.user_id, wallet=wallet, amount=amount, type='payout', status='completed',
+        note=f'Versement tontine {tontine.name} (cycle {slot.cycle})'[:255],
+    )
+    ledger.transfer(ledger.tontine_account(tontine), account, amount, txn)
+    next_payout_date = _next_payout_date(tontine)
+    debited = Tontine.objects.filter(
+        pk=tontine.pk, total_pot__gte=amount, next_payout_date=tontine.next_payout_date,
+    ).update(total_pot=F('total_pot') - amount, next_payout_date=next_payout_date)
+    if not debited:
+        raise AlreadyServed("Le pot de ce cycle a déjà été versé.")
+    tontine.next_payout_date = next_payout_date
+    return allocation
+
+
+def pay_out(tontine, member=None):
+    """
+    Verser le pot de `tontine` à `member` (par défaut le prochain de la
+    rotation). Retourne la BeneficiaryAllocation créée, lève PaymentError sinon.
+    """
+    with transaction.atomic():
+        return _pay(tontine, member)
+
+
+def _pay_due(tontine):
+    """Verser le pot d'une tontine due (point de sauvegarde): l'allocation, ou None."""
+    try:
+        with transaction.atomic():
+            return _pay(tontine)
+    except NothingToPay:
+        Tontine.objects.filter(pk=tontine.pk, next_payout_date=tontine.next_payout_date).update(
+            next_payout_date=_next_payout_date(tontine),
+        )
+    except AlreadyServed:
+        # Versé entre-temps (par le gestionnaire): la date a déjà avancé
+        pass
+    return None
+
+
+def run(batch_size=100, today=None):
+    """
+    Verser le pot des tontines dues au jour `today`, ou reprendre l'exécution
+    interrompue (à sa date). Retourne le PayoutRun terminé.
+    """
+    payout_run = PayoutRun.objects.filter(finished_at__isnull=True).order_by('pk').first()
+    if payout_run is None:
+        payout_run = PayoutRun.objects.create(day=today or timezone.localdate())
+    due = Tontine.objects.filter(status='active', next_payout_date__lte=payout_run.day).order_by('pk')
+    while True:
+        batch = list(due.filter(pk__gt=payout_run.last_tontine_id)[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic():
+            for tontine in batch:
+                allocation = _pay_due(tontine)
+                if allocation is not None:
+                    payout_run.payouts += 1
+                    payout_run.total += allocation.amount
+            payout_run.last_tontine_id = batch[-1].pk
+            payout_run.save(update_fields=['last_tontine_id', 'payouts', 'total'])
+    payout_run.finished_at = timezone.now()
+    payout_run.save(update_fields=['finished_at'])
+    return payout_run
@@ -0,0 +1,112 @@
+"""
+Projection des flux d'une tontine, cycle par cycle, avant sa création.
+
+À chaque cycle, chaque membre verse contribution_amount et le bénéficiaire du
+cycle (ordre de rotation, voir rotation.py) reçoit le pot complet. Les flux de
+toute la vie du groupe forment des matrices membres x cycles calculées par
+NumPy en opérations vectorielles (pas de boucle Python par membre ou par
+cycle): une tontine de 1 000 membres sur 100 cycles (les plafonds
+MAX_MEMBERS et MAX_CYCLES) se projette en quelques millisecondes. Les matrices
+ne sortent pas telles quelles: to_dict() n'en garde que les totaux par membre
+et les agrégats par cycle, la page HTML les affiche par pages de membres.
+
+Les membres sont hypothétiques, numérotés dans l'ordre d'adhésion: les ordres
+'fixed' et 'seniority' les servent dans cet ordre, 'random' tire une
+permutation reproductible (graine `seed`).
+"""
+
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+from django.utils import timezone
+
+MAX_MEMBERS = 1000
+MAX_CYCLES = 100
+MAX_CYCLE_DURATION = 366
+
+Projection = namedtuple('Projection', [
+    'members', 'cycles', 'contribution_amount', 'pot', 'dates',
+    'beneficiaries',  # cycle -> indice du membre servi
+    'payout_cycle',  # membre -> premier cycle où il reçoit (-1: jamais sur la période)
+    'contributions', 'payouts', 'net', 'balance',  # matrices membres x cycles
+])
+
+
+def rotation_order(members, rotation_method='fixed', seed=0):
+    """Indices des membres dans l'ordre où ils reçoivent le pot."""
+    if rotation_method == 'random':
+        return np.random.default_rng(seed).permutation(members)
+    return np.arange(members)
+
+
+def project(members, contribution_amount, cycle_duration=30, start_date=None, cycles=None,
+            rotation_method='fixed', seed=0):
+    """
+    Flux de `members` membres sur `cycles` cycles (par défaut un tour complet:
+    un cycle par membre), au plus MAX_CYCLES. `net` = reçu - versé par cycle,
+    `balance` = son cumul (négatif: le membre a avancé de l'argent au groupe).
+    """
+    cycles = min(cycles or members, MAX_CYCLES)
+    amount = float(contribution_amount)
+    pot = amount * members
+    start_date = start_date or timezone.localdate()
+
+    order = rotation_order(members, rotation_method, seed)
+    cycle_index = np.arange(cycles)
+    beneficiaries = order[cycle_index % members]
+
+    contributions = np.full((members, cycles), amount)
+    payouts = np.zeros((members, cycles))
+    payouts[beneficiaries, cycle_index] = pot
+    net = payouts - contributions
+
+    payout_cycle = np.full(members, -1)
+    payout_cycle[order[:cycles]] = np.arange(min(members, cycles))
+
+    return Projection(
+        members=members, cycles=cycles, contribution_amount=amount, pot=pot,
+        dates=[start_date + timedelta(days=int(days)) for days in (cycle_index + 1) * cycle_duration],
+        beneficiaries=beneficiaries, payout_cycle=payout_cycle,
+        contributions=contributions, payouts=payouts, net=net, balance=net.cumsum(axis=1),
+    )
+
+
+def member_summary(projection):
+    """Totaux par membre: {'paid', 'received', 'lowest_balance', 'final_balance'} (tableaux)."""
+    return {
+        'paid': projection.contributions.sum(axis=1),
+        'received': projection.payouts.sum(axis=1),
+        'lowest_balance': np.minimum(projection.balance.min(axis=1), 0),
+        'final_balance': projection.balance[:, -1],
+    }
+
+
+def cycle_summary(projection):
+    """Agrégats par cycle: {'members_in_deficit', 'total_advanced'} (tableaux)."""
+    return {
+        'members_in_deficit': (projection.balance < 0).sum(axis=0),
+        'total_advanced': np.maximum(-projection.balance, 0).sum(axis=0),
+    }
+
+
+def to_dict(projection):
+    """
+    Projection sérialisable en JSON (membres numérotés à partir de 1): totaux
+    par membre et agrégats par cycle, sans les matrices membres x cycles.
+    """
+    summary = member_summary(projection)
+    per_cycle = cycle_summary(projection)
+    return {
+        'members': projection.members,
+        'cycles': [
+            {
+                'cycle': cycle, 'date': date.isoformat(), 'beneficiary': int(member) + 1, 'pot': projection.pot,
+                'members_in_deficit': int(per_cycle['members_in_deficit'][cycle - 1]),
+                'total_advanced': float(per_cycle['total_advanced'][cycle - 1]),
+            }
+            for cycle, (date, member) in enumerate(zip(projection.dates, projection.beneficiaries.tolist()), start=1)
+        ],
+        'summary': {key: values.tolist() for key, values in summary.items()},
+        'payout_cycle': (projection.payout_cycle + 1).tolist(),
+    }
@@ -0,0 +1,141 @@
+"""
+Récurrence des réunions: du texte libre de Tontine.meeting_schedule à une
+règle structurée (sous-ensemble de RRULE, RFC 5545), stockée dans
+Tontine.meeting_rule à l'enregistrement (voir signals.py).
+
+Formes reconnues (accents et majuscules indifférents):
+  - "Tous les samedis à 10h", "Chaque lundi 18h30"        FREQ=WEEKLY;BYDAY=SA
+  - "Un samedi sur deux", "Toutes les 2 semaines le jeudi" FREQ=WEEKLY;INTERVAL=2
+  - "Le premier dimanche du mois à 15h", "Dernier vendredi du mois"
+                                                           FREQ=MONTHLY;BYDAY=1SU / -1FR
+  - "Le 5 de chaque mois"                                  FREQ=MONTHLY;BYMONTHDAY=5
+  - "Tous les jours à 7h"                                  FREQ=DAILY
+Un texte non reconnu donne une règle vide: pas de réunion dans le calendrier.
+
+occurrences() déroule une règle paresseusement (générateur) entre deux dates.
+"""
+
+import calendar
+import re
+import unicodedata
+from datetime import date, time, timedelta
+
+WEEKDAYS = {
+    'lundi': 'MO', 'mardi': 'TU', 'mercredi': 'WE', 'jeudi': 'TH',
+    'vendredi': 'FR', 'samedi': 'SA', 'dimanche': 'SU',
+}
+WEEKDAY_INDEX = {code: index for index, code in enumerate(('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU'))}
+ORDINALS = {
+    'premier': 1, '1er': 1, 'deuxieme': 2, 'second': 2, '2e': 2, 'troisieme': 3, '3e': 3,
+    'quatrieme': 4, '4e': 4, 'dernier': -1,
+}
+NUMBERS = {'deux': 2, 'trois': 3, 'quatre': 4}
+
+_DAY = '(' + '|'.join(WEEKDAYS) + ')s?'
+_TIME = re.compile(r'\b(\d{1,2})\s*(?:h|:)\s*(\d{2})?')
+_NTH_WEEKDAY = re.compile(r'\b(' + '|'.join(ORDINALS) + r')\s+' + _DAY + r'\b')
+_MONTH_DAY = re.compile(r'\ble\s+(\d{1,2})(?:er)?\b(?!\s*(?:h|:))')
+_INTERVAL = re.compile(r'\b(?:toutes les|tous les)\s+(\d+|deux|trois|quatre)\s+semaines\b|\bsur\s+(deux|2)\b')
+_FORTNIGHT = re.compile(r'\b(?:tous les 15 jours|toutes les quinzaines|quinzaine)\b')
+
+
+def _normalize(text):
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode()
+    return ' '.join(text.lower().split())
+
+
+def parse(text):
+    """Règle RRULE ("FREQ=WEEKLY;BYDAY=SA;BYHOUR=10;BYMINUTE=0") décrite par `text`, ou ''."""
+    text = _normalize(text)
+    if not text:
+        return ''
+    parts = []
+    nth = _NTH_WEEKDAY.search(text)
+    day = re.search(r'\b' + _DAY + r'\b', text)
+    month_day = _MONTH_DAY.search(text)
+    if nth and 'mois' in text:
+        parts = ['FREQ=MONTHLY', f'BYDAY={ORDINALS[nth.group(1)]}{WEEKDAYS[nth.group(2)]}']
+    elif month_day and 'mois' in text and 1 <= int(month_day.group(1)) <= 31:
+        parts = ['FREQ=MONTHLY', f'BYMONTHDAY={int(month_day.group(1))}']
+    elif day:
+        parts = ['FREQ=WEEKLY']
+        interval = _INTERVAL.search(text)
+        if interval:
+            value = interval.group(1) or interval.group(2)
+            parts.append(f'INTERVAL={NUMBERS.get(value) or int(value)}')
+        elif _FORTNIGHT.search(text):
+            parts.append('INTERVAL=2')
+        parts.append(f'BYDAY={WEEKDAYS[day.group(1)]}')
+    elif re.search(r'\b(?:tous les jours|chaque jour|quotidien)', text):
+        parts = ['FREQ=DAILY']
+    else:
+        return ''
+    moment = _TIME.search(text)
+    if moment and int(moment.group(1)) < 24 and int(moment.group(2) or 0) < 60:
+        parts += [f'BYHOUR={int(moment.group(1))}', f'BYMINUTE={int(moment.group(2) or 0)}']
+    return ';'.join(parts)
+
+
+def parse_rule(rule):
+    """Dictionnaire {'FREQ': ..., ...} d'une règle stockée."""
+    return dict(part.split('=', 1) for part in rule.split(';') if '=' in part)
+
+
+def meeting_time(rule):
+    """Heure de la réunion (datetime.time), ou None pour une réunion sur la journée."""
+    parts = parse_rule(rule)
+    if 'BYHOUR' not in parts:
+        return None
+    return time(int(parts['BYHOUR']), int(parts.get('BYMINUTE', 0)))
+
+
+def _months(start):
+    year, month = start.year, start.month
+    while True:
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _monthly_day(year, month, parts):
+    last = calendar.monthrange(year, month)[1]
+    if 'BYMONTHDAY' in parts:
+        day = int(parts['BYMONTHDAY'])
+        return date(year, month, day) if day <= last else None
+    spec = parts['BYDAY']
+    nth, weekday = int(spec[:-2]), WEEKDAY_INDEX[spec[-2:]]
+    if nth > 0:
+        first = date(year, month, 1)
+        day = first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (nth - 1))
+        return day if day.month == month else None
+    end = date(year, month, last)
+    return end - timedelta(days=(end.weekday() - weekday) % 7)
+
+
+def occurrences(rule, anchor, start, end):
+    """
+    Dates des réunions de `rule` dans [start, end], générées à la demande.
+    `anchor` (date de début de la tontine) fixe la phase des règles à intervalle
+    et aucune réunion n'a lieu avant elle.
+    """
+    parts = parse_rule(rule)
+    freq = parts.get('FREQ')
+    start = max(start, anchor)
+    if freq == 'DAILY':
+        day = start
+        while day <= end:
+            yield day
+            day += timedelta(days=1)
+    elif freq == 'WEEKLY':
+        step = 7 * int(parts.get('INTERVAL', 1))
+        first = anchor + timedelta(days=(WEEKDAY_INDEX[parts['BYDAY']] - anchor.weekday()) % 7)
+        day = first if first >= start else first + timedelta(days=-(-(start - first).days // step) * step)
+        while day <= end:
+            yield day
+            day += timedelta(days=step)
+    elif freq == 'MONTHLY':
+        for year, month in _months(start):
+            if date(year, month, 1) > end:
+                return
+            day = _monthly_day(year, month, parts)
+            if day and start <= day <= end:
+                yield day
@@ -0,0 +1,92 @@
+"""
+Agrégat quotidien des contributions (ContributionDailyRollup): une ligne par
+(tontine, jour) avec le nombre et la somme des contributions.
+
+Tenu à jour dans la même transaction que chaque contribution
+(record_contribution, collect_cycle) et que la suppression d'une adhésion, qui
+emporte ses contributions (remove_member); rebuild() (commande
+rollup_contributions) le recalcule depuis la table Contribution pour
+l'historique. Les graphiques lisent au plus une ligne par jour au lieu de
+parcourir les contributions.
+"""
+
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Contribution, ContributionDailyRollup
+
+BUCKETS = {'day': None, 'week': TruncWeek, 'month': TruncMonth}
+
+
+def add(tontine_id, count, total, day=None):
+    """Ajouter `count` contributions pour `total` au jour `day` (aujourd'hui par défaut) de la tontine."""
+    day = day or timezone.localdate()
+    rows = ContributionDailyRollup.objects.filter(tontine_id=tontine_id, day=day)
+    if rows.update(count=F('count') + count, total=F('total') + total):
+        return
+    try:
+        with transaction.atomic():
+            ContributionDailyRollup.objects.create(tontine_id=tontine_id, day=day, count=count, total=total)
+    except IntegrityError:
+        # Ligne créée entre-temps par une transaction concurrente
+        rows.update(count=F('count') + count, total=F('total') + total)
+
+
+def remove_member(member):
+    """Retirer des agrégats les contributions d'un membre (avant leur suppression en cascade)."""
+    days = Contribution.objects.filter(member_id=member.pk).annotate(day=TruncDate('created_at')).order_by()
+    per_day = days.filter(day=OuterRef('day')).values('day')
+    rows = ContributionDailyRollup.objects.filter(tontine_id=member.tontine_id, day__in=days.values('day'))
+    if rows.update(
+        count=F('count') - Subquery(per_day.annotate(value=Count('pk')).values('value')),
+        total=F('total') - Subquery(per_day.annotate(value=Sum('amount')).values('value')),
+    ):
+        # Comme rebuild(): pas de ligne pour un jour sans contribution
+        rows.filter(count=0).delete()
+
+
+def rebuild(tontine_ids=None, batch_size=1000):
+    """Recalculer les agrégats depuis les contributions (toutes les tontines, ou `tontine_ids`). Retourne le nombre de lignes."""
+    contributions = Contribution.objects.all()
+    rollups = ContributionDailyRollup.objects.all()
+    if tontine_ids is not None:
+        contributions = contributions.filter(tontine_id__in=tontine_ids)
+        rollups = rollups.filter(tontine_id__in=tontine_ids)
+    per_day = contributions.annotate(day=TruncDate('created_at')).order_by().values(
+        'tontine_id', 'day'
+    ).annotate(count=Count('pk'), total=Sum('amount'))
+    with transaction.atomic():
+        rollups.delete()
+        rows = ContributionDailyRollup.objects.bulk_create(
+            (ContributionDailyRollup(**row) for row in per_day.iterator()), batch_size=batch_size,
+        )
+    return len(rows)
+
+
+def series(tontine_id, days=90, bucket='day'):
+    """
+    Série {'labels', 'counts', 'totals'} des `days` derniers jours, par jour,
+    semaine ou mois. Les jours sans contribution valent 0 (buckets 'day').
+    """
+    start = timezone.localdate() - timedelta(days=days - 1)
+    rows = ContributionDailyRollup.objects.filter(tontine_id=tontine_id, day__gte=start)
+    trunc = BUCKETS[bucket]
+    if trunc is None:
+        points = {row['day']: row for row in rows.values('day', 'count', 'total')}
+        labels = [start + timedelta(days=offset) for offset in range(days)]
+    else:
+        points = {
+            row['period']: row for row in rows.annotate(period=trunc('day')).order_by().values('period').annotate(
+                count=Sum('count'), total=Sum('total'),
+            )
+        }
+        labels = sorted(points)
+    return {
+        'labels': [label.isoformat() for label in labels],
+        'counts': [points[label]['count'] if label in points else 0 for label in labels],
+        'totals': [float(points[label]['total']) if label in points else 0 for label in labels],
+    }
@@ -0,0 +1,168 @@
+"""
+Ordre des bénéficiaires (rotation) des tontines.
+
+L'ordre d'un cycle est tiré selon Tontine.rotation_method:
+  - 'fixed': ordre d'adhésion à la tontine;
+  - 'seniority': ancienneté des comptes, du plus ancien au plus récent;
+  - 'random': tirage au sort, reproductible (graine: tontine et cycle).
+Il est enregistré dans RotationSlot: une place (cycle, position) par membre
+actif. Le premier cycle est tiré à l'activation de la tontine (signals.py);
+le suivant, quand tous les membres actifs du cycle ont reçu, avec les membres
+actifs à ce moment: un membre accepté en cours de cycle entre dans la
+rotation au cycle suivant. Une tontine activée avant la rotation reprend au
+dernier cycle de ses allocations.
+
+Le cycle courant, le prochain bénéficiaire et les membres qui peuvent encore
+recevoir sont lus sur l'index partiel des places non servies
+(rotation_open_slot_idx): aucune liste de membres n'est chargée en Python.
+Le cycle suivant n'est tiré que par un versement (next_slot, depuis payouts.py);
+state() ne fait que lire, et présente un cycle épuisé par l'ordre que le
+prochain tirage enregistrera.
+"""
+
+import random
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import BeneficiaryAllocation, RotationSlot, TontineMember
+
+ORDERINGS = {
+    'fixed': ('joined_date', 'id'),
+    'seniority': ('user__date_joined', 'id'),
+    'random': ('id',),
+}
+
+
+def _draw(tontine, cycle):
+    """Ordre du cycle `cycle` (ids des membres actifs n'ayant pas déjà reçu dans ce cycle), sans l'enregistrer."""
+    received = BeneficiaryAllocation.objects.filter(tontine=tontine, cycle_number=cycle).values('member_id')
+    member_ids = list(
+        TontineMember.objects.filter(tontine=tontine, status='active').exclude(id__in=received)
+        .order_by(*ORDERINGS[tontine.rotation_method]).values_list('id', flat=True)
+    )
+    if tontine.rotation_method == 'random':
+        random.Random(f'{tontine.pk}:{cycle}').shuffle(member_ids)
+    return member_ids
+
+
+def _create(tontine, cycle, member_ids):
+    slots = RotationSlot.objects.bulk_create(
+        RotationSlot(tontine=tontine, cycle=cycle, position=position, member_id=member_id)
+        for position, member_id in enumerate(member_ids, start=1)
+    )
+    return len(slots)
+
+
+def generate(tontine, cycle):
+    """
+    Tirer l'ordre du cycle `cycle`: une place par membre actif n'ayant pas déjà
+    reçu dans ce cycle. Retourne le nombre de places créées.
+    """
+    return _create(tontine, cycle, _draw(tontine, cycle))
+
+
+def start(tontine):
+    """Tirer le premier cycle d'une tontine qui vient d'être activée (sans effet si l'ordre existe)."""
+    if not RotationSlot.objects.filter(tontine=tontine).exists():
+        generate(tontine, 1)
+
+
+def _open_slots(tontine):
+    return RotationSlot.objects.filter(tontine=tontine, allocation__isnull=True, member__status='active')
+
+
+def _last_cycle(tontine):
+    return RotationSlot.objects.filter(tontine=tontine).aggregate(cycle=Max('cycle'))['cycle']
+
+
+def _upcoming(tontine):
+    """
+    (cycle, ids des membres) du prochain tirage: le cycle suivant ou, avant la
+    rotation, le dernier cycle alloué. Sans rien enregistrer.
+    """
+    last = _last_cycle(tontine)
+    if last is None:
+        last = BeneficiaryAllocation.objects.filter(tontine=tontine).aggregate(cycle=Max('cycle_number'))['cycle']
+        member_ids = _draw(tontine, last) if last else []
+        if member_ids:
+            return last, member_ids
+    return (last or 0) + 1, _draw(tontine, (last or 0) + 1)
+
+
+def _advance(tontine):
+    """Enregistrer le prochain tirage (voir _upcoming). Retourne le nombre de places."""
+    return _create(tontine, *_upcoming(tontine))
+
+
+def next_slot(tontine):
+    """
+    Prochaine place à servir (plus petits cycle et position non servis d'un
+    membre actif), en tirant le cycle suivant quand le courant est épuisé.
+    None si la tontine n'a aucun membre actif.
+    """
+    slots = _open_slots(tontine).select_related('member__user').order_by('cycle', 'position')
+    slot = slots.first()
+    if slot is None and _advance(tontine):
+        slot = slots.first()
+    return slot
+
+
+def _preview(tontine, cycle, member_ids, limit):
+    """État d'un cycle pas encore tiré: places non enregistrées, dans l'ordre du tirage."""
+    members = TontineMember.objects.select_related('user').in_bulk(member_ids[:limit])
+    eligible = [
+        RotationSlot(tontine=tontine, cycle=cycle, position=position, member=members[member_id])
+        for position, member_id in enumerate(member_ids[:limit], start=1)
+    ]
+    return {
+        'current_cycle': cycle,
+        'next': eligible[0],
+        'eligible': eligible,
+        'eligible_count': len(member_ids),
+        'received': [],
+        'received_count': 0,
+    }
+
+
+def state(tontine, limit=100):
+    """
+    Cycle courant: {'current_cycle', 'next', 'eligible', 'eligible_count',
+    'received', 'received_count'}. `eligible` et `received` sont limités à
+    `limit` places, dans l'ordre de rotation. Lecture seule: un cycle épuisé
+    est suivi du prochain tirage, présenté sans être enregistré.
+    """
+    slot = _open_slots(tontine).select_related('member__user').order_by('cycle', 'position').first()
+    if slot is None:
+        cycle, member_ids = _upcoming(tontine)
+        if member_ids:
+            return _preview(tontine, cycle, member_ids, limit)
+    cycle = slot.cycle if slot else (_last_cycle(tontine) or 1)
+    eligible = _open_slots(tontine).filter(cycle=cycle)
+    received = RotationSlot.objects.filter(tontine=tontine, cycle=cycle, allocation__isnull=False)
+    return {
+        'current_cycle': cycle,
+        'next': slot,
+        'eligible': list(eligible.select_related('member__user').order_by('position')[:limit]),
+        'eligible_count': eligible.count(),
+        'received': list(received.select_related('member__user').order_by('position')[:limit]),
+        'received_count': received.count(),
+    }
+
+
+def allocate(tontine, member, cycle, amount):
+    """
+    Servir la place de `member` au cycle `cycle`: créer l'allocation et marquer
+    la place, dans une transaction. None si la place n'existe pas ou est déjà servie.
+    """
+    with transaction.atomic():
+        slot = RotationSlot.objects.select_for_update().filter(
+            tontine=tontine, cycle=cycle, member=member, allocation__isnull=True,
+        ).first()
+        if slot is None:
+            return None
+        allocation = BeneficiaryAllocation.objects.create(
+            tontine=tontine, member=member, cycle_number=cycle, amount=amount,
+        )
+        RotationSlot.objects.filter(pk=slot.pk).update(allocation=allocation)
+    return allocation
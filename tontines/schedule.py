@@ -0,0 +1,91 @@
+"""
+Échéancier des tontines: prochaine date de cycle stockée et indexée.
+
+Tontine.next_due_date est calculée à l'enregistrement (création, édition,
+activation: voir signals.py) et avancée chaque jour par un balayage
+(commande schedule_sweep) pour les tontines dont l'échéance est passée.
+Les lectures deviennent des requêtes indexées:
+  - ma prochaine échéance: ORDER BY next_due_date LIMIT 1;
+  - les tontines dues demain: parcours d'intervalle sur (status, next_due_date).
+
+Tontine.next_payout_date (versement du pot, fin de cycle) est fixée à
+l'activation puis avancée d'un cycle à chaque versement (payouts.py).
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Tontine, TontineMember
+
+
+def compute_next_due_date(start_date, cycle_duration, today=None):
+    """Prochaine échéance: la date de début, puis tous les `cycle_duration` jours (strictement après aujourd'hui)."""
+    if not start_date:
+        return None
+    today = today or timezone.localdate()
+    if today < start_date:
+        return start_date
+    cycle_days = cycle_duration or 30
+    cycles_passed = (today - start_date).days // cycle_days
+    return start_date + timedelta(days=(cycles_passed + 1) * cycle_days)
+
+
+def compute_next_payout_date(start_date, cycle_duration, today=None):
+    """Premier versement: la fin du premier cycle, ou la prochaine fin de cycle si la tontine a déjà commencé."""
+    today = today or timezone.localdate()
+    if start_date and today < start_date:
+        return start_date + timedelta(days=cycle_duration or 30)
+    return compute_next_due_date(start_date, cycle_duration, today)
+
+
+def refresh(tontine, today=None):
+    """
+    Recalculer l'échéance de `tontine` (sans l'enregistrer). Une tontine terminée
+    n'en a plus; une tontine activée reçoit sa première date de versement.
+    """
+    if tontine.status == 'completed':
+        tontine.next_due_date = None
+        tontine.next_payout_date = None
+    else:
+        tontine.next_due_date = compute_next_due_date(tontine.start_date, tontine.cycle_duration, today)
+        if tontine.status != 'draft' and tontine.next_payout_date is None:
+            tontine.next_payout_date = compute_next_payout_date(tontine.start_date, tontine.cycle_duration, today)
+    return tontine.next_due_date
+
+
+def due_between(start, end):
+    """Tontines actives dont l'échéance tombe dans [start, end] (parcours d'index)."""
+    return Tontine.objects.filter(status='active', next_due_date__range=(start, end))
+
+
+def next_due_for(user):
+    """(tontine, date) de la prochaine échéance parmi les tontines actives de `user`, ou None."""
+    tontine = Tontine.objects.filter(
+        status='active', next_due_date__isnull=False,
+        pk__in=TontineMember.objects.filter(user=user).values('tontine_id'),
+    ).order_by('next_due_date').only('id', 'name', 'code', 'next_due_date').first()
+    return (tontine, tontine.next_due_date) if tontine else None
+
+
+def sweep(today=None, batch_size=1000):
+    """
+    Avancer l'échéance des tontines dont la date est atteinte ou passée.
+    Parcourt l'index (next_due_date <= aujourd'hui) par lots. Retourne le nombre mis à jour.
+    """
+    today = today or timezone.localdate()
+    stale = Tontine.objects.filter(next_due_date__lte=today, status__in=('active', 'paused')).order_by('pk')
+    updated, last_pk = 0, 0
+    while True:
+        batch = list(stale.filter(pk__gt=last_pk).only(
+            'id', 'status', 'start_date', 'cycle_duration', 'next_payout_date',
+        )[:batch_size])
+        if not batch:
+            return updated
+        for tontine in batch:
+            refresh(tontine, today)
+        with transaction.atomic():
+            Tontine.objects.bulk_update(batch, ['next_due_date', 'next_payout_date'])
+        updated += len(batch)
+        last_pk = batch[-1].pk
@@ -0,0 +1,122 @@
+"""
+Signaux qui tiennent à jour les projections lorsque les modèles sont
+enregistrés via save()/delete(). Les chemins groupés (UPDATE, bulk_create)
+mettent à jour les projections explicitement (voir payments.py, collection.py).
+"""
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import counters, feed, fragments, ical, recurrence, rollups, rotation, schedule, summaries
+from .models import BeneficiaryAllocation, Contribution, Tontine, TontineMember, Transaction, UserFinancialSummary, Vault
+
+# Champs d'une tontine affichés à ses membres (flux iCalendar, fragments des tableaux de bord)
+CALENDAR_FIELDS = ('status', 'name', 'code', 'start_date', 'cycle_duration', 'contribution_amount',
+                   'meeting_schedule', 'meeting_location')
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_financial_summary(sender, instance, created, **kwargs):
+    if created:
+        UserFinancialSummary.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=TontineMember)
+@receiver(post_delete, sender=TontineMember)
+def membership_changed(sender, instance, created=False, origin=None, **kwargs):
+    summaries.refresh_memberships(instance.user_id)
+    ical.invalidate([instance.user_id])
+    fragments.invalidate([instance.user_id])
+    if created:
+        fragments.invalidate(feed.publish(instance.tontine_id, 'member_joined', actor_id=instance.user_id))
+    elif origin is instance:
+        # Retrait du membre (et non suppression de toute la tontine)
+        fragments.invalidate(feed.publish(instance.tontine_id, 'member_left', actor_id=instance.user_id))
+    elif origin is None:
+        fragments.invalidate_tontine(instance.tontine_id)
+
+
+@receiver(post_save, sender=TontineMember)
+def member_counters_saved(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_loaded_status', instance.status)
+    counters.move_member(instance.tontine_id, previous, instance.status)
+    instance._loaded_status = instance.status
+
+
+@receiver(pre_delete, sender=TontineMember)
+def member_counters_deleted(sender, instance, origin=None, **kwargs):
+    # Avant la suppression en cascade des contributions; inutile quand toute la tontine est supprimée
+    if not isinstance(origin, Tontine):
+        counters.remove_member(instance)
+        rollups.remove_member(instance)
+
+
+@receiver(pre_save, sender=Tontine)
+def remember_tontine_status(sender, instance, **kwargs):
+    instance._previous_status = None
+    instance._previous_calendar = None
+    if instance.pk:
+        previous = Tontine.objects.filter(pk=instance.pk).values_list(*CALENDAR_FIELDS).first()
+        if previous:
+            instance._previous_status = previous[0]
+            instance._previous_calendar = previous
+
+
+@receiver(pre_save, sender=Tontine)
+def refresh_next_due_date(sender, instance, **kwargs):
+    schedule.refresh(instance)
+    instance.meeting_rule = recurrence.parse(instance.meeting_schedule)
+
+
+@receiver(post_save, sender=Tontine)
+def tontine_status_changed(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_status', None)
+    if not created and previous and previous != instance.status:
+        summaries.move_tontine_status(instance, previous, instance.status)
+        if previous == 'draft' and instance.status == 'active':
+            rotation.start(instance)
+    previous_calendar = getattr(instance, '_previous_calendar', None)
+    if previous_calendar and previous_calendar != tuple(getattr(instance, field) for field in CALENDAR_FIELDS):
+        user_ids = list(instance.members.values_list('user_id', flat=True))
+        ical.invalidate(user_ids)
+        fragments.invalidate(user_ids)
+
+
+# Pas de post_delete: une contribution n'est supprimée qu'avec son adhésion ou sa
+# tontine, dont la suppression invalide déjà les fragments (membership_changed).
+@receiver(post_save, sender=Contribution)
+def contribution_saved(sender, instance, created, **kwargs):
+    if created:
+        fragments.invalidate(feed.publish(
+            instance.tontine_id, 'contribution', actor_id=instance.member.user_id,
+            amount=instance.amount, created_at=instance.created_at,
+        ))
+    else:
+        fragments.invalidate_tontine(instance.tontine_id)
+
+
+@receiver(post_save, sender=BeneficiaryAllocation)
+def allocation_saved(sender, instance, created, **kwargs):
+    if created:
+        fragments.invalidate(feed.publish(
+            instance.tontine_id, 'allocation', actor_id=instance.member.user_id,
+            amount=instance.amount, created_at=instance.allocated_date,
+        ))
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def transaction_changed(sender, instance, **kwargs):
+    fragments.invalidate([instance.user_id])
+
+
+@receiver(post_save, sender=Vault)
+def vault_saved(sender, instance, **kwargs):
+    fragments.invalidate([instance.owner_id])
+
+
+@receiver(post_delete, sender=Vault)
+def vault_deleted(sender, instance, **kwargs):
+    summaries.adjust([instance.owner_id], vaults_total=-instance.balance)
+    fragments.invalidate([instance.owner_id])
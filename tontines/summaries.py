@@ -0,0 +1,179 @@
+"""
+Résumé financier par utilisateur (UserFinancialSummary).
+
+Les tableaux de bord lisent une seule ligne au lieu de recalculer soldes,
+coffres, totaux et compteurs à chaque page. La ligne est tenue à jour:
+  - soldes wallet / coffres: à chaque écriture du grand livre (ledger.post);
+  - total contribué: à chaque contribution (record_contribution, collecte);
+  - compteurs de tontines: à chaque changement d'adhésion ou de statut de tontine
+    (signaux, voir signals.py).
+rebuild_all() recalcule tout depuis les tables sources.
+
+Les soldes affichés sur chaque page (wallet_context) sont en plus mis en cache
+par utilisateur; l'entrée est supprimée, après commit, dès qu'un solde change.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import LedgerEntry, TontineMember, UserFinancialSummary, Vault, Wallet
+
+STATUS_FIELDS = {
+    'active': 'active_tontine_count',
+    'draft': 'draft_tontine_count',
+    'completed': 'completed_tontine_count',
+}
+BALANCE_FIELDS = ('wallet_balance', 'vaults_total')
+WALLET_TOTALS_KEY = 'wallet-totals:{}'
+SUMMARY_FIELDS = (
+    'wallet_balance', 'vaults_total', 'total_contributed', 'tontine_count',
+    'active_tontine_count', 'draft_tontine_count', 'completed_tontine_count',
+)
+
+
+def adjust(user_ids, **deltas):
+    """Ajouter des deltas (F()) aux résumés de plusieurs utilisateurs en un UPDATE."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    UserFinancialSummary.objects.filter(user_id__in=user_ids).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if any(field in BALANCE_FIELDS for field in deltas):
+        invalidate_wallet_totals(user_ids)
+
+
+def apply_ledger_entries(entries):
+    """Répercuter des écritures du grand livre sur les soldes des résumés."""
+    per_user = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    for entry in entries:
+        if entry.user_id is None or entry.account_type not in (LedgerEntry.WALLET, LedgerEntry.VAULT):
+            continue
+        signed = entry.amount if entry.direction == LedgerEntry.CREDIT else -entry.amount
+        per_user[entry.user_id][entry.account_type == LedgerEntry.VAULT] += signed
+
+    # Un UPDATE par combinaison de deltas: une collecte de cycle n'en fait qu'un
+    groups = defaultdict(list)
+    for user_id, (wallet_delta, vault_delta) in per_user.items():
+        groups[(wallet_delta, vault_delta)].append(user_id)
+    for (wallet_delta, vault_delta), user_ids in groups.items():
+        adjust(user_ids, wallet_balance=wallet_delta, vaults_total=vault_delta)
+
+
+def _membership_figures(user_filter):
+    """Compteurs de tontines et total contribué, groupés par utilisateur."""
+    rows = TontineMember.objects.filter(user_filter).values('user_id').annotate(
+        tontine_count=Count('tontine_id', distinct=True),
+        active_tontine_count=Count('tontine_id', distinct=True, filter=Q(tontine__status='active')),
+        draft_tontine_count=Count('tontine_id', distinct=True, filter=Q(tontine__status='draft')),
+        completed_tontine_count=Count('tontine_id', distinct=True, filter=Q(tontine__status='completed')),
+        total_contributed=Sum('total_contributed', filter=Q(status='active')),
+    )
+    return {row.pop('user_id'): row for row in rows}
+
+
+def refresh_memberships(user_id):
+    """Recalculer les compteurs liés aux adhésions d'un utilisateur (changements rares)."""
+    figures = _membership_figures(Q(user_id=user_id)).get(user_id, {})
+    UserFinancialSummary.objects.filter(user_id=user_id).update(
+        updated_at=timezone.now(),
+        total_contributed=figures.get('total_contributed') or 0,
+        **{field: figures.get(field, 0) for field in ('tontine_count', *STATUS_FIELDS.values())}
+    )
+
+
+def move_tontine_status(tontine, old_status, new_status):
+    """Déplacer une tontine d'un compteur de statut à l'autre pour tous ses membres."""
+    deltas = {}
+    if old_status in STATUS_FIELDS:
+        deltas[STATUS_FIELDS[old_status]] = -1
+    if new_status in STATUS_FIELDS:
+        deltas[STATUS_FIELDS[new_status]] = 1
+    user_ids = TontineMember.objects.filter(tontine=tontine).values('user_id')
+    adjust(user_ids, **deltas)
+
+
+def rebuild(user_ids):
+    """Recalculer et enregistrer les résumés des utilisateurs donnés depuis les tables sources."""
+    user_ids = list(user_ids)
+    memberships = _membership_figures(Q(user_id__in=user_ids))
+    wallets = dict(Wallet.objects.filter(user_id__in=user_ids).values_list('user_id', 'balance'))
+    vaults = dict(
+        Vault.objects.filter(owner_id__in=user_ids).values('owner_id')
+        .annotate(total=Sum('balance')).values_list('owner_id', 'total')
+    )
+    summaries = []
+    for user_id in user_ids:
+        figures = memberships.get(user_id, {})
+        summaries.append(UserFinancialSummary(
+            user_id=user_id,
+            wallet_balance=wallets.get(user_id) or 0,
+            vaults_total=vaults.get(user_id) or 0,
+            total_contributed=figures.get('total_contributed') or 0,
+            tontine_count=figures.get('tontine_count', 0),
+            active_tontine_count=figures.get('active_tontine_count', 0),
+            draft_tontine_count=figures.get('draft_tontine_count', 0),
+            completed_tontine_count=figures.get('completed_tontine_count', 0),
+            updated_at=timezone.now(),
+        ))
+    created = UserFinancialSummary.objects.bulk_create(
+        summaries, update_conflicts=True, unique_fields=['user'],
+        update_fields=[*SUMMARY_FIELDS, 'updated_at'],
+    )
+    invalidate_wallet_totals(user_ids)
+    return created
+
+
+def rebuild_all(batch_size=1000):
+    """Recalculer les résumés de tous les utilisateurs, par lots d'ids."""
+    User = get_user_model()
+    ids = User.objects.order_by('id').values_list('id', flat=True)
+    last_id, count = 0, 0
+    while True:
+        batch = list(ids.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return count
+        rebuild(batch)
+        count += len(batch)
+        last_id = batch[-1]
+
+
+def get_summary(user):
+    """Résumé de l'utilisateur (construit depuis les sources s'il n'existe pas encore)."""
+    summary = UserFinancialSummary.objects.filter(user=user).first()
+    if summary is None:
+        rebuild([user.pk])
+        summary = UserFinancialSummary.objects.get(user=user)
+    return summary
+
+
+def invalidate_wallet_totals(user_ids):
+    """Supprimer les soldes en cache une fois la transaction validée (jamais une valeur non commitée)."""
+    keys = [WALLET_TOTALS_KEY.format(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def wallet_totals(user_id):
+    """
+    (solde du porte-monnaie, total des coffres) de l'utilisateur, depuis le cache.
+    En cas d'absence: la ligne de résumé, ou à défaut les sommes calculées en base.
+    """
+    key = WALLET_TOTALS_KEY.format(user_id)
+    totals = cache.get(key)
+    if totals is None:
+        totals = UserFinancialSummary.objects.filter(user_id=user_id).values_list(*BALANCE_FIELDS).first()
+        if totals is None:
+            totals = (
+                Wallet.objects.filter(user_id=user_id).aggregate(total=Sum('balance'))['total'] or Decimal('0'),
+                Vault.objects.filter(owner_id=user_id).aggregate(total=Sum('balance'))['total'] or Decimal('0'),
+            )
+        cache.set(key, totals, settings.WALLET_TOTALS_CACHE_TIMEOUT)
+    return totals
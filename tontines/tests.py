@@ -1,3 +1,711 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from config.context_processors import wallet_context
+
+from . import counters, feed, ledger, payouts, projection, recurrence, rollups, rotation, schedule, summaries
+from .collection import collect_cycle
+from .forms import ProjectionForm
+from .pagination import keyset_page
+from .models import (
+    ActivityFeedItem, BeneficiaryAllocation, Contribution, ContributionDailyRollup, LedgerEntry, PayoutRun, RotationSlot, Tontine,
+    TontineCounterShard, TontineMember, Transaction, UserFinancialSummary, Vault, Wallet,
+)
+from .payments import (
+    InsufficientFunds, MembershipInactive, deposit_to_wallet, pay_contribution_from_wallet,
+    transfer_to_vault,
+)
+
+User = get_user_model()
+
+
+class WalletFixtureMixin:
+    """Un membre actif avec un porte-monnaie approvisionné de 2500 FCFA"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='payer', password='password123', phone_number='0700000001'
+        )
+        self.tontine = Tontine.objects.create(
+            name='Tontine Test', code='TT01', description='Test', manager=self.user,
+            start_date=timezone.localdate(), status='active',
+            contribution_amount=Decimal('1000'),
+        )
+        self.member = TontineMember.objects.create(
+            tontine=self.tontine, user=self.user, status='active'
+        )
+        self.wallet = Wallet.objects.create(user=self.user)
+        deposit_to_wallet(self.wallet, Decimal('2500'), note='Dépôt initial')
+
+
+class PaymentServiceTestCase(WalletFixtureMixin, TestCase):
+    """Tests du service de paiement depuis le porte-monnaie"""
+
+    def test_payment_updates_all_totals(self):
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+
+        self.wallet.refresh_from_db()
+        self.member.refresh_from_db()
+        self.tontine.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('500'))
+        self.assertEqual(self.member.total_contributed, Decimal('2000'))
+        self.assertEqual(self.tontine.total_pot, Decimal('2000'))
+        self.assertEqual(Contribution.objects.filter(tontine=self.tontine).count(), 2)
+        self.assertEqual(Transaction.objects.filter(user=self.user, type='payment').count(), 2)
+
+    def test_insufficient_funds_leaves_no_trace(self):
+        self.tontine.contribution_amount = Decimal('3000')
+        with self.assertRaises(InsufficientFunds):
+            pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        self.assertFalse(Contribution.objects.exists())
+        self.assertFalse(Transaction.objects.filter(type='payment').exists())
+
+    def test_inactive_member_is_rolled_back(self):
+        self.member.status = 'pending'
+        self.member.save()
+        with self.assertRaises(MembershipInactive):
+            pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('2500'))
+        self.assertFalse(Transaction.objects.filter(type='payment').exists())
+
+
+class LedgerTestCase(WalletFixtureMixin, TestCase):
+    """Tests du grand livre en partie double"""
+
+    def test_postings_are_balanced_and_match_projections(self):
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+
+        for entries in (LedgerEntry.objects.filter(posting=p) for p in
+                        LedgerEntry.objects.values_list('posting', flat=True).distinct()):
+            self.assertEqual(
+                sum(e.amount for e in entries if e.direction == LedgerEntry.DEBIT),
+                sum(e.amount for e in entries if e.direction == LedgerEntry.CREDIT),
+            )
+        self.assertEqual(ledger.balance(LedgerEntry.WALLET, self.wallet.pk), Decimal('1500'))
+        self.assertEqual(ledger.balance(LedgerEntry.TONTINE, self.tontine.pk), Decimal('1000'))
+        self.assertEqual(ledger.rebuild_projections(dry_run=True), [])
+
+    def test_balance_reads_checkpoint_plus_tail(self):
+        self.assertEqual(ledger.checkpoint(lag=timedelta(0)), 2)  # wallet + compte externe
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        self.assertEqual(ledger.balance(LedgerEntry.WALLET, self.wallet.pk), Decimal('1500'))
+        self.assertEqual(ledger.checkpoint(lag=timedelta(0)), 2)  # wallet + pot
+        self.assertEqual(ledger.balance(LedgerEntry.WALLET, self.wallet.pk), Decimal('1500'))
+
+    def test_rebuild_fixes_drifted_projection(self):
+        ledger.checkpoint(lag=timedelta(0))
+        Wallet.objects.filter(pk=self.wallet.pk).update(balance=Decimal('99'))
+
+        drifts = ledger.rebuild_projections()
+
+        self.assertEqual(drifts, [(LedgerEntry.WALLET, self.wallet.pk, Decimal('99'), Decimal('2500'))])
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('2500'))
+
+    def test_entries_are_append_only(self):
+        entry = LedgerEntry.objects.first()
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
+
+
+class CollectCycleTestCase(WalletFixtureMixin, TestCase):
+    """Tests de la collecte groupée d'un cycle"""
+
+    def setUp(self):
+        super().setUp()
+        self.poor = User.objects.create_user(username='poor', password='x', phone_number='0700000002')
+        self.poor_member = TontineMember.objects.create(tontine=self.tontine, user=self.poor, status='active')
+        deposit_to_wallet(Wallet.objects.create(user=self.poor), Decimal('500'), note='Dépôt')
+        nowallet = User.objects.create_user(username='nowallet', password='x', phone_number='0700000003')
+        TontineMember.objects.create(tontine=self.tontine, user=nowallet, status='active')
+
+    def test_collect_debits_members_with_funds(self):
+        # Dont 4 pour créer la ligne du jour de l'agrégat (UPDATE à vide, SAVEPOINT, INSERT, RELEASE)
+        with self.assertNumQueries(18):
+            result = collect_cycle(self.tontine)
+
+        self.assertEqual(result.paid, [self.member])
+        self.assertEqual(len(result.insufficient), 2)
+        self.assertEqual(result.total, Decimal('1000'))
+        self.tontine.refresh_from_db()
+        self.assertEqual(self.tontine.total_pot, Decimal('1000'))
+        self.assertEqual(Contribution.objects.filter(tontine=self.tontine).count(), 1)
+        self.assertEqual(ledger.rebuild_projections(dry_run=True), [])
+
+    def test_dry_run_changes_nothing(self):
+        result = collect_cycle(self.tontine, dry_run=True)
+        self.assertEqual(len(result.paid), 1)
+        self.assertFalse(Contribution.objects.exists())
+
+
+class FinancialSummaryTestCase(WalletFixtureMixin, TestCase):
+    """Tests du résumé financier tenu à jour par utilisateur"""
+
+    def snapshot(self, user):
+        return UserFinancialSummary.objects.filter(user=user).values(*summaries.SUMMARY_FIELDS).get()
+
+    def test_incremental_updates_match_rebuild(self):
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        vault = Vault.objects.create(owner=self.user, name='Epargne')
+        transfer_to_vault(self.user.wallet, vault, Decimal('500'))
+        other = Tontine.objects.create(
+            name='Brouillon', code='TT02', description='Test', manager=self.user,
+            start_date=timezone.localdate(), contribution_amount=Decimal('500'),
+        )
+        TontineMember.objects.create(tontine=other, user=self.user, status='active')
+        other.status = 'completed'
+        other.save()
+
+        incremental = self.snapshot(self.user)
+        self.assertEqual(incremental['wallet_balance'], Decimal('1000'))
+        self.assertEqual(incremental['vaults_total'], Decimal('500'))
+        self.assertEqual(incremental['total_contributed'], Decimal('1000'))
+        self.assertEqual(incremental['completed_tontine_count'], 1)
+
+        summaries.rebuild([self.user.pk])
+        self.assertEqual(self.snapshot(self.user), incremental)
+
+    def test_dashboard_reads_summary(self):
+        self.client.login(username='payer', password='password123')
+        response = self.client.get(reverse('accueil'))
+        self.assertEqual(response.context['kpis']['total_tontines_count'], 1)
+        self.assertEqual(response.context['wallet_balance'], Decimal('2500'))
+
+
+class WalletContextTestCase(WalletFixtureMixin, TestCase):
+    """Tests du context processor wallet_context (paresseux et mis en cache)"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+
+    def test_values_are_lazy_and_cached(self):
+        with self.assertNumQueries(0):
+            context = wallet_context(self.request)
+        with self.assertNumQueries(1):
+            self.assertEqual(str(context['wallet_balance']), '2500.00')
+            self.assertEqual(str(context['vaults_total']), '0.00')
+        with self.assertNumQueries(0):
+            self.assertEqual(str(wallet_context(self.request)['wallet_balance']), '2500.00')
+
+    def test_balance_change_invalidates_cache(self):
+        str(wallet_context(self.request)['wallet_balance'])
+        with self.captureOnCommitCallbacks(execute=True):
+            pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        self.assertEqual(str(wallet_context(self.request)['wallet_balance']), '1500.00')
+
+
+class KeysetPaginationTestCase(WalletFixtureMixin, TestCase):
+    """Tests de la pagination par curseur de l'historique"""
+
+    def setUp(self):
+        super().setUp()
+        for i in range(25):
+            Transaction.objects.create(user=self.user, wallet=self.wallet, amount=i + 1, type='deposit')
+        # Plusieurs lignes à la même date: l'id départage
+        Transaction.objects.filter(amount__lte=10).update(created_at=timezone.now())
+
+    def test_pages_cover_history_without_duplicates(self):
+        seen, cursor = [], None
+        while True:
+            items, cursor = keyset_page(self.user.transactions.all(), cursor=cursor, size=7)
+            seen.extend(t.pk for t in items)
+            if cursor is None:
+                break
+        expected = list(self.user.transactions.order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_load_more_endpoint(self):
+        self.client.login(username='payer', password='password123')
+        _, cursor = keyset_page(self.user.transactions.all(), size=20)
+        response = self.client.get(reverse('wallet_transactions'), {'cursor': cursor})
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(data['html'].count('transaction-card'), 6)
+
+        response = self.client.get(reverse('wallet_transactions'), {'cursor': 'invalide'})
+        self.assertEqual(response.status_code, 400)
+
+
+class StreamingExportTestCase(WalletFixtureMixin, TestCase):
+    """Tests des exports en flux"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='payer', password='password123')
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+
+    def test_wallet_statement_csv(self):
+        response = self.client.get(reverse('wallet_export'), {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,date,type,statut,montant,coffre,note')
+        self.assertEqual([line.split(',')[2] for line in lines[1:]], ['deposit', 'payment'])
+
+    def test_contributions_jsonl_with_date_range(self):
+        url = reverse('tontine_export', args=[self.tontine.id, 'contributions'])
+        today = timezone.localdate()
+        response = self.client.get(url, {'format': 'jsonl', 'start': today.isoformat()})
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 1)
+        self.assertIn('"montant": "1000.00"', rows[0])
+
+        response = self.client.get(url, {'format': 'jsonl', 'end': (today - timedelta(days=1)).isoformat()})
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+        response = self.client.get(url, {'start': 'hier'})
+        self.assertEqual(response.status_code, 400)
+        for params in ({'start': '2024-02-30'}, {'end': '9999-12-31'}):
+            self.assertEqual(self.client.get(reverse('wallet_export'), params).status_code, 400)
+
+
+class SeedTontinesTestCase(TestCase):
+    """Tests du générateur de données synthétiques"""
+
+    def test_seeded_data_is_consistent(self):
+        call_command('seed_tontines', users=40, tontines=6, huge=1, seed=1, batch_size=7, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 40)
+        self.assertEqual(Tontine.objects.count(), 6)
+        self.assertEqual(ledger.rebuild_projections(dry_run=True), [])
+        huge = Tontine.objects.get(code='SEE0000000')
+        self.assertEqual(huge.members.count(), 8)
+        self.assertEqual(huge.contribution_count, huge.contributions.count())
+        self.assertEqual(
+            huge.total_pot, sum(c.amount for c in Contribution.objects.filter(tontine=huge))
+        )
+        user = User.objects.get(username='seed-0')
+        self.assertTrue(self.client.login(username='seed-0', password='password123'))
+        self.assertEqual(summaries.get_summary(user).wallet_balance, user.wallet.balance)
+
+
+class ScheduleTestCase(WalletFixtureMixin, TestCase):
+    """Tests de l'échéance stockée (next_due_date) et du balayage quotidien"""
+
+    def test_next_due_date_is_stored_and_swept(self):
+        today = timezone.localdate()
+        self.assertEqual(self.tontine.next_due_date, today + timedelta(days=30))
+        self.assertEqual(list(schedule.due_between(today, today + timedelta(days=30))), [self.tontine])
+        self.assertEqual(schedule.next_due_for(self.user), (self.tontine, today + timedelta(days=30)))
+
+        later = today + timedelta(days=31)
+        self.assertEqual(schedule.sweep(today=later), 1)
+        self.tontine.refresh_from_db()
+        self.assertEqual(self.tontine.next_due_date, today + timedelta(days=60))
+        self.assertEqual(schedule.sweep(today=later), 0)
+
+        self.tontine.status = 'completed'
+        self.tontine.save()
+        self.assertIsNone(self.tontine.next_due_date)
+        self.assertIsNone(schedule.next_due_for(self.user))
+
+
+class RecurrenceTestCase(TestCase):
+    """Tests de la lecture des calendriers de réunion"""
+
+    def test_parse_and_expand(self):
+        cases = {
+            'Tous les samedis à 10h': 'FREQ=WEEKLY;BYDAY=SA;BYHOUR=10;BYMINUTE=0',
+            'Un dimanche sur deux': 'FREQ=WEEKLY;INTERVAL=2;BYDAY=SU',
+            'Le dernier vendredi du mois à 18h30': 'FREQ=MONTHLY;BYDAY=-1FR;BYHOUR=18;BYMINUTE=30',
+            'Le 5 de chaque mois': 'FREQ=MONTHLY;BYMONTHDAY=5',
+            'Quand on peut': '',
+        }
+        for text, rule in cases.items():
+            self.assertEqual(recurrence.parse(text), rule, text)
+
+        every_other_saturday = 'FREQ=WEEKLY;INTERVAL=2;BYDAY=SA'
+        self.assertEqual(
+            list(recurrence.occurrences(every_other_saturday, date(2026, 10, 1), date(2026, 10, 20), date(2026, 11, 30))),
+            [date(2026, 10, 31), date(2026, 11, 14), date(2026, 11, 28)],
+        )
+        self.assertEqual(
+            list(recurrence.occurrences('FREQ=MONTHLY;BYMONTHDAY=31', date(2026, 1, 1), date(2026, 10, 1), date(2026, 12, 31))),
+            [date(2026, 10, 31), date(2026, 12, 31)],
+        )
+
+
+class ContributionRollupTestCase(WalletFixtureMixin, TestCase):
+    """Tests de l'agrégat quotidien des contributions"""
+
+    def test_rollup_follows_contributions_and_rebuild(self):
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        rollup = ContributionDailyRollup.objects.get(tontine=self.tontine)
+        self.assertEqual((rollup.day, rollup.count, rollup.total), (timezone.localdate(), 2, Decimal('2000')))
+
+        rollup.delete()
+        call_command('rollup_contributions', stdout=StringIO())
+        rollup = ContributionDailyRollup.objects.get(tontine=self.tontine)
+        self.assertEqual((rollup.count, rollup.total), (2, Decimal('2000')))
+
+        self.client.login(username='payer', password='password123')
+        data = self.client.get(reverse('tontine_contribution_stats', args=[self.tontine.id]), {'days': 7}).json()
+        self.assertEqual(len(data['labels']), 7)
+        self.assertEqual((data['counts'][-1], data['totals'][-1]), (2, 2000.0))
+        self.assertEqual(rollups.series(self.tontine.id, 30, 'month')['counts'], [2])
+
+    def test_member_removal_updates_rollup(self):
+        other = User.objects.create_user(username='voisin', password='x', phone_number='0700000009')
+        membership = TontineMember.objects.create(tontine=self.tontine, user=other, status='active')
+        deposit_to_wallet(Wallet.objects.create(user=other), Decimal('1000'), note='Dépôt')
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        pay_contribution_from_wallet(other, self.tontine, membership)
+
+        membership.delete()
+        rollup = ContributionDailyRollup.objects.get(tontine=self.tontine)
+        self.assertEqual((rollup.count, rollup.total), (1, Decimal('1000')))
+        self.member.delete()
+        self.assertFalse(ContributionDailyRollup.objects.filter(tontine=self.tontine).exists())
+
+
+class ActivityFeedTestCase(WalletFixtureMixin, TestCase):
+    """Tests du fil d'activité (fan-out à l'écriture, lecture à la demande pour les grandes tontines)"""
+
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(username='voisin', password='x', phone_number='0700000009')
+        TontineMember.objects.create(tontine=self.tontine, user=self.other, status='active')
+
+    def test_events_are_fanned_out_to_members(self):
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        self.assertEqual(ActivityFeedItem.objects.filter(kind='contribution').count(), 2)
+        with self.assertNumQueries(2):
+            items = feed.latest(self.other)
+        self.assertEqual([item.kind for item in items], ['contribution', 'member_joined'])
+        self.assertEqual((items[0].actor, items[0].amount), (self.user, Decimal('1000')))
+
+    def test_large_tontines_are_read_on_demand(self):
+        with self.settings(ACTIVITY_FANOUT_LIMIT=1):
+            pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        shared = ActivityFeedItem.objects.get(kind='contribution')
+        self.assertIsNone(shared.user_id)
+        self.assertEqual(feed.latest(self.other)[0], shared)
+        self.assertEqual(feed.latest(self.user)[0], shared)
+
+    def test_old_items_are_pruned(self):
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        ActivityFeedItem.objects.filter(kind='member_joined').update(created_at=timezone.now() - timedelta(days=91))
+        self.assertEqual(feed.prune(batch_size=2), 3)
+        self.assertEqual(set(ActivityFeedItem.objects.values_list('kind', flat=True)), {'contribution'})
+        call_command('prune_activity_feed', '--days', '0', stdout=StringIO())
+        self.assertFalse(ActivityFeedItem.objects.exists())
+
+
+class MemberPaginationTestCase(WalletFixtureMixin, TestCase):
+    """Tests des vues détail/gestion: statistiques annotées et membres paginés"""
+
+    def setUp(self):
+        super().setUp()
+        users = User.objects.bulk_create(
+            User(username=f'membre{i}', phone_number=f'07100000{i:02d}') for i in range(60)
+        )
+        TontineMember.objects.bulk_create(
+            TontineMember(tontine=self.tontine, user=user, status='pending') for user in users
+        )
+        self.client.login(username='payer', password='password123')
+
+    def test_members_are_paginated_with_annotated_stats(self):
+        response = self.client.get(reverse('tontine_manage', args=[self.tontine.id]))
+        self.assertEqual(response.context['stats'], {
+            'total_members': 61, 'active_members': 1, 'total_collected': 0,
+        })
+        self.assertEqual(len(response.context['members_page'].object_list), 50)
+
+        response = self.client.get(reverse('tontine_detail', args=[self.tontine.id]), {'members_page': 2})
+        page = response.context['members_page']
+        self.assertEqual((page.number, len(page.object_list), page.paginator.num_pages), (2, 11, 2))
+        self.assertContains(response, 'Membres (61)')
+
+
+class TontineCountersTestCase(WalletFixtureMixin, TestCase):
+    """Tests des compteurs dénormalisés de Tontine"""
+
+    def counts(self):
+        self.tontine.refresh_from_db()
+        return tuple(getattr(self.tontine, field) for field in counters.COUNTER_FIELDS[:3])
+
+    def test_counters_follow_membership_and_contributions(self):
+        other = User.objects.create_user(username='voisin', password='x', phone_number='0700000009')
+        membership = TontineMember.objects.create(tontine=self.tontine, user=other)
+        self.assertEqual(self.counts(), (1, 1, 0))
+
+        membership = TontineMember.objects.get(pk=membership.pk)
+        membership.status = 'active'
+        membership.save()
+        membership.save()
+        self.assertEqual(self.counts(), (2, 0, 0))
+
+        contribution = pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        self.assertEqual(self.counts(), (2, 0, 1))
+        self.assertEqual(self.tontine.last_contribution_at, contribution.created_at)
+
+        Wallet.objects.create(user=other, balance=Decimal('1000'))
+        collect_cycle(self.tontine)
+        self.assertEqual(self.counts(), (2, 0, 3))
+
+        membership.delete()
+        self.assertEqual(self.counts(), (1, 0, 2))
+
+    def test_activation_keeps_counters(self):
+        draft = Tontine.objects.create(
+            name='Brouillon', code='BR01', description='Test', manager=self.user,
+            start_date=timezone.localdate(), contribution_amount=Decimal('1000'),
+        )
+        loaded = Tontine.objects.get(pk=draft.pk)
+        # Une adhésion arrive entre la lecture de la tontine par la vue et son enregistrement
+        other = User.objects.create_user(username='voisin', password='x', phone_number='0700000009')
+        TontineMember.objects.create(tontine=draft, user=other)
+        self.client.login(username='payer', password='password123')
+        with patch('tontines.views.get_object_or_404', return_value=loaded):
+            self.client.post(reverse('tontine_activate', args=[draft.pk]))
+        draft.refresh_from_db()
+        self.assertEqual((draft.status, draft.pending_member_count), ('active', 1))
+        self.assertIsNotNone(draft.next_payout_date)
+
+    def test_rebuild_repairs_drift(self):
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        expected = self.counts()
+        Tontine.objects.update(active_member_count=7, contribution_count=0, last_contribution_at=None)
+        call_command('rebuild_tontine_counters', stdout=StringIO())
+        self.assertEqual(self.counts(), expected)
+        self.assertIsNotNone(self.tontine.last_contribution_at)
+
+
+class ShardedCountersTestCase(WalletFixtureMixin, TestCase):
+    """Tests des tontines fractionnées (pot et compteurs répartis sur plusieurs lignes)"""
+
+    def setUp(self):
+        super().setUp()
+        Tontine.objects.filter(pk=self.tontine.pk).update(counter_shards=4)
+        self.tontine.refresh_from_db()
+
+    def test_writes_go_to_shards_and_are_summed_on_read(self):
+        for _ in range(2):
+            pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        self.assertEqual(sum(TontineCounterShard.objects.values_list('total_pot', flat=True)), Decimal('2000'))
+        self.assertEqual(Tontine.objects.get(pk=self.tontine.pk).total_pot, 0)
+        # Les fractions non reportées ne sont pas un écart du grand livre
+        self.assertEqual(ledger.rebuild_projections(dry_run=True), [])
+        counters.rebuild()
+
+        self.client.login(username='payer', password='password123')
+        response = self.client.get(reverse('tontine_detail', args=[self.tontine.id]))
+        self.assertEqual(response.context['tontine'].total_pot, Decimal('2000'))
+        self.assertEqual(response.context['tontine'].contribution_count, 2)
+
+    def test_member_removal_with_unfolded_contributions(self):
+        other = User.objects.create_user(username='voisin', password='x', phone_number='0700000009')
+        membership = TontineMember.objects.create(tontine=self.tontine, user=other, status='active')
+        deposit_to_wallet(Wallet.objects.create(user=other), Decimal('1000'), note='Dépôt')
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        pay_contribution_from_wallet(other, self.tontine, membership)
+
+        self.client.login(username='payer', password='password123')
+        self.client.post(reverse('tontine_remove_member', args=[self.tontine.id, membership.id]))
+        self.assertFalse(TontineMember.objects.filter(pk=membership.pk).exists())
+        self.tontine.refresh_from_db()
+        self.assertEqual((self.tontine.contribution_count, self.tontine.total_pot), (1, Decimal('2000')))
+
+    def test_fold_moves_shards_to_the_tontine_row(self):
+        pay_contribution_from_wallet(self.user, self.tontine, self.member)
+        self.assertEqual(counters.fold(self.tontine.pk), Decimal('1000'))
+        self.tontine.refresh_from_db()
+        self.assertEqual((self.tontine.total_pot, self.tontine.contribution_count), (Decimal('1000'), 1))
+        self.assertIsNotNone(self.tontine.last_contribution_at)
+        self.assertEqual(counters.fold_all(), 0)
+        self.assertEqual(ledger.rebuild_projections(dry_run=True), [])
+
+
+class RotationTestCase(TestCase):
+    """Tests de l'ordre des bénéficiaires (rotation)"""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'rot{i}', password='x', phone_number=f'07200000{i:02d}')
+            for i in range(4)
+        ]
+        # Comptes du plus récent au plus ancien: l'ancienneté inverse l'ordre d'adhésion
+        for age, user in enumerate(self.users):
+            User.objects.filter(pk=user.pk).update(date_joined=timezone.now() - timedelta(days=age))
+        self.tontine = Tontine.objects.create(
+            name='Rotation', code='ROT1', description='Test', manager=self.users[0],
+            start_date=timezone.localdate(), contribution_amount=Decimal('1000'),
+        )
+        self.members = [
+            TontineMember.objects.create(tontine=self.tontine, user=user, status='active') for user in self.users
+        ]
+
+    def activate(self, method):
+        self.tontine.rotation_method = method
+        self.tontine.status = 'active'
+        self.tontine.save()
+        return list(RotationSlot.objects.filter(tontine=self.tontine, cycle=1).order_by('position')
+                    .values_list('member_id', flat=True))
+
+    def test_order_is_drawn_at_activation(self):
+        self.assertEqual(self.activate('seniority'), [m.pk for m in reversed(self.members)])
+
+        def drawn(method, cycle):
+            self.tontine.rotation_method = method
+            rotation.generate(self.tontine, cycle)
+            return list(RotationSlot.objects.filter(tontine=self.tontine, cycle=cycle).order_by('position')
+                        .values_list('member_id', flat=True))
+
+        self.assertEqual(drawn('fixed', 2), [m.pk for m in self.members])
+        order = drawn('random', 3)
+        self.assertEqual(sorted(order), [m.pk for m in self.members])
+        # Tirage reproductible: même graine (tontine, cycle), même ordre
+        RotationSlot.objects.filter(cycle=3).delete()
+        self.assertEqual(drawn('random', 3), order)
+
+    def test_cycles_roll_over_once_everyone_received(self):
+        self.activate('fixed')
+        for member in self.members:
+            slot = rotation.next_slot(self.tontine)
+            self.assertEqual((slot.cycle, slot.member), (1, member))
+            self.assertIsNotNone(rotation.allocate(self.tontine, member, 1, Decimal('4000')))
+        self.assertIsNone(rotation.allocate(self.tontine, self.members[0], 1, Decimal('4000')))
+
+        # Lecture seule: le cycle 2 est présenté dans l'ordre du tirage, sans être enregistré
+        state = rotation.state(self.tontine)
+        self.assertEqual((state['current_cycle'], state['eligible_count'], state['received_count']), (2, 4, 0))
+        self.assertEqual([slot.member for slot in state['eligible']], self.members)
+        self.assertFalse(RotationSlot.objects.filter(tontine=self.tontine, cycle=2).exists())
+
+        rotation.next_slot(self.tontine)  # tire le cycle 2
+        with self.assertNumQueries(5):
+            state = rotation.state(self.tontine)
+        self.assertEqual((state['current_cycle'], state['eligible_count'], state['received_count']), (2, 4, 0))
+
+    def test_tontines_without_rotation_resume_at_their_last_cycle(self):
+        Tontine.objects.filter(pk=self.tontine.pk).update(status='active')
+        BeneficiaryAllocation.objects.create(
+            tontine=self.tontine, member=self.members[0], cycle_number=3, amount=Decimal('4000'),
+        )
+        state = rotation.state(self.tontine)
+        self.assertEqual((state['current_cycle'], state['eligible_count'], state['received_count']), (3, 3, 0))
+        self.assertEqual(state['next'].member, self.members[1])
+        self.assertFalse(RotationSlot.objects.filter(tontine=self.tontine).exists())
+        self.assertEqual(rotation.next_slot(self.tontine).member, self.members[1])
+
+
+class PayoutTestCase(TestCase):
+    """Tests des versements automatiques du pot"""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.users = [
+            User.objects.create_user(username=f'pay{i}', password='x', phone_number=f'07300000{i:02d}')
+            for i in range(2)
+        ]
+        self.tontines = []
+        for i in range(2):
+            tontine = Tontine.objects.create(
+                name=f'Versement {i}', code=f'PAY{i}', description='Test', manager=self.users[0],
+                start_date=self.today - timedelta(days=30), cycle_duration=30,
+                contribution_amount=Decimal('1000'),
+            )
+            for user in self.users:
+                TontineMember.objects.create(tontine=tontine, user=user, status='active')
+            tontine.status = 'active'
+            tontine.save()
+            Tontine.objects.filter(pk=tontine.pk).update(total_pot=Decimal('2000'), next_payout_date=self.today)
+            self.tontines.append(tontine)
+
+    def test_due_pot_is_paid_to_the_next_beneficiary_once(self):
+        run = payouts.run(today=self.today)
+        self.assertEqual((run.payouts, run.total), (2, Decimal('4000')))
+        self.assertIsNotNone(run.finished_at)
+
+        tontine = Tontine.objects.get(pk=self.tontines[0].pk)
+        self.assertEqual(tontine.total_pot, Decimal('0'))
+        self.assertEqual(tontine.next_payout_date, self.today + timedelta(days=30))
+        allocation = BeneficiaryAllocation.objects.get(tontine=tontine)
+        self.assertEqual((allocation.member.user, allocation.cycle_number, allocation.amount),
+                         (self.users[0], 1, Decimal('2000')))
+        self.assertEqual(Wallet.objects.get(user=self.users[0]).balance, Decimal('4000'))
+        self.assertEqual(Transaction.objects.filter(user=self.users[0], type='payout').count(), 2)
+        self.assertEqual(ledger.balance(LedgerEntry.TONTINE, tontine.pk), Decimal('-2000'))
+
+        # Plus rien n'est dû: une nouvelle exécution ne verse rien
+        self.assertEqual(payouts.run(today=self.today).payouts, 0)
+        self.assertEqual(BeneficiaryAllocation.objects.count(), 2)
+
+    def test_interrupted_run_resumes_after_its_checkpoint(self):
+        PayoutRun.objects.create(day=self.today, last_tontine_id=self.tontines[0].pk)
+        run = payouts.run(today=self.today + timedelta(days=1), batch_size=1)
+        self.assertEqual((run.day, run.payouts), (self.today, 1))
+        self.assertEqual(
+            list(BeneficiaryAllocation.objects.values_list('tontine_id', flat=True)), [self.tontines[1].pk],
+        )
+        self.assertFalse(PayoutRun.objects.filter(finished_at__isnull=True).exists())
+
+    def test_empty_pot_postpones_the_payout(self):
+        Tontine.objects.filter(pk=self.tontines[0].pk).update(total_pot=0)
+        self.assertEqual(payouts.run(today=self.today).payouts, 1)
+        tontine = Tontine.objects.get(pk=self.tontines[0].pk)
+        self.assertEqual(tontine.next_payout_date, self.today + timedelta(days=30))
+        self.assertFalse(BeneficiaryAllocation.objects.filter(tontine=tontine).exists())
+
+
+class ProjectionTestCase(TestCase):
+    """Tests de la projection des flux"""
+
+    def test_full_round_pays_everyone_once_and_balances(self):
+        result = projection.project(4, Decimal('1000'), 7, start_date=date(2026, 1, 1))
+        self.assertEqual(result.net.shape, (4, 4))
+        self.assertEqual(result.beneficiaries.tolist(), [0, 1, 2, 3])
+        self.assertEqual(result.payouts.sum(axis=1).tolist(), [4000] * 4)
+        # Chaque cycle est équilibré, et un tour complet aussi pour chaque membre
+        self.assertEqual(result.net.sum(axis=0).tolist(), [0] * 4)
+        self.assertEqual(result.balance[:, -1].tolist(), [0] * 4)
+        self.assertEqual(projection.member_summary(result)['lowest_balance'].tolist(), [0, -1000, -2000, -3000])
+        self.assertEqual((result.dates[0], result.dates[-1]), (date(2026, 1, 8), date(2026, 1, 29)))
+
+        shuffled = projection.project(60, 1000, cycles=90, rotation_method='random')
+        self.assertEqual(sorted(shuffled.beneficiaries[:60].tolist()), list(range(60)))
+        self.assertEqual(shuffled.beneficiaries[60:].tolist(), shuffled.beneficiaries[:30].tolist())
+
+    def test_cycles_are_capped(self):
+        result = projection.project(800, 1000)
+        self.assertEqual(result.net.shape, (800, projection.MAX_CYCLES))
+        self.assertEqual(int(result.payout_cycle[-1]), -1)
+        form = ProjectionForm({'members': 800, 'contribution_amount': 1000})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['cycles'], projection.MAX_CYCLES)
+
+    def test_view_returns_the_matrix_as_json(self):
+        user = User.objects.create_user(username='plan', password='x', phone_number='0740000000')
+        self.client.force_login(user)
+        url = reverse('tontine_projection')
+        data = self.client.get(url, {'members': 3, 'contribution_amount': 500, 'format': 'json'}).json()
+        self.assertEqual([row['beneficiary'] for row in data['cycles']], [1, 2, 3])
+        self.assertEqual(data['summary']['lowest_balance'], [0, -500, -1000])
+        self.assertEqual([row['total_advanced'] for row in data['cycles']], [1000, 1000, 0])
+        self.assertNotIn('net', data)
+        self.assertEqual(self.client.get(url, {'members': 1, 'format': 'json'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {
+            'members': 3, 'contribution_amount': 500, 'cycle_duration': 10 ** 9, 'format': 'json',
+        }).status_code, 400)
+        response = self.client.get(url, {
+            'members': 3, 'contribution_amount': 500, 'start_date': '9999-12-01', 'format': 'json',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('start_date', response.json()['errors'])
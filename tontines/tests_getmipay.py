@@ -3,7 +3,7 @@ Tests pour l'intégration GetMiPay
 Tests unitaires pour vérifier le flux de paiement complet
 """
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 from unittest.mock import patch, MagicMock
@@ -51,7 +51,7 @@ class GetMiPayDepositTestCase(TestCase):
         })
         self.assertEqual(response.status_code, 302)
     
-    @patch('tontines.getmipay_service.requests.post')
+    @patch('tontines.getmipay_service.requests.Session.post')
     def test_initiate_deposit_success(self, mock_post):
         """Tester l'initiation réussie d'un dépôt"""
         # Mock la réponse GetMiPay
@@ -85,7 +85,7 @@ class GetMiPayDepositTestCase(TestCase):
         self.assertIsNotNone(transaction)
         self.assertEqual(transaction.amount, Decimal('5000'))
     
-    @patch('tontines.getmipay_service.requests.post')
+    @patch('tontines.getmipay_service.requests.Session.post')
     def test_initiate_deposit_failure(self, mock_post):
         """Tester l'échec d'un dépôt"""
         # Mock une erreur GetMiPay
@@ -144,7 +144,7 @@ class GetMiPayWithdrawalTestCase(TestCase):
         
         self.assertEqual(response.status_code, 302)  # Redirect on error
     
-    @patch('tontines.getmipay_service.requests.post')
+    @patch('tontines.getmipay_service.requests.Session.post')
     def test_initiate_withdrawal_success(self, mock_post):
         """Tester l'initiation réussie d'un retrait"""
         # Mock la réponse GetMiPay
@@ -182,6 +182,7 @@ class GetMiPayWithdrawalTestCase(TestCase):
         self.assertIsNotNone(transaction)
 
 
+@override_settings(GETMIPAY_WEBHOOK_SECRET='secret-de-test')
 class GetMiPayWebhookTestCase(TestCase):
     """Tests pour les webhooks GetMiPay"""
     
@@ -206,22 +207,36 @@ class GetMiPayWebhookTestCase(TestCase):
             'user_id': self.user.id
         }
         
-        # Générer la signature correcte
-        message = json.dumps(webhook_data, sort_keys=True)
+        # Générer la signature correcte (corps brut, tel qu'envoyé)
+        body = json.dumps(webhook_data).encode()
         correct_signature = hmac.new(
             settings.GETMIPAY_WEBHOOK_SECRET.encode(),
-            message.encode(),
+            body,
             hashlib.sha256
         ).hexdigest()
         
         # Tester la vérification
-        result = getmipay_service.verify_webhook(correct_signature, webhook_data)
+        result = getmipay_service.verify_webhook(correct_signature, body)
         self.assertTrue(result)
         
         # Tester avec une mauvaise signature
         wrong_signature = 'wrong_signature_123'
-        result = getmipay_service.verify_webhook(wrong_signature, webhook_data)
+        result = getmipay_service.verify_webhook(wrong_signature, body)
         self.assertFalse(result)
+        
+        # Le même contenu sérialisé autrement n'a pas la même signature
+        result = getmipay_service.verify_webhook(correct_signature, json.dumps(webhook_data, indent=2).encode())
+        self.assertFalse(result)
+    
+    def test_webhook_rejected_without_secret(self):
+        """Sans secret configuré, même une signature calculée avec une clé vide est refusée"""
+        body = json.dumps({'event': 'payment.completed', 'transaction_id': 'TXN123456'}).encode()
+        forged = hmac.new(b'', body, hashlib.sha256).hexdigest()
+        with self.settings(GETMIPAY_WEBHOOK_SECRET=''):
+            self.assertFalse(getmipay_service.verify_webhook(forged, body))
+            response = self.client.post('/webhook/getmipay/', body, content_type='application/json',
+                                        HTTP_X_SIGNATURE=forged)
+        self.assertEqual(response.status_code, 503)
     
     def test_webhook_payment_completed(self):
         """Tester le traitement d'un webhook payment.completed"""
@@ -231,12 +246,13 @@ class GetMiPayWebhookTestCase(TestCase):
             wallet=self.wallet,
             amount=Decimal('5000'),
             type='deposit',
+            provider_reference='TXN-DEP1',
             note='Dépôt en attente'
         )
         
         webhook_data = {
             'event': 'payment.completed',
-            'transaction_id': str(transaction.id),
+            'transaction_id': 'TXN-DEP1',
             'user_id': self.user.id
         }
         
@@ -261,12 +277,13 @@ class GetMiPayWebhookTestCase(TestCase):
             wallet=self.wallet,
             amount=Decimal('5000'),
             type='deposit',
+            provider_reference='TXN-DEP2',
             note='Dépôt en attente'
         )
         
         webhook_data = {
             'event': 'payment.failed',
-            'transaction_id': str(transaction.id),
+            'transaction_id': 'TXN-DEP2',
             'error': 'Payment declined'
         }
         
@@ -281,6 +298,45 @@ class GetMiPayWebhookTestCase(TestCase):
         transaction.refresh_from_db()
         self.assertEqual(transaction.status, 'failed')
 
+    def test_replayed_webhook_is_applied_once(self):
+        """Un webhook rejoué ne crédite pas deux fois (transition depuis 'pending' seulement)"""
+        transaction = Transaction.objects.create(
+            user=self.user, wallet=self.wallet, amount=Decimal('5000'), type='deposit',
+            provider_reference='TXN777', note='Dépôt en attente',
+        )
+        webhook_data = {'event': 'payment.completed', 'transaction_id': 'TXN777', 'status': 'success'}
+        self.assertTrue(getmipay_service.process_webhook('payment.completed', webhook_data))
+        self.assertTrue(getmipay_service.process_webhook('payment.completed', webhook_data))
+        self.assertTrue(getmipay_service.process_webhook('payment.failed', webhook_data))
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('6000'))
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.status, 'completed')
+        self.assertFalse(getmipay_service.process_webhook('payment.completed', {'transaction_id': 'INCONNU'}))
+        # Jamais par notre identifiant, ni à travers les familles d'événements
+        self.assertFalse(getmipay_service.process_webhook('payment.completed', {'transaction_id': str(transaction.pk)}))
+        Transaction.objects.create(
+            user=self.user, wallet=self.wallet, amount=Decimal('400'), type='withdraw',
+            provider_reference='PAYOUT2', note='Retrait en attente',
+        )
+        self.assertFalse(getmipay_service.process_webhook('payment.completed', {'transaction_id': 'PAYOUT2'}))
+        self.assertEqual(Transaction.objects.get(provider_reference='PAYOUT2').status, 'pending')
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('6000'))
+
+    def test_failed_payout_is_refunded_once(self):
+        """Un retrait échoué rembourse le porte-monnaie une seule fois"""
+        Transaction.objects.create(
+            user=self.user, wallet=self.wallet, amount=Decimal('400'), type='withdraw',
+            provider_reference='PAYOUT1', note='Retrait en attente',
+        )
+        for _ in range(2):
+            getmipay_service.process_webhook('payout.failed', {'transaction_id': 'PAYOUT1'})
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('1400'))
+        self.assertEqual(Transaction.objects.get(provider_reference='PAYOUT1').status, 'refunded')
+
 
 class GetMiPayIntegrationTestCase(TestCase):
     """Tests d'intégration complets"""
@@ -297,7 +353,7 @@ class GetMiPayIntegrationTestCase(TestCase):
         self.client = Client()
         self.client.login(username='testuser', password='password123')
     
-    @patch('tontines.getmipay_service.requests.post')
+    @patch('tontines.getmipay_service.requests.Session.post')
     def test_complete_deposit_flow(self, mock_post):
         """Tester le flux complet de dépôt"""
         # Mock la réponse GetMiPay
@@ -331,3 +387,87 @@ class GetMiPayIntegrationTestCase(TestCase):
             type='deposit'
         ).first()
         self.assertIsNotNone(transaction)
+
+
+class GetMiPaySessionTestCase(TestCase):
+    """Tests de la session HTTP partagée"""
+
+    def test_session_is_pooled_and_retries_only_idempotent_calls(self):
+        from tontines.getmipay_service import get_session
+
+        session = get_session()
+        self.assertIs(get_session(), session)
+        adapter = session.get_adapter('https://api.sandbox.getmipay.com')
+        self.assertTrue(adapter._pool_block)
+        retry = adapter.max_retries
+        self.assertGreater(retry.total, 0)
+        self.assertGreater(retry.backoff_jitter, 0)
+        self.assertNotIn('POST', retry.allowed_methods)
+
+    @patch('tontines.getmipay_service.requests.Session.post')
+    def test_calls_are_timed(self, mock_post):
+        from tontines.getmipay_service import metrics
+
+        mock_post.return_value = MagicMock(status_code=503)
+        before = metrics.snapshot().get('/v1/payouts/initiate', {'calls': 0, 'errors': 0})
+        getmipay_service._post('/v1/payouts/initiate', {})
+        after = metrics.snapshot()['/v1/payouts/initiate']
+        self.assertEqual((after['calls'], after['errors']), (before['calls'] + 1, before['errors'] + 1))
+        self.assertEqual(mock_post.call_args.kwargs['timeout'], getmipay_service.timeout)
+
+
+@override_settings(GETMIPAY_WEBHOOK_SECRET='secret-de-test')
+class GetMiPayWebhookInboxTestCase(TestCase):
+    """Tests de la boîte de réception des webhooks"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='inbox', email='inbox@example.com', password='password123')
+        self.wallet, _ = Wallet.objects.get_or_create(user=self.user)
+        self.transaction = Transaction.objects.create(
+            user=self.user, wallet=self.wallet, amount=Decimal('5000'), type='deposit',
+            provider_reference='INBOX1', note='Dépôt en attente',
+        )
+
+    def post(self, data, signature=None):
+        from django.conf import settings
+
+        body = json.dumps(data).encode()
+        if signature is None:
+            signature = hmac.new(settings.GETMIPAY_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+        return self.client.post('/webhook/getmipay/', body, content_type='application/json',
+                                HTTP_X_SIGNATURE=signature)
+
+    def completed(self, event_id, transaction_id=None):
+        return {
+            'event_id': event_id, 'event': 'payment.completed', 'status': 'success', 'amount': '5000',
+            'transaction_id': str(transaction_id or self.transaction.provider_reference),
+        }
+
+    def test_endpoint_stores_each_event_once(self):
+        from tontines.models import WebhookEvent
+
+        self.assertEqual(self.post(self.completed('EVT1')).status_code, 200)
+        self.assertEqual(self.post(self.completed('EVT1')).status_code, 200)
+        self.assertEqual(self.post(self.completed('EVT2'), signature='faux').status_code, 403)
+        self.assertEqual(list(WebhookEvent.objects.values_list('event_id', 'status')), [('EVT1', 'pending')])
+        # Rien n'est appliqué pendant la requête
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('0'))
+
+    def test_drain_applies_once_and_keeps_order_per_transaction(self):
+        from tontines import inbox
+        from tontines.models import WebhookEvent
+
+        inbox.receive(self.completed('EVT1'))
+        inbox.receive(self.completed('EVT2'))  # renvoi sous un autre identifiant
+        inbox.receive(self.completed('EVT3', transaction_id=999999))
+        inbox.receive({**self.completed('EVT4', transaction_id=999999), 'event': 'payment.failed'})
+
+        counts = inbox.drain(batch_size=2)
+        self.assertEqual((counts['processed'], counts['duplicate'], counts['retry'], counts['deferred']), (1, 1, 1, 1))
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('5000'))
+        self.assertEqual(
+            list(WebhookEvent.objects.order_by('pk').values_list('status', 'attempts')),
+            [('processed', 0), ('duplicate', 0), ('pending', 1), ('pending', 0)],
+        )
@@ -1,18 +1,31 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Sum
-from .models import Tontine, TontineMember, BeneficiaryAllocation
-from .models import Contribution, Wallet, Vault, Transaction
-from .forms import TontineCreationForm
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+from .models import Tontine, TontineMember
+from .models import Wallet, Vault
+from .collection import collect_cycle
+from .exports import (
+    ALLOCATION_COLUMNS, CONTRIBUTION_COLUMNS, TRANSACTION_COLUMNS, ExportError, export_response,
+    parse_filters,
+)
+from . import counters, inbox, payouts, projection, rollups, rotation
+from .forms import ProjectionForm, TontineCreationForm
+from .getmipay_service import getmipay_service
+from .summaries import get_summary
+from .pagination import InvalidCursor, keyset_page, numbered_page, page_size_from
+from .payments import (
+    InsufficientFunds, PaymentError, deposit_to_wallet, pay_contribution_from_wallet,
+    record_contribution, transfer_to_vault,
+)
 from django.contrib.auth import get_user_model
 import json
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.db import models  # Pour utiliser models.Q
-from django.utils import timezone
-from django.urls import reverse
+from django.db import transaction
+from django.template.loader import render_to_string
 @login_required
 def tontine_create_view(request):
     if request.method == 'POST':
@@ -44,6 +57,58 @@ def tontine_create_view(request):
 
     return render(request, 'tontines/create.html', {'form': form})
 
+
+@login_required
+def tontine_projection_view(request):
+    """Projection des flux membres x cycles d'une tontine à créer (HTML, ou JSON avec ?format=json)."""
+    params = request.GET.copy()
+    as_json = params.pop('format', [''])[0] == 'json'
+    page_number = params.pop('members_page', ['1'])[0]
+    form = ProjectionForm(params or None)
+    if not form.is_valid():
+        if as_json:
+            return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+        return render(request, 'tontines/projection.html', {'form': form})
+
+    data = form.cleaned_data
+    try:
+        result = projection.project(
+            data['members'], data['contribution_amount'], data['cycle_duration'] or 30, data['start_date'],
+            data['cycles'], data['rotation_method'] or 'fixed',
+        )
+    except OverflowError:
+        # Dernière échéance au-delà de l'an 9999
+        form.add_error('start_date', "La projection dépasse la dernière date représentable.")
+        if as_json:
+            return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+        return render(request, 'tontines/projection.html', {'form': form})
+    if as_json:
+        return JsonResponse({'success': True, **projection.to_dict(result)})
+
+    # Matrice affichée par pages de membres (colonnes: tous les cycles)
+    members_page = numbered_page(range(result.members), page_number, result.members, MEMBERS_PAGE_SIZE)
+    summary = projection.member_summary(result)
+    rows = [
+        {
+            'number': index + 1,
+            'payout_cycle': int(result.payout_cycle[index]) + 1,
+            'paid': summary['paid'][index],
+            'received': summary['received'][index],
+            'lowest_balance': summary['lowest_balance'][index],
+            'net': result.net[index].tolist(),
+        }
+        for index in members_page.object_list
+    ]
+    return render(request, 'tontines/projection.html', {
+        'form': form,
+        'projection': result,
+        'cycles': [{'number': number, 'date': date} for number, date in enumerate(result.dates, start=1)],
+        'last_date': result.dates[-1],
+        'rows': rows,
+        'members_page': members_page,
+        'query': params.urlencode(),
+    })
+
 @login_required
 def tontine_list_view(request):
     # Tontines où l'utilisateur est membre
@@ -52,13 +117,12 @@ def tontine_list_view(request):
     # Tontines gérées par l'utilisateur
     managed_tontines = Tontine.objects.filter(manager=request.user)
     
-    # Statistiques
+    # Statistiques (résumé financier tenu à jour, voir summaries.py)
+    summary = get_summary(request.user)
     stats = {
-        'total_tontines': user_tontines.count(),
-        'active_tontines': user_tontines.filter(status='active').count(),
-        'total_contributed': TontineMember.objects.filter(
-            user=request.user, status='active'
-        ).aggregate(total=Sum('total_contributed'))['total'] or 0,
+        'total_tontines': summary.tontine_count,
+        'active_tontines': summary.active_tontine_count,
+        'total_contributed': summary.total_contributed,
     }
     
     context = {
@@ -68,28 +132,57 @@ def tontine_list_view(request):
     }
     return render(request, 'tontines/list.html', context)
 
+MEMBERS_PAGE_SIZE = 50
+
+
+def _tontine_with_stats(tontine_id, user):
+    """
+    La tontine et ses statistiques de membres en une seule requête (agrégats
+    conditionnels sur une jointure, adhésion de `user` en EXISTS), pot et
+    compteurs complétés par les fractions d'une tontine fractionnée.
+    """
+    return counters.read(get_object_or_404(
+        Tontine.objects.annotate(
+            total_members=Count('members'),
+            active_members=Count('members', filter=Q(members__status='active')),
+            total_collected=Sum('members__total_contributed'),
+            is_member=Exists(TontineMember.objects.filter(tontine=OuterRef('pk'), user=user)),
+        ),
+        id=tontine_id,
+    ))
+
+
+def _stats_and_members_page(request, tontine):
+    """Statistiques annotées et page courante des membres (?members_page=N)."""
+    stats = {
+        'total_members': tontine.total_members,
+        'active_members': tontine.active_members,
+        'total_collected': tontine.total_collected or 0,
+    }
+    members_page = numbered_page(
+        tontine.members.select_related('user').order_by('joined_date', 'id'),
+        request.GET.get('members_page'), tontine.total_members, size=MEMBERS_PAGE_SIZE,
+    )
+    return stats, members_page
+
+
 @login_required
 def tontine_detail_view(request, tontine_id):
-    tontine = get_object_or_404(Tontine, id=tontine_id)
+    tontine = _tontine_with_stats(tontine_id, request.user)
+    is_manager = request.user.pk == tontine.manager_id
     
     # Vérifier si l'utilisateur a accès à cette tontine
-    if not (request.user == tontine.manager or 
-            tontine.members.filter(user=request.user).exists()):
+    if not (is_manager or tontine.is_member):
         messages.error(request, "Vous n'avez pas accès à cette tontine.")
         return redirect('tontine_list')
     
-    # Obtenir les membres
-    members = tontine.members.all().select_related('user')
+    # Statistiques (annotées) et membres, paginés côté serveur
+    stats, members_page = _stats_and_members_page(request, tontine)
     
-    # Statistiques de la tontine
-    stats = {
-        'total_members': members.count(),
-        'active_members': members.filter(status='active').count(),
-        'total_collected': members.aggregate(total=Sum('total_contributed'))['total'] or 0,
-    }
-    
-    # Dernières contributions
-    recent_contributions = tontine.contributions.select_related('member__user').order_by('-created_at')[:8]
+    # Dernières contributions (la suite est chargée par curseur)
+    recent_contributions, next_cursor = keyset_page(
+        tontine.contributions.select_related('member__user'), size=8
+    )
 
     # Wallet utilisateur (s'il existe)
     user_wallet = None
@@ -100,10 +193,11 @@ def tontine_detail_view(request, tontine_id):
 
     context = {
         'tontine': tontine,
-        'members': members,
+        'members_page': members_page,
         'stats': stats,
-        'is_manager': request.user == tontine.manager,
+        'is_manager': is_manager,
         'recent_contributions': recent_contributions,
+        'next_cursor': next_cursor,
         'user_wallet': user_wallet,
     }
     return render(request, 'tontines/detail.html', context)
@@ -124,7 +218,8 @@ def tontine_activate_view(request, tontine_id):
     
     if request.method == 'POST':
         tontine.status = 'active'
-        tontine.save()
+        # Pas d'enregistrement complet: compteurs et pot sont tenus par F() (counters.py)
+        tontine.save(update_fields=['status', 'next_due_date', 'next_payout_date'])
         messages.success(request, f'La tontine "{tontine.name}" a été activée avec succès!')
         return redirect('tontine_detail', tontine_id=tontine.id)
     
@@ -134,26 +229,19 @@ def tontine_activate_view(request, tontine_id):
 
 @login_required
 def tontine_manage_view(request, tontine_id):
-    tontine = get_object_or_404(Tontine, id=tontine_id)
+    tontine = _tontine_with_stats(tontine_id, request.user)
     
     # Vérifier que l'utilisateur est le gestionnaire
-    if request.user != tontine.manager:
+    if request.user.pk != tontine.manager_id:
         messages.error(request, "Accès refusé. Seul le gestionnaire peut gérer cette tontine.")
         return redirect('tontine_detail', tontine_id=tontine.id)
     
-    # Récupérer les membres
-    members = tontine.members.all().select_related('user')
-
-    # Statistiques basiques pour la gestion
-    stats = {
-        'total_members': members.count(),
-        'active_members': members.filter(status='active').count(),
-        'total_collected': members.aggregate(total=Sum('total_contributed'))['total'] or 0,
-    }
+    # Statistiques (annotées) et membres, paginés côté serveur
+    stats, members_page = _stats_and_members_page(request, tontine)
 
     context = {
         'tontine': tontine,
-        'members': members,
+        'members_page': members_page,
         'stats': stats,
     }
     return render(request, 'tontines/manage.html', context)
@@ -176,7 +264,9 @@ def tontine_edit_view(request, tontine_id):
     if request.method == 'POST':
         form = TontineCreationForm(request.POST, instance=tontine)
         if form.is_valid():
-            form.save()
+            tontine = form.save(commit=False)
+            # Champs du formulaire et échéance recalculée (pre_save) seulement
+            tontine.save(update_fields=[*form._meta.fields, 'next_due_date', 'meeting_rule'])
             messages.success(request, 'La tontine a été mise à jour avec succès!')
             return redirect('tontine_detail', tontine_id=tontine.id)
     else:
@@ -258,18 +348,9 @@ def tontine_contribute_view(request, tontine_id):
 
         # Montant: par défaut montant de la tontine
         amount = tontine.contribution_amount
-        # Créer la contribution
-        contribution = Contribution.objects.create(
-            tontine=tontine,
-            member=member,
-            amount=amount
-        )
-
-        # Mettre à jour totaux
-        member.total_contributed = (member.total_contributed or 0) + amount
-        member.save()
-        tontine.total_pot = (tontine.total_pot or 0) + amount
-        tontine.save()
+        # Créer la contribution et mettre à jour les totaux (F(), atomique)
+        with transaction.atomic():
+            record_contribution(tontine, member, amount)
 
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
             return JsonResponse({'success': True, 'message': 'Contribution enregistrée.'})
@@ -359,10 +440,7 @@ def wallet_deposit_view(request):
 
     # Simuler intégration fournisseur : marquer dépôt comme réussi immédiatement
     # In production, ici on redirigerait vers l'API du fournisseur et on gérerait le callback.
-    wallet.balance = (wallet.balance or 0) + amt
-    wallet.save()
-
-    Transaction.objects.create(user=request.user, wallet=wallet, amount=amt, type='deposit', note=f'Dépôt via {method}')
+    deposit_to_wallet(wallet, amt, note=f'Dépôt via {method}')
     messages.success(request, f'Dépôt de {amt} FCFA effectué via {method}.')
     # Redirect to wallet overview
     return redirect('wallet_overview')
@@ -381,58 +459,116 @@ def tontine_pay_from_wallet(request, tontine_id):
         messages.error(request, 'Tontine introuvable.')
         return redirect('tontine_list')
 
-    try:
-        wallet = Wallet.objects.get(user=request.user)
-    except Wallet.DoesNotExist:
-        messages.error(request, 'Porte-monnaie introuvable. Faites un dépôt.')
-        return redirect('tontine_detail', tontine_id=tontine.id)
-
-    amount = tontine.contribution_amount
-    from decimal import Decimal
-    amt = Decimal(amount)
-
-    if wallet.balance < amt:
-        messages.error(request, 'Solde insuffisant sur le porte-monnaie.')
-        return redirect('tontine_detail', tontine_id=tontine.id)
-
-    # Vérifier que l'utilisateur est membre actif
     try:
         member = TontineMember.objects.get(tontine=tontine, user=request.user)
-        if member.status != 'active':
-            messages.error(request, "Votre adhésion n'est pas active. Le gestionnaire doit d'abord vous accepter.")
-            return redirect('tontine_detail', tontine_id=tontine.id)
     except TontineMember.DoesNotExist:
         messages.error(request, "Vous n'êtes pas membre de cette tontine.")
         return redirect('tontine_list')
 
-    # Débiter wallet
-    wallet.balance = wallet.balance - amt
-    wallet.save()
-    Transaction.objects.create(user=request.user, wallet=wallet, amount=amt, type='payment', note=f'Paiement contribution tontine {tontine.id}')
-
-    # Créer contribution
-    Contribution.objects.create(tontine=tontine, member=member, amount=amt)
-    member.total_contributed = (member.total_contributed or 0) + amt
-    member.save()
-    tontine.total_pot = (tontine.total_pot or 0) + amt
-    tontine.save()
+    # Débit, contribution et totaux dans une seule transaction (voir payments.py)
+    try:
+        pay_contribution_from_wallet(request.user, tontine, member)
+    except PaymentError as e:
+        messages.error(request, str(e))
+        return redirect('tontine_detail', tontine_id=tontine.id)
 
     messages.success(request, 'Paiement effectué depuis votre porte-monnaie.')
     return redirect('tontine_detail', tontine_id=tontine.id)
 
 
+@login_required
+@require_POST
+def tontine_collect_view(request, tontine_id):
+    """Prélever la contribution du cycle sur le porte-monnaie de tous les membres actifs."""
+    tontine = get_object_or_404(Tontine, id=tontine_id)
+
+    if request.user != tontine.manager:
+        messages.error(request, "Seul le gestionnaire peut lancer la collecte.")
+        return redirect('tontine_detail', tontine_id=tontine.id)
+
+    if tontine.status != 'active':
+        messages.error(request, "La tontine n'est pas active.")
+        return redirect('tontine_manage', tontine_id=tontine.id)
+
+    try:
+        result = collect_cycle(tontine)
+    except PaymentError as e:
+        messages.error(request, str(e))
+        return redirect('tontine_manage', tontine_id=tontine.id)
+
+    messages.success(request, f"{len(result.paid)} contribution(s) prélevée(s), {result.total} FCFA collectés.")
+    if result.insufficient:
+        names = ', '.join(m.user.get_full_name() or m.user.username for m, _ in result.insufficient[:10])
+        more = len(result.insufficient) - 10
+        if more > 0:
+            names += f' et {more} autre(s)'
+        messages.warning(request, f"Solde insuffisant pour {len(result.insufficient)} membre(s): {names}.")
+    return redirect('tontine_manage', tontine_id=tontine.id)
+
+
 @login_required
 def wallet_overview(request):
     wallet, _ = Wallet.objects.get_or_create(user=request.user)
     vaults = Vault.objects.filter(owner=request.user)
-    transactions = request.user.transactions.order_by('-created_at')[:20]
+    transactions, next_cursor = keyset_page(request.user.transactions.all(), size=20)
     return render(request, 'tontines/wallet_overview.html', {
         'wallet': wallet,
         'vaults': vaults,
         'transactions': transactions,
+        'next_cursor': next_cursor,
     })
 
 
+def _page_response(request, queryset, template, item_name):
+    """Réponse JSON d'une page suivante: fragment HTML + curseur suivant."""
+    try:
+        items, next_cursor = keyset_page(
+            queryset, cursor=request.GET.get('cursor'), size=page_size_from(request)
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    html = ''.join(render_to_string(template, {item_name: item}, request=request) for item in items)
+    return JsonResponse({'success': True, 'html': html, 'next_cursor': next_cursor})
+
+
+@login_required
+def wallet_transactions_view(request):
+    """Page suivante de l'historique des transactions (bouton "Charger plus")."""
+    return _page_response(
+        request, request.user.transactions.all(), 'tontines/_transaction_item.html', 't'
+    )
+
+
+@login_required
+def tontine_contributions_view(request, tontine_id):
+    """Page suivante des contributions d'une tontine (bouton "Charger plus")."""
+    tontine = get_object_or_404(Tontine, id=tontine_id)
+    if not (request.user == tontine.manager or
+            tontine.members.filter(user=request.user).exists()):
+        return JsonResponse({'success': False, 'error': "Vous n'avez pas accès à cette tontine."}, status=403)
+    return _page_response(
+        request, tontine.contributions.select_related('member__user'),
+        'tontines/_contribution_item.html', 'contrib'
+    )
+
+
+@login_required
+def tontine_contribution_stats_view(request, tontine_id):
+    """Série des contributions d'une tontine pour les graphiques (JSON, lue dans l'agrégat quotidien)."""
+    tontine = get_object_or_404(Tontine, id=tontine_id)
+    if not (request.user.pk == tontine.manager_id or
+            tontine.members.filter(user=request.user).exists()):
+        return JsonResponse({'success': False, 'error': "Vous n'avez pas accès à cette tontine."}, status=403)
+    bucket = request.GET.get('bucket', 'day')
+    try:
+        days = int(request.GET.get('days', 90))
+    except ValueError:
+        days = 0
+    if bucket not in rollups.BUCKETS or not 1 <= days <= 731:
+        return JsonResponse({'success': False, 'error': 'Période invalide.'}, status=400)
+    return JsonResponse({'success': True, 'bucket': bucket, **rollups.series(tontine.id, days, bucket)})
+
+
 @login_required
 def vaults_overview(request):
     vaults = Vault.objects.filter(owner=request.user).order_by('-id')
@@ -468,14 +604,9 @@ def vault_create_view(request):
         try:
             amt = Decimal(amount)
             wallet, _ = Wallet.objects.get_or_create(user=request.user)
-            if wallet.balance >= amt:
-                wallet.balance = wallet.balance - amt
-                wallet.save()
-                vault.balance = (vault.balance or 0) + amt
-                vault.save()
-                Transaction.objects.create(user=request.user, wallet=wallet, vault=vault, amount=amt, type='transfer', note='Dépot vers coffre')
-            else:
-                messages.warning(request, 'Solde insuffisant pour alimenter le coffre.')
+            transfer_to_vault(wallet, vault, amt)
+        except InsufficientFunds:
+            messages.warning(request, 'Solde insuffisant pour alimenter le coffre.')
         except Exception:
             messages.error(request, 'Montant invalide pour le dépôt.')
 
@@ -487,6 +618,51 @@ def vault_create_view(request):
 
 
 
+# ============================================
+# EXPORTS (CSV / JSONL en flux)
+# ============================================
+
+def _export(request, queryset, columns, filename, date_field='created_at'):
+    try:
+        queryset = queryset.filter(**parse_filters(request, date_field)).order_by(date_field, 'id')
+        return export_response(queryset, columns, request.GET.get('format', 'csv'), filename)
+    except ExportError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+
+def _can_export_tontine(user, tontine):
+    """Gestionnaire, président ou trésorier de la tontine."""
+    return user == tontine.manager or tontine.members.filter(
+        user=user, status='active', role__in=('president', 'treasurer')
+    ).exists()
+
+
+@login_required
+def wallet_export_view(request):
+    """Relevé du porte-monnaie de l'utilisateur."""
+    return _export(
+        request, request.user.transactions.all(), TRANSACTION_COLUMNS,
+        f'releve-{request.user.username}'
+    )
+
+
+@login_required
+def tontine_export_view(request, tontine_id, kind):
+    """Export des contributions ou des allocations d'une tontine."""
+    tontine = get_object_or_404(Tontine, id=tontine_id)
+    if not _can_export_tontine(request.user, tontine):
+        messages.error(request, "Seuls le gestionnaire et le trésorier peuvent exporter.")
+        return redirect('tontine_detail', tontine_id=tontine.id)
+
+    if kind not in ('contributions', 'allocations'):
+        raise Http404("Export inconnu.")
+    if kind == 'contributions':
+        return _export(request, tontine.contributions.all(), CONTRIBUTION_COLUMNS,
+                       f'{tontine.code}-contributions')
+    return _export(request, tontine.allocations.all(), ALLOCATION_COLUMNS,
+                   f'{tontine.code}-allocations', date_field='allocated_date')
+
+
 # ============================================
 # VUES API POUR LA GESTION DES MEMBRES
 # ============================================
@@ -650,30 +826,17 @@ def tontine_remove_member(request, tontine_id, member_id):
 # ============================================
 
 def get_allocation_stats(tontine):
-    """Retourne les statistiques d'allocation pour une tontine"""
-    members = tontine.members.filter(status='active')
-    current_cycle = BeneficiaryAllocation.objects.filter(tontine=tontine).aggregate(
-        max_cycle=Count('id', distinct=True)
-    ).get('max_cycle') or 0
-    if current_cycle == 0:
-        current_cycle = 1
-    
-    # Membres qui ont déjà reçu dans le cycle actuel
-    received_members = BeneficiaryAllocation.objects.filter(
-        tontine=tontine, 
-        cycle_number=current_cycle
-    ).values_list('member_id', flat=True)
-    
-    # Membres qui peuvent encore recevoir
-    can_receive = members.exclude(id__in=received_members)
-    already_received = members.filter(id__in=received_members)
-    
+    """Retourne les statistiques d'allocation pour une tontine (ordre de rotation, voir rotation.py)"""
+    cycle = rotation.state(tontine)
     return {
-        'current_cycle': current_cycle,
-        'total_members': members.count(),
-        'can_receive': list(can_receive),
-        'already_received': list(already_received),
-        'all_received': can_receive.count() == 0
+        'current_cycle': cycle['current_cycle'],
+        'total_members': tontine.active_member_count,
+        'next_beneficiary': cycle['next'].member if cycle['next'] else None,
+        'can_receive': [slot.member for slot in cycle['eligible']],
+        'can_receive_count': cycle['eligible_count'],
+        'already_received': [slot.member for slot in cycle['received']],
+        'received_count': cycle['received_count'],
+        'all_received': cycle['eligible_count'] == 0,
     }
 
 
@@ -690,27 +853,18 @@ def allocate_beneficiary_view(request, tontine_id):
     if request.method == 'POST':
         member_id = request.POST.get('member_id')
         try:
-            member = TontineMember.objects.get(id=member_id, tontine=tontine, status='active')
-        except TontineMember.DoesNotExist:
+            member = TontineMember.objects.select_related('user').get(id=member_id, tontine=tontine, status='active')
+        except (TontineMember.DoesNotExist, ValueError):
             messages.error(request, "Membre non trouvé ou inactif.")
             return redirect('tontine_manage', tontine_id=tontine.id)
         
-        stats = get_allocation_stats(tontine)
-        
-        # Vérifier que le membre peut recevoir (n'a pas déjà reçu dans le cycle actuel)
-        if member.id not in [m.id for m in stats['can_receive']]:
-            messages.error(request, f"{member.user.get_full_name()} a déjà reçu la tontine ce cycle.")
-            return redirect('tontine_manage', tontine_id=tontine.id)
-        
-        # Créer l'allocation
+        # Verser le pot (le membre doit avoir une place non servie dans le cycle actuel)
         try:
-            allocation = BeneficiaryAllocation.objects.create(
-                tontine=tontine,
-                member=member,
-                cycle_number=stats['current_cycle'],
-                amount=tontine.total_pot
-            )
-            messages.success(request, f"{member.user.get_full_name()} a reçu {tontine.total_pot} FCFA de la tontine {tontine.name} (Cycle {stats['current_cycle']}).")
+            allocation = payouts.pay_out(tontine, member)
+            messages.success(request, f"{member.user.get_full_name()} a reçu {allocation.amount} FCFA de la tontine {tontine.name} (Cycle {allocation.cycle_number}).")
+            return redirect('tontine_manage', tontine_id=tontine.id)
+        except PaymentError as e:
+            messages.error(request, str(e))
             return redirect('tontine_manage', tontine_id=tontine.id)
         except Exception as e:
             messages.error(request, f"Erreur lors de l'allocation: {str(e)}")
@@ -724,4 +878,27 @@ def allocate_beneficiary_view(request, tontine_id):
         'can_receive_members': stats['can_receive'],
         'already_received': stats['already_received'],
     }
-    return render(request, 'tontines/allocate_beneficiary.html', context)
\ No newline at end of file
+    return render(request, 'tontines/allocate_beneficiary.html', context)
+
+
+@csrf_exempt
+@require_POST
+def getmipay_webhook_view(request):
+    """
+    Notification GetMiPay: vérifier la signature du corps brut (en-tête
+    X-Signature) et enregistrer l'événement, appliqué ensuite par
+    drain_webhooks (voir inbox.py). Sans GETMIPAY_WEBHOOK_SECRET, toute
+    notification est refusée (503).
+    """
+    if not getmipay_service.webhook_secret:
+        return JsonResponse({'success': False, 'error': 'Webhook non configuré.'}, status=503)
+    if not getmipay_service.verify_webhook(request.headers.get('X-Signature', ''), request.body):
+        return JsonResponse({'success': False, 'error': 'Signature invalide.'}, status=403)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        return JsonResponse({'success': False, 'error': 'Notification invalide.'}, status=400)
+    inbox.receive(payload)
+    return JsonResponse({'success': True})